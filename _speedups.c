@@ -0,0 +1,561 @@
+/*
+ * Optional compiled accelerator for the hot paths of the disassembler:
+ * LEB128 reads and the function body instruction loop.
+ *
+ * conversions.py and type.py use this module automatically when it has been
+ * built (python scripts/build_speedups.py); the pure-Python implementations
+ * in those files stay the reference and are used whenever it is missing.
+ */
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+
+#define END_OPCODE 0x0b
+
+/* The kinds of opcodes, see the KIND_* constants in type.py. */
+enum {
+    KIND_PLAIN = 0,
+    KIND_SKIP = 1,
+    KIND_INDEX = 2,
+    KIND_VARINT = 3,
+    KIND_FLOAT32 = 4,
+    KIND_FLOAT64 = 5,
+    KIND_RESERVED = 6,
+    KIND_MEMORY = 7,
+    KIND_BLOCK = 8,
+    KIND_BARE_BLOCK = 9,
+    KIND_ELSE = 10,
+    KIND_BRANCH_TABLE = 11,
+    KIND_CALL = 12,
+    KIND_CALL_INDIRECT = 13,
+    KIND_UNKNOWN = 14
+};
+
+static unsigned char opcode_kinds[256];
+static int opcode_table_ready = 0;
+
+/* struct.error, raised for truncated float literals like struct.unpack_from does. */
+static PyObject *struct_error = NULL;
+
+static PyObject *
+index_error(void)
+{
+    PyErr_SetString(PyExc_IndexError, "index out of range");
+    return NULL;
+}
+
+/* Decodes an encoding that does not fit in 56 bits with Python integers. */
+static PyObject *
+decode_leb128_long(const unsigned char *buf, Py_ssize_t len, Py_ssize_t *offset, int is_signed)
+{
+    PyObject *value = PyLong_FromLong(0);
+    Py_ssize_t index = *offset;
+    long shift = 0;
+    unsigned char byte;
+
+    if (value == NULL)
+        return NULL;
+
+    do {
+        PyObject *part, *shift_obj, *shifted, *result;
+
+        if (index >= len) {
+            Py_DECREF(value);
+            return index_error();
+        }
+        byte = buf[index++];
+
+        part = PyLong_FromLong(byte & 0x7f);
+        shift_obj = PyLong_FromLong(shift);
+        if (part == NULL || shift_obj == NULL) {
+            Py_XDECREF(part);
+            Py_XDECREF(shift_obj);
+            Py_DECREF(value);
+            return NULL;
+        }
+        shifted = PyNumber_Lshift(part, shift_obj);
+        Py_DECREF(part);
+        Py_DECREF(shift_obj);
+        if (shifted == NULL) {
+            Py_DECREF(value);
+            return NULL;
+        }
+        result = PyNumber_Or(value, shifted);
+        Py_DECREF(shifted);
+        Py_DECREF(value);
+        if (result == NULL)
+            return NULL;
+        value = result;
+        shift += 7;
+    } while (byte & 0x80);
+
+    if (is_signed && (byte & 0x40)) {
+        PyObject *one = PyLong_FromLong(1);
+        PyObject *shift_obj = PyLong_FromLong(shift);
+        PyObject *sign = NULL, *result = NULL;
+
+        if (one != NULL && shift_obj != NULL)
+            sign = PyNumber_Lshift(one, shift_obj);
+        Py_XDECREF(one);
+        Py_XDECREF(shift_obj);
+        if (sign != NULL)
+            result = PyNumber_Subtract(value, sign);
+        Py_XDECREF(sign);
+        Py_DECREF(value);
+        value = result;
+        if (value == NULL)
+            return NULL;
+    }
+
+    *offset = index;
+    return value;
+}
+
+static PyObject *
+decode_leb128(const unsigned char *buf, Py_ssize_t len, Py_ssize_t *offset, int is_signed)
+{
+    Py_ssize_t index = *offset;
+    unsigned long long value = 0;
+    int shift = 0;
+    unsigned char byte;
+
+    do {
+        if (shift >= 56)
+            return decode_leb128_long(buf, len, offset, is_signed);
+        if (index < 0 || index >= len)
+            return index_error();
+        byte = buf[index++];
+        value |= (unsigned long long)(byte & 0x7f) << shift;
+        shift += 7;
+    } while (byte & 0x80);
+
+    *offset = index;
+    if (is_signed && (byte & 0x40))
+        return PyLong_FromLongLong((long long)value - (1LL << shift));
+    return PyLong_FromUnsignedLongLong(value);
+}
+
+static PyObject *
+read_leb128(PyObject *args, int is_signed)
+{
+    Py_buffer view;
+    Py_ssize_t offset;
+    PyObject *value, *result;
+
+    if (!PyArg_ParseTuple(args, "y*n", &view, &offset))
+        return NULL;
+    value = decode_leb128((const unsigned char *)view.buf, view.len, &offset, is_signed);
+    PyBuffer_Release(&view);
+    if (value == NULL)
+        return NULL;
+    result = Py_BuildValue("(Nn)", value, offset);
+    return result;
+}
+
+static PyObject *
+speedups_read_uleb128(PyObject *self, PyObject *args)
+{
+    return read_leb128(args, 0);
+}
+
+static PyObject *
+speedups_read_sleb128(PyObject *self, PyObject *args)
+{
+    return read_leb128(args, 1);
+}
+
+static int
+is_data_printable(unsigned char c)
+{
+    return c >= 0x20 && c < 0x7f && c != '"' && c != '\\';
+}
+
+static PyObject *
+speedups_decode_uleb128_array(PyObject *self, PyObject *args)
+{
+    Py_buffer view;
+    Py_ssize_t offset, count, i;
+    PyObject *values;
+
+    if (!PyArg_ParseTuple(args, "y*nn", &view, &offset, &count))
+        return NULL;
+
+    values = PyList_New(0);
+    if (values == NULL) {
+        PyBuffer_Release(&view);
+        return NULL;
+    }
+    for (i = 0; i < count; i++) {
+        PyObject *value = decode_leb128((const unsigned char *)view.buf, view.len, &offset, 0);
+        if (value == NULL || PyList_Append(values, value) < 0) {
+            Py_XDECREF(value);
+            Py_DECREF(values);
+            PyBuffer_Release(&view);
+            return NULL;
+        }
+        Py_DECREF(value);
+    }
+    PyBuffer_Release(&view);
+    return Py_BuildValue("(Nn)", values, offset);
+}
+
+/* The text of each byte in a data string and its length, see
+ * conversions.DATA_ESCAPES; filled in when the module is initialised. */
+static char data_escapes[256][4];
+static unsigned char data_escape_lengths[256];
+
+static void
+init_data_escapes(void)
+{
+    static const char hex_digits[] = "0123456789abcdef";
+    int c;
+
+    for (c = 0; c < 256; c++) {
+        if (is_data_printable((unsigned char)c)) {
+            data_escapes[c][0] = (char)c;
+            data_escape_lengths[c] = 1;
+        } else {
+            data_escapes[c][0] = '\\';
+            data_escapes[c][1] = hex_digits[c >> 4];
+            data_escapes[c][2] = hex_digits[c & 0x0f];
+            data_escape_lengths[c] = 3;
+        }
+    }
+}
+
+/* Writes the bytes of a data segment as the text inside a WAT data string,
+ * like conversions.escape_data. */
+static PyObject *
+speedups_escape_data(PyObject *self, PyObject *arg)
+{
+    Py_buffer view;
+    const unsigned char *buf;
+    Py_ssize_t i, length = 0;
+    PyObject *text;
+    char *scratch, *out;
+
+    if (PyObject_GetBuffer(arg, &view, PyBUF_SIMPLE) < 0)
+        return NULL;
+    buf = (const unsigned char *)view.buf;
+
+    for (i = 0; i < view.len; i++)
+        length += data_escape_lengths[buf[i]];
+
+    /* every escape is copied as four bytes, so leave room after the last one */
+    scratch = PyMem_Malloc(length + 4);
+    if (scratch == NULL) {
+        PyBuffer_Release(&view);
+        return PyErr_NoMemory();
+    }
+    out = scratch;
+    for (i = 0; i < view.len; i++) {
+        memcpy(out, data_escapes[buf[i]], 4);
+        out += data_escape_lengths[buf[i]];
+    }
+    PyBuffer_Release(&view);
+
+    text = PyUnicode_DecodeASCII(scratch, length, NULL);
+    PyMem_Free(scratch);
+    return text;
+}
+
+static PyObject *
+speedups_set_opcode_table(PyObject *self, PyObject *table)
+{
+    int opcode;
+
+    if (!PyList_Check(table) || PyList_GET_SIZE(table) != 256) {
+        PyErr_SetString(PyExc_TypeError, "expected a list of 256 opcode kinds");
+        return NULL;
+    }
+    for (opcode = 0; opcode < 256; opcode++) {
+        long kind = PyLong_AsLong(PyList_GET_ITEM(table, opcode));
+
+        if (kind == -1 && PyErr_Occurred())
+            return NULL;
+        if (kind < 0 || kind > KIND_UNKNOWN) {
+            PyErr_Format(PyExc_ValueError, "invalid kind %ld for opcode %d", kind, opcode);
+            return NULL;
+        }
+        opcode_kinds[opcode] = (unsigned char)kind;
+    }
+    opcode_table_ready = 1;
+    Py_RETURN_NONE;
+}
+
+/* Decodes a LEB128 value that has to fit in an array('q') item, raising
+ * OverflowError like array.append does when it does not. */
+static int
+decode_leb128_int64(const unsigned char *buf, Py_ssize_t len, Py_ssize_t *offset, int is_signed, long long *out)
+{
+    Py_ssize_t index = *offset;
+    unsigned long long value = 0;
+    int shift = 0;
+    unsigned char byte;
+
+    do {
+        if (shift >= 56) {
+            PyObject *obj = decode_leb128(buf, len, offset, is_signed);
+            if (obj == NULL)
+                return -1;
+            *out = PyLong_AsLongLong(obj);
+            Py_DECREF(obj);
+            return (*out == -1 && PyErr_Occurred()) ? -1 : 0;
+        }
+        if (index < 0 || index >= len) {
+            index_error();
+            return -1;
+        }
+        byte = buf[index++];
+        value |= (unsigned long long)(byte & 0x7f) << shift;
+        shift += 7;
+    } while (byte & 0x80);
+
+    *offset = index;
+    if (is_signed && (byte & 0x40))
+        *out = (long long)value - (1LL << shift);
+    else
+        *out = (long long)value;
+    return 0;
+}
+
+/* Skips over a LEB128 value of any length. */
+static int
+skip_leb128(const unsigned char *buf, Py_ssize_t len, Py_ssize_t *offset)
+{
+    Py_ssize_t index = *offset;
+
+    do {
+        if (index < 0 || index >= len) {
+            index_error();
+            return -1;
+        }
+    } while (buf[index++] & 0x80);
+    *offset = index;
+    return 0;
+}
+
+/* A growable array of fixed-size items, returned to Python as bytes. */
+typedef struct {
+    char *data;
+    Py_ssize_t length;
+    Py_ssize_t capacity;
+} buffer_t;
+
+static int
+buffer_append(buffer_t *buffer, const void *item, Py_ssize_t size)
+{
+    if (buffer->length + size > buffer->capacity) {
+        Py_ssize_t capacity = buffer->capacity ? buffer->capacity * 2 : 256;
+        char *data;
+
+        while (capacity < buffer->length + size)
+            capacity *= 2;
+        data = PyMem_Realloc(buffer->data, capacity);
+        if (data == NULL) {
+            PyErr_NoMemory();
+            return -1;
+        }
+        buffer->data = data;
+        buffer->capacity = capacity;
+    }
+    memcpy(buffer->data + buffer->length, item, size);
+    buffer->length += size;
+    return 0;
+}
+
+static PyObject *
+buffer_to_bytes(buffer_t *buffer)
+{
+    return PyBytes_FromStringAndSize(buffer->data ? buffer->data : "", buffer->length);
+}
+
+static PyObject *
+speedups_decode_instructions(PyObject *self, PyObject *args)
+{
+    PyObject *buffer_obj;
+    Py_ssize_t index, end, function_count;
+    Py_buffer view;
+    const unsigned char *buf;
+    buffer_t opcodes = {NULL, 0, 0};
+    buffer_t immediates = {NULL, 0, 0};
+    buffer_t offsets = {NULL, 0, 0};
+    buffer_t targets = {NULL, 0, 0};
+    PyObject *result = NULL;
+
+    if (!PyArg_ParseTuple(args, "Onnn", &buffer_obj, &index, &end, &function_count))
+        return NULL;
+    if (!opcode_table_ready) {
+        PyErr_SetString(PyExc_RuntimeError, "the opcode table has not been set");
+        return NULL;
+    }
+    if (PyObject_GetBuffer(buffer_obj, &view, PyBUF_SIMPLE) < 0)
+        return NULL;
+    buf = (const unsigned char *)view.buf;
+
+    while (index < end) {
+        unsigned char opcode;
+        Py_ssize_t start = index;
+        long long immediate = 0;
+
+        if (index < 0 || index >= view.len) {
+            index_error();
+            goto done;
+        }
+        opcode = buf[index];
+        if (opcode == END_OPCODE)
+            break;
+        index++;
+
+        switch (opcode_kinds[opcode]) {
+        case KIND_SKIP:
+            continue;
+        case KIND_PLAIN:
+        case KIND_ELSE:
+            break;
+        case KIND_INDEX:
+            if (decode_leb128_int64(buf, view.len, &index, 0, &immediate) < 0)
+                goto done;
+            break;
+        case KIND_VARINT:
+            if (decode_leb128_int64(buf, view.len, &index, 1, &immediate) < 0)
+                goto done;
+            break;
+        case KIND_FLOAT32:
+        case KIND_FLOAT64: {
+            Py_ssize_t size = opcode_kinds[opcode] == KIND_FLOAT32 ? 4 : 8;
+            unsigned long long bits = 0;
+            Py_ssize_t i;
+
+            if (index < 0 || view.len - index < size) {
+                PyErr_Format(struct_error, "unpack_from requires a buffer of at least %zd bytes",
+                             index + size);
+                goto done;
+            }
+            for (i = size - 1; i >= 0; i--)
+                bits = (bits << 8) | buf[index + i];
+            immediate = (long long)bits;
+            index += size;
+            break;
+        }
+        case KIND_RESERVED:
+            index++;
+            break;
+        case KIND_MEMORY:
+            if (skip_leb128(buf, view.len, &index) < 0 || skip_leb128(buf, view.len, &index) < 0)
+                goto done;
+            break;
+        case KIND_BLOCK:
+        case KIND_BARE_BLOCK:
+            if (index < 0 || index >= view.len) {
+                index_error();
+                goto done;
+            }
+            immediate = buf[index];
+            /* a block with a result type is left out, and its type byte is not consumed */
+            if (opcode_kinds[opcode] == KIND_BARE_BLOCK && immediate != 0x40)
+                continue;
+            index++;
+            break;
+        case KIND_BRANCH_TABLE: {
+            long long count, target, i;
+
+            if (decode_leb128_int64(buf, view.len, &index, 0, &count) < 0)
+                goto done;
+            immediate = (long long)(targets.length / sizeof(long long));
+            count += 1;
+            if (buffer_append(&targets, &count, sizeof(count)) < 0)
+                goto done;
+            for (i = 0; i < count; i++) {
+                if (decode_leb128_int64(buf, view.len, &index, 0, &target) < 0 ||
+                    buffer_append(&targets, &target, sizeof(target)) < 0)
+                    goto done;
+            }
+            break;
+        }
+        case KIND_CALL:
+            if (decode_leb128_int64(buf, view.len, &index, 0, &immediate) < 0)
+                goto done;
+            if (immediate > function_count) {
+                PyErr_Format(PyExc_ValueError, "Invalid function index: %lld", immediate);
+                goto done;
+            }
+            break;
+        case KIND_CALL_INDIRECT:
+            if (decode_leb128_int64(buf, view.len, &index, 0, &immediate) < 0)
+                goto done;
+            if (index < 0 || index >= view.len) {
+                index_error();
+                goto done;
+            }
+            index++;
+            break;
+        default: {
+            PyObject *key = PyLong_FromLong(opcode);
+            if (key != NULL) {
+                PyErr_SetObject(PyExc_KeyError, key);
+                Py_DECREF(key);
+            }
+            goto done;
+        }
+        }
+
+        {
+            unsigned int position = (unsigned int)start;
+
+            if (buffer_append(&opcodes, &opcode, 1) < 0 ||
+                buffer_append(&immediates, &immediate, sizeof(immediate)) < 0 ||
+                buffer_append(&offsets, &position, sizeof(position)) < 0)
+                goto done;
+        }
+    }
+
+    result = Py_BuildValue("(NNNNn)", buffer_to_bytes(&opcodes), buffer_to_bytes(&immediates),
+                           buffer_to_bytes(&offsets), buffer_to_bytes(&targets), index);
+
+done:
+    PyMem_Free(opcodes.data);
+    PyMem_Free(immediates.data);
+    PyMem_Free(offsets.data);
+    PyMem_Free(targets.data);
+    PyBuffer_Release(&view);
+    return result;
+}
+
+static PyMethodDef speedups_methods[] = {
+    {"read_uleb128", speedups_read_uleb128, METH_VARARGS,
+     "read_uleb128(buf, offset) -> (value, new_offset)"},
+    {"read_sleb128", speedups_read_sleb128, METH_VARARGS,
+     "read_sleb128(buf, offset) -> (value, new_offset)"},
+    {"decode_uleb128_array", speedups_decode_uleb128_array, METH_VARARGS,
+     "decode_uleb128_array(buf, offset, count) -> (values, new_offset)"},
+    {"escape_data", speedups_escape_data, METH_O,
+     "escape_data(buf) -> the text of the bytes inside a WAT data string"},
+    {"set_opcode_table", speedups_set_opcode_table, METH_O,
+     "set_opcode_table(kinds) -- install the kind of each of the 256 opcodes"},
+    {"decode_instructions", speedups_decode_instructions, METH_VARARGS,
+     "decode_instructions(buf, index, end, function_count) -> (opcodes, immediates, offsets, targets, new_index)"},
+    {NULL, NULL, 0, NULL}
+};
+
+static struct PyModuleDef speedups_module = {
+    PyModuleDef_HEAD_INIT,
+    "_speedups",
+    "Compiled LEB128 and instruction decoding for the disassembler.",
+    -1,
+    speedups_methods
+};
+
+PyMODINIT_FUNC
+PyInit__speedups(void)
+{
+    PyObject *struct_module = PyImport_ImportModule("struct");
+
+    if (struct_module == NULL)
+        return NULL;
+    struct_error = PyObject_GetAttrString(struct_module, "error");
+    Py_DECREF(struct_module);
+    if (struct_error == NULL)
+        return NULL;
+    init_data_escapes();
+    return PyModule_Create(&speedups_module);
+}
@@ -0,0 +1,131 @@
+import asyncio
+import io
+import os
+
+from main import (ModuleWriter, TEXT_SECTION_ORDERING, parseFile, resolve_selection,
+                  split_functions, write_sections)
+from module import Module
+from section import *
+
+# The number of bytes of function bodies rendered per chunk of the code section.
+CHUNK_BYTES = 1 << 16
+
+class ChunkStream:
+    """ This class collects the text written to it until it is taken """
+    def __init__(self):
+        self.parts = []
+
+    def write(self, text):
+        self.parts.append(text)
+
+    def take(self):
+        text = ''.join(self.parts)
+        self.parts = []
+        return text
+
+async def load_module(path_or_bytes, executor=None):
+    """
+        this method reads the module, if given a path, and indexes its sections
+        without blocking the event loop
+
+        = Parameters =
+        path_or_bytes : str       = the .wasm file, or the bytes of the module
+        executor      : Executor  = run blocking work here (default: the loop's)
+
+        = Return Value =
+        return        : Module    = the module, with no section parsed yet
+    """
+    loop = asyncio.get_event_loop()
+    if isinstance(path_or_bytes, (str, os.PathLike)):
+        binary = await loop.run_in_executor(executor, parseFile, os.fspath(path_or_bytes))
+    else:
+        binary = path_or_bytes
+    return await loop.run_in_executor(executor, Module, binary)
+
+def _check_functions(module, functions):
+    count = module.count(SECTION_IDS['code'])
+    for i in functions or []:
+        if not 0 <= i < count:
+            raise ValueError('Function index out of range: {}'.format(i))
+
+async def iter_disassembly(path_or_bytes, sections=None, functions=None, executor=None, chunk_bytes=CHUNK_BYTES):
+    """
+        this method disassembles a module into the text format, yielding the
+        text of each section, and of each run of functions of the code section,
+        as soon as it is rendered; the chunks joined are the text of disassemble
+
+        Every section is parsed and rendered in the executor, so the event loop
+        is never blocked for longer than it takes to hand over a chunk. When the
+        iteration is cancelled no more sections are parsed; at most the one
+        section or run of functions already being rendered is finished and thrown
+        away.
+
+        = Parameters =
+        path_or_bytes : str       = the .wasm file, or the bytes of the module
+        sections      : str[]     = only write these sections (names or ids)
+        functions     : int[]     = only write the functions at these indices
+        executor      : Executor  = run blocking work here (default: the loop's)
+        chunk_bytes   : int       = render about this many bytes of function
+                                    bodies per chunk of the code section
+
+        = Return Value =
+        return        : str       = each chunk of the text format, in order
+    """
+    loop = asyncio.get_event_loop()
+    sections, functions = resolve_selection(sections, functions)
+    module = await load_module(path_or_bytes, executor)
+    _check_functions(module, functions)
+
+    chunks = ChunkStream()
+    writer = ModuleWriter(chunks)
+    for idx in TEXT_SECTION_ORDERING:
+        if not module.has_section(idx) or (sections is not None and idx not in sections):
+            continue
+        section = await loop.run_in_executor(executor, module.section, idx)
+
+        if idx == SECTION_IDS['code']:
+            if functions is not None:
+                ranges = [(i, i + 1) for i in functions]
+            else:
+                ranges = split_functions(section.body_sizes, sum(section.body_sizes) // chunk_bytes)
+            for function_range in ranges:
+                await loop.run_in_executor(executor, section.write_to, writer, *function_range)
+                yield chunks.take()
+        else:
+            await loop.run_in_executor(executor, section.write_to, writer)
+            yield chunks.take()
+
+    writer.close()
+    yield chunks.take()
+
+async def disassemble_async(path_or_bytes, sections=None, functions=None, output_format='text', executor=None):
+    """
+        this method disassembles a module without blocking the event loop, see
+        iter_disassembly
+
+        = Parameters =
+        path_or_bytes : str       = the .wasm file, or the bytes of the module
+        sections      : str[]     = only write these sections (names or ids)
+        functions     : int[]     = only write the functions at these indices
+        output_format : str       = one of OUTPUT_FORMATS; the JSON formats are
+                                    rendered in a single executor call
+        executor      : Executor  = run blocking work here (default: the loop's)
+
+        = Return Value =
+        output        : str       = the same text as main.disassemble
+    """
+    if output_format == 'text':
+        return ''.join([chunk async for chunk in iter_disassembly(path_or_bytes, sections, functions, executor)])
+
+    loop = asyncio.get_event_loop()
+    sections, functions = resolve_selection(sections, functions)
+    module = await load_module(path_or_bytes, executor)
+    _check_functions(module, functions)
+
+    for idx in required_sections(sections if sections is not None else TEXT_SECTION_ORDERING):
+        await loop.run_in_executor(executor, module.section, idx)
+
+    output = io.StringIO()
+    await loop.run_in_executor(executor, write_sections, module.parsed_sections(), output, module.version,
+                               sections, functions, output_format)
+    return output.getvalue()
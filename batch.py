@@ -0,0 +1,133 @@
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from main import disassemble_to
+
+def find_modules(paths):
+    """
+        this method expands the given directories, globs and files into the
+        .wasm files to disassemble
+
+        = Parameters =
+        paths   : str[]        = directories, glob patterns or .wasm files
+
+        = Return Value =
+        modules : (str, str)[] = (path, path relative to the argument it came
+                                 from) for every .wasm file, without duplicates
+    """
+    modules = []
+    seen = set()
+    for path in paths:
+        if os.path.isdir(path):
+            found = sorted(glob.glob(os.path.join(path, '**', '*.wasm'), recursive=True))
+            found = [(f, os.path.relpath(f, path)) for f in found]
+        else:
+            found = [(f, os.path.basename(f)) for f in sorted(glob.glob(path))]
+        for module in found:
+            if module[0] not in seen:
+                seen.add(module[0])
+                modules.append(module)
+    return modules
+
+def output_path(path, relative_path, out_dir):
+    """
+        this method returns where the .wat file for the given module is written:
+        next to the module, or at the same relative path under out_dir
+    """
+    if out_dir is None:
+        return os.path.splitext(path)[0] + '.wat'
+    return os.path.join(out_dir, os.path.splitext(relative_path)[0] + '.wat')
+
+def disassemble_file(task):
+    """
+        this method disassembles one module into its .wat file and returns a
+        summary record of the result; errors are recorded instead of raised
+    """
+    path, wat_path, use_mmap = task
+    record = {
+        'input': path,
+        'output': wat_path,
+        'size': os.path.getsize(path),
+        'seconds': 0.0,
+        'error': None
+    }
+
+    start = time.perf_counter()
+    try:
+        os.makedirs(os.path.dirname(wat_path) or '.', exist_ok=True)
+        with open(wat_path, 'w') as wat_file:
+            disassemble_to(path, wat_file, use_mmap=use_mmap)
+    except Exception as e:
+        record['error'] = '{}: {}'.format(type(e).__name__, e)
+        record['output'] = None
+        if os.path.exists(wat_path):
+            os.remove(wat_path)
+    record['seconds'] = time.perf_counter() - start
+
+    return record
+
+def disassemble_all(paths, out_dir=None, jobs=None, use_mmap=False, progress=None):
+    """
+        this method disassembles every module found under the given paths in a
+        pool of worker processes
+
+        = Parameters =
+        paths    : str[]     = directories, glob patterns or .wasm files
+        out_dir  : str       = write the .wat files under this directory instead
+                               of next to each module
+        jobs     : int       = the number of worker processes (default: one per CPU)
+        use_mmap : bool      = parse each module from a memory mapping of the file
+        progress : function  = called with each record as soon as it is ready
+
+        = Return Value =
+        records  : dict[]    = one summary record per module, in input order
+    """
+    tasks = [(path, output_path(path, relative_path, out_dir), use_mmap)
+             for path, relative_path in find_modules(paths)]
+    order = {task[0]: idx for idx, task in enumerate(tasks)}
+
+    records = []
+    with multiprocessing.Pool(jobs) as pool:
+        for record in pool.imap_unordered(disassemble_file, tasks):
+            if progress is not None:
+                progress(record)
+            records.append(record)
+
+    records.sort(key=lambda record: order[record['input']])
+    return records
+
+def print_record(record):
+    if record['error'] is None:
+        sys.stderr.write('ok     {:8.3f}s  {}\n'.format(record['seconds'], record['input']))
+    else:
+        sys.stderr.write('error  {:8.3f}s  {}  ({})\n'.format(record['seconds'], record['input'], record['error']))
+
+# code that's only executed if this file itself is run
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Disassemble every .wasm file under the given paths')
+    parser.add_argument('paths', nargs='+', help='directories, glob patterns or .wasm files')
+    parser.add_argument('--out-dir', '-o', help='write the .wat files into this tree instead of next to each module')
+    parser.add_argument('--jobs', '-j', type=int, default=None, help='number of worker processes (default: one per CPU)')
+    parser.add_argument('--mmap', action='store_true', help='memory-map each module instead of reading it into memory')
+    parser.add_argument('--summary', help='write the per-file timing and errors to this JSON file')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    records = disassemble_all(args.paths, args.out_dir, args.jobs, args.mmap, progress=print_record)
+    elapsed = time.perf_counter() - start
+
+    errors = sum(1 for record in records if record['error'] is not None)
+    sys.stderr.write('{} modules, {} errors in {:.3f}s\n'.format(len(records), errors, elapsed))
+
+    if args.summary is not None:
+        with open(args.summary, 'w') as summary_file:
+            json.dump({'seconds': elapsed, 'modules': len(records), 'errors': errors, 'files': records},
+                      summary_file, indent=2)
+
+    sys.exit(1 if errors else 0)
@@ -0,0 +1,70 @@
+import os, sys, glob, time, argparse
+dirname = os.path.realpath(__file__)
+dirname = dirname[:dirname[:dirname.rfind('/')].rfind('/')]
+sys.path.append(dirname)
+
+from main import SECTION_CLASSES, parseFile
+from section import *
+
+# Measures how many instructions per second FunctionBody decodes.
+# usage: python benchmarks/decode.py [--repeat N] [files or directories...]
+
+def load_code_sections(paths):
+    """
+        this method parses every module up to (but not including) its function
+        bodies and returns the code sections that were found
+    """
+    code_sections = []
+    for path in paths:
+        binary = parseFile(path)
+        try:
+            sectionList = makeSectionList(Reader(binary, 8))
+            for idx, section_class in enumerate(SECTION_CLASSES):
+                if sectionList[idx + 1] is not None:
+                    sectionList[idx + 1] = section_class(sectionList[idx + 1], sectionList)
+        except Exception:
+            # modules the disassembler cannot handle yet are left out
+            continue
+        code_section = sectionList[SECTION_IDS['code']]
+        if code_section is not None:
+            code_sections.append(code_section)
+    return code_sections
+
+def decodable_bodies(code_sections):
+    bodies = []
+    for code_section in code_sections:
+        for i in range(code_section.count):
+            try:
+                FunctionBody(Reader(code_section.data, code_section.body_offsets[i]), code_section.count)
+            except Exception:
+                continue
+            bodies.append((code_section, i))
+    return bodies
+
+def expand(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(glob.glob(os.path.join(path, '**', '*.wasm'), recursive=True))
+        else:
+            files.append(path)
+    return files
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark function body decoding')
+    parser.add_argument('paths', nargs='*', default=[os.path.join(dirname, 'spec', 'wasm')])
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    bodies = decodable_bodies(load_code_sections(expand(args.paths)))
+
+    instructions = 0
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for code_section, i in bodies:
+            body = FunctionBody(Reader(code_section.data, code_section.body_offsets[i]), code_section.count)
+            instructions += len(body.instructions)
+    elapsed = time.perf_counter() - start
+
+    print('{} bodies, {} instructions in {:.3f}s: {:,.0f} instructions/s'.format(
+        len(bodies) * args.repeat, instructions, elapsed, instructions / elapsed))
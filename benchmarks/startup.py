@@ -0,0 +1,31 @@
+import os, sys, time, argparse, subprocess
+dirname = os.path.realpath(__file__)
+dirname = dirname[:dirname[:dirname.rfind('/')].rfind('/')]
+
+# Measures the wall-clock time of a whole `python main.py empty.wasm` run,
+# which is dominated by interpreter startup and module imports.
+# usage: python benchmarks/startup.py [--runs N] [--max-seconds S]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the startup time of main.py')
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--module', default=os.path.join(dirname, 'wasm_files', 'empty', 'empty.wasm'))
+    parser.add_argument('--max-seconds', type=float, default=None,
+                        help='exit with status 1 if the median run is slower than this')
+    args = parser.parse_args()
+
+    command = [sys.executable, os.path.join(dirname, 'main.py'), '--no-cache', args.module]
+    timings = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        subprocess.run(command, stdout=subprocess.DEVNULL, check=True)
+        timings.append(time.perf_counter() - start)
+
+    timings.sort()
+    median = timings[len(timings) // 2]
+    print('{} runs: median {:.1f}ms, min {:.1f}ms, max {:.1f}ms'.format(
+        args.runs, median * 1000, timings[0] * 1000, timings[-1] * 1000))
+
+    if args.max_seconds is not None and median > args.max_seconds:
+        print('startup regression: median {:.3f}s is over {:.3f}s'.format(median, args.max_seconds))
+        sys.exit(1)
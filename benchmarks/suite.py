@@ -0,0 +1,211 @@
+import os, sys, gc, json, time, platform, argparse, subprocess, tracemalloc
+dirname = os.path.realpath(__file__)
+dirname = dirname[:dirname[:dirname.rfind('/')].rfind('/')]
+sys.path.append(dirname)
+
+from main import SECTION_CLASSES, parseFile
+from section import *
+from synthetic import module_of_size
+import type as wasm_type
+from decode import expand
+
+# Times each phase of disassembly separately over a corpus of modules: indexing
+# the sections (makeSectionList), each Section constructor, FunctionBody
+# decoding and each to_str, and reports MB/s, instructions/s and peak memory.
+# The results are written as JSON so that runs on different commits can be
+# compared with --compare.
+# usage: python benchmarks/suite.py [--synthetic MB,...] [--output results.json]
+#                                   [--compare old.json] [paths...]
+
+DEFAULT_PATHS = [os.path.join(dirname, 'wasm_files'), os.path.join(dirname, 'spec', 'wasm')]
+
+class Corpus:
+    """ This class is one module of the corpus: its name and its bytes """
+    def __init__(self, name, binary):
+        self.name = name
+        self.binary = binary
+
+def load_corpus(paths, synthetic_sizes):
+    corpus = [Corpus(os.path.relpath(path, dirname), bytes(parseFile(path))) for path in expand(paths)]
+    for size in synthetic_sizes:
+        corpus.append(Corpus('synthetic-{:g}MB'.format(size), module_of_size(int(size * (1 << 20)))))
+    return corpus
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+def run_phases(binary):
+    """
+        this method disassembles the module once, timing each phase
+
+        = Parameters =
+        binary : bytes = the module
+
+        = Return Value =
+        phases : dict  = phase name -> (seconds, bytes, instructions), where
+                         instructions is None for phases that do not decode
+    """
+    phases = {}
+    sectionList, seconds = timed(makeSectionList, Reader(binary, 8))
+    phases['index'] = (seconds, len(binary), None)
+
+    for idx, section_class in enumerate(SECTION_CLASSES):
+        if sectionList[idx + 1] is not None:
+            size = sectionList[idx + 1].sectionSize
+            sectionList[idx + 1], seconds = timed(section_class, sectionList[idx + 1], sectionList)
+            phases['parse.' + SECTION_NAMES[idx + 1]] = (seconds, size, None)
+
+    code = sectionList[SECTION_IDS['code']]
+    if code is not None:
+        instructions = 0
+        start = time.perf_counter()
+        for offset in code.body_offsets:
+            instructions += len(FunctionBody(Reader(code.data, offset), code.count).instructions)
+        phases['decode'] = (time.perf_counter() - start, sum(code.body_sizes), instructions)
+
+    for idx in range(1, len(sectionList)):
+        if sectionList[idx] is not None:
+            size = phases['parse.' + SECTION_NAMES[idx]][1]
+            seconds = timed(sectionList[idx].to_str)[1]
+            decoded = phases['decode'][2] if idx == SECTION_IDS['code'] else None
+            phases['render.' + SECTION_NAMES[idx]] = (seconds, size, decoded)
+    return phases
+
+def peak_memory(binary):
+    """
+        this method returns the peak number of bytes allocated while the module
+        is disassembled; it runs separately as tracing slows every phase down
+    """
+    tracemalloc.start()
+    try:
+        run_phases(binary)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def phase_result(seconds, size, instructions):
+    result = {
+        'seconds': seconds,
+        'bytes': size,
+        'mb_per_s': size / seconds / (1 << 20) if seconds > 0 else None
+    }
+    if instructions is not None:
+        result['instructions'] = instructions
+        result['instructions_per_s'] = instructions / seconds if seconds > 0 else None
+    return result
+
+def benchmark(corpus, repeat=3, memory=True):
+    """
+        this method runs every phase over every module `repeat` times, keeping
+        the fastest run of each phase
+
+        = Parameters =
+        corpus  : Corpus[] = the modules
+        repeat  : int      = the number of runs per module
+        memory  : bool     = also measure the peak memory of each module
+
+        = Return Value =
+        results : dict     = the results of each module and the totals of each phase
+    """
+    modules = []
+    totals = {}
+    for entry in corpus:
+        record = {'name': entry.name, 'size': len(entry.binary)}
+        try:
+            best = {}
+            for _ in range(repeat):
+                gc.collect()
+                for phase, (seconds, size, instructions) in run_phases(entry.binary).items():
+                    if phase not in best or seconds < best[phase][0]:
+                        best[phase] = (seconds, size, instructions)
+            if memory:
+                record['peak_memory'] = peak_memory(entry.binary)
+        except Exception as error:
+            # modules the disassembler cannot handle yet are reported, not timed
+            record['error'] = '{}: {}'.format(type(error).__name__, error)
+            modules.append(record)
+            continue
+
+        record['phases'] = {phase: phase_result(*values) for phase, values in best.items()}
+        modules.append(record)
+        for phase, (seconds, size, instructions) in best.items():
+            total = totals.setdefault(phase, [0.0, 0, None])
+            total[0] += seconds
+            total[1] += size
+            if instructions is not None:
+                total[2] = (total[2] or 0) + instructions
+
+    return {
+        'modules': modules,
+        'totals': {phase: phase_result(*values) for phase, values in sorted(totals.items())}
+    }
+
+def environment():
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=dirname,
+                                         universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'speedups': wasm_type._speedups is not None,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z')
+    }
+
+def compare(old, new):
+    """
+        this method returns one line per phase comparing the totals of two runs,
+        as the change in time taken per byte
+    """
+    lines = []
+    for phase, result in new['totals'].items():
+        before = old['totals'].get(phase)
+        if before is None or not before['mb_per_s'] or not result['mb_per_s']:
+            continue
+        change = before['mb_per_s'] / result['mb_per_s'] - 1
+        lines.append('{:<20} {:>10.2f} MB/s -> {:>10.2f} MB/s  {:+.1%}'.format(
+            phase, before['mb_per_s'], result['mb_per_s'], change))
+    return lines
+
+def summary(results):
+    lines = []
+    for phase, result in results['totals'].items():
+        line = '{:<20} {:>9.4f}s {:>10.2f} MB/s'.format(phase, result['seconds'], result['mb_per_s'] or 0)
+        if 'instructions_per_s' in result:
+            line += ' {:>14,.0f} instructions/s'.format(result['instructions_per_s'] or 0)
+        lines.append(line)
+    peak = max((module.get('peak_memory', 0) for module in results['modules']), default=0)
+    errors = sum(1 for module in results['modules'] if 'error' in module)
+    lines.append('{} modules ({} not disassembled), peak memory {:.1f} MB'.format(
+        len(results['modules']), errors, peak / (1 << 20)))
+    return lines
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark each phase of disassembly')
+    parser.add_argument('paths', nargs='*', default=DEFAULT_PATHS,
+                        help='modules or directories of modules (default: wasm_files and spec/wasm)')
+    parser.add_argument('--synthetic', metavar='MB', default='1,16',
+                        help='comma-separated sizes in MB of synthetic modules to add to the corpus, '
+                             'e.g. 1,16,256 (default: 1,16; empty for none)')
+    parser.add_argument('--repeat', type=int, default=3, help='keep the fastest of this many runs')
+    parser.add_argument('--no-memory', action='store_true', help='do not measure peak memory')
+    parser.add_argument('--output', '-o', help='write the results to this JSON file')
+    parser.add_argument('--compare', metavar='JSON', help='compare the totals with an earlier results file')
+    args = parser.parse_args()
+
+    sizes = [float(size) for size in args.synthetic.split(',') if size]
+    results = benchmark(load_corpus(args.paths, sizes), args.repeat, not args.no_memory)
+    results = dict(environment(), **results)
+
+    print('\n'.join(summary(results)))
+    if args.compare is not None:
+        with open(args.compare) as f:
+            print('\n'.join(compare(json.load(f), results)))
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+            f.write('\n')
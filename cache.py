@@ -0,0 +1,337 @@
+import gzip
+import hashlib
+import os
+import tempfile
+import time
+
+from constants import DISASSEMBLER_VERSION
+
+# 512 MB of compressed text
+DEFAULT_CACHE_SIZE = 512 * 1024 * 1024
+
+# how much decompressed text is copied to the output stream at a time
+READ_CHUNK_SIZE = 1024 * 1024
+
+def default_cache_dir():
+    """
+        this method returns the directory used when no cache directory is given:
+        $XDG_CACHE_HOME/wasm-disassembler, or ~/.cache/wasm-disassembler
+    """
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'wasm-disassembler')
+
+class CacheEntryWriter:
+    """ This class compresses text into a new cache entry as it is written
+
+    The entry only becomes visible to readers once commit() is called, so an
+    interrupted disassembly never leaves a truncated entry behind.
+
+    Attributes:
+        cache     : DisassemblyCache  =  the cache the entry belongs to
+        key       : str               =  the key of the entry
+        temp_path : str               =  the file being written
+    """
+    def __init__(self, cache, key):
+        self.cache = cache
+        self.key = key
+        fd, self.temp_path = tempfile.mkstemp(dir=cache.directory, suffix='.tmp')
+        # closing the gzip stream does not close a file object passed to it
+        self.raw = os.fdopen(fd, 'wb')
+        self.file = gzip.open(self.raw, 'wt', encoding='utf-8')
+
+    def write(self, text):
+        self.file.write(text)
+
+    def close(self):
+        try:
+            self.file.close()
+        finally:
+            self.raw.close()
+
+    def commit(self):
+        self.close()
+        os.replace(self.temp_path, self.cache.path(self.key))
+        self.cache.evict()
+
+    def abort(self):
+        self.close()
+        os.remove(self.temp_path)
+
+class DisassemblyCache:
+    """ This class is an on-disk cache of rendered text, keyed by module content
+
+    Each entry is the gzip-compressed text of one module, stored under a hash
+    of the module bytes, the disassembler version and any rendering options.
+    The total size of the entries is kept under max_bytes by removing the
+    least recently used entries first.
+
+    Attributes:
+        directory : str  =  the directory holding the entries
+        max_bytes : int  =  the most compressed bytes the cache may hold
+    """
+    def __init__(self, directory=None, max_bytes=DEFAULT_CACHE_SIZE):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, binary, *options):
+        """
+            this method returns the cache key for the module bytes
+
+            = Parameters =
+            binary  : bytes-like = the bytes of the whole module
+            options : str        = anything else the rendered text depends on
+
+            = Return Value =
+            key     : str        = the hex digest identifying the entry
+        """
+        digest = hashlib.sha256()
+        digest.update(DISASSEMBLER_VERSION.encode('utf-8'))
+        for option in options:
+            digest.update(b'\0' + str(option).encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(binary)
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + '.wat.gz')
+
+    def copy_to(self, key, stream):
+        """
+            this method writes the cached text for the key to the stream
+
+            = Parameters =
+            key    : str  = the key of the entry
+            stream : file = any object with a write(str) method
+
+            = Return Value =
+            hit    : bool = False if there is no entry for the key
+        """
+        path = self.path(key)
+        try:
+            entry = gzip.open(path, 'rt', encoding='utf-8')
+        except FileNotFoundError:
+            return False
+
+        with entry:
+            # mark the entry as recently used; another process may have just
+            # evicted it, in which case the open file is still read
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                pass
+            while True:
+                text = entry.read(READ_CHUNK_SIZE)
+                if len(text) == 0:
+                    break
+                stream.write(text)
+        return True
+
+    def get(self, key):
+        """
+            this method returns the cached text for the key, or None
+        """
+        path = self.path(key)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as entry:
+                text = entry.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return text
+
+    def writer(self, key):
+        """
+            this method returns a CacheEntryWriter that stores the text written
+            to it under the key once it is committed
+        """
+        return CacheEntryWriter(self, key)
+
+    def put(self, key, text):
+        entry = self.writer(key)
+        entry.write(text)
+        entry.commit()
+
+    def evict(self):
+        """
+            this method removes the least recently used entries until the cache
+            is no larger than max_bytes
+        """
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith('.wat.gz'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+            total += stat.st_size
+
+        entries.sort()
+        for mtime, size, name in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+# 256 MB of rendered function bodies
+DEFAULT_FUNCTION_CACHE_SIZE = 256 * 1024 * 1024
+
+# how long to wait for another process to finish writing the function cache
+BUSY_TIMEOUT = 10.0
+
+# new entries and use times are written once this many are pending, or once
+# the pending text is this large, so that a cold cache does not hold the
+# rendered text of the whole module in memory
+PENDING_ENTRIES = 1024
+PENDING_BYTES = 4 * 1024 * 1024
+
+class FunctionCache:
+    """ This class is a persistent cache of rendered function bodies
+
+    Modules that are rebuilt with small changes share most of their function
+    bodies byte for byte, so the rendered text of each body is stored under a
+    hash of its bytes. The entries live in a single SQLite database; once the
+    stored text is larger than max_bytes the least recently used bodies are
+    removed when the cache is committed.
+
+    New entries are kept in memory until commit(), which writes them in one
+    short transaction, so several processes can share the cache. commit() is
+    also called whenever PENDING_ENTRIES entries or PENDING_BYTES of text are
+    pending, so memory stays bounded however many bodies are rendered. If the
+    database stays locked or cannot be written, the cache behaves as if it
+    were empty and new entries are dropped; rendering never fails because of it.
+
+    Attributes:
+        path      : str  =  the SQLite database file
+        max_bytes : int  =  the most bytes of text the cache may hold
+    """
+    def __init__(self, path=None, max_bytes=DEFAULT_FUNCTION_CACHE_SIZE):
+        # imported here so that runs without a function cache do not pay for it
+        import sqlite3
+
+        if path is None:
+            path = os.path.join(default_cache_dir(), 'functions.sqlite3')
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+        self.path = path
+        self.max_bytes = max_bytes
+        self._errors = sqlite3.OperationalError
+        self._new = {}
+        self._new_bytes = 0
+        self._used = []
+        self.connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS bodies (key BLOB PRIMARY KEY, text TEXT NOT NULL, used REAL NOT NULL)')
+            self.connection.execute('CREATE INDEX IF NOT EXISTS bodies_used ON bodies (used)')
+            # the total size of the text is kept up to date by triggers, so
+            # that commit() does not have to add it up over the whole table
+            self.connection.execute('CREATE TABLE IF NOT EXISTS totals (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+            self.connection.execute(
+                "INSERT OR IGNORE INTO totals SELECT 'size', COALESCE(SUM(LENGTH(text)), 0) FROM bodies "
+                "WHERE NOT EXISTS (SELECT 1 FROM totals WHERE name = 'size')")
+            self.connection.execute(
+                'CREATE TRIGGER IF NOT EXISTS bodies_insert AFTER INSERT ON bodies BEGIN '
+                "UPDATE totals SET value = value + LENGTH(NEW.text) WHERE name = 'size'; END")
+            self.connection.execute(
+                'CREATE TRIGGER IF NOT EXISTS bodies_delete AFTER DELETE ON bodies BEGIN '
+                "UPDATE totals SET value = value - LENGTH(OLD.text) WHERE name = 'size'; END")
+
+    def key(self, body):
+        """
+            this method returns the cache key for the bytes of a function body
+        """
+        digest = hashlib.blake2b(DISASSEMBLER_VERSION.encode('utf-8'), digest_size=16)
+        digest.update(b'\0')
+        digest.update(body)
+        return digest.digest()
+
+    def get(self, key):
+        """
+            this method returns the rendered text for the key, or None
+        """
+        if key in self._new:
+            text = self._new[key][0]
+        else:
+            try:
+                row = self.connection.execute('SELECT text FROM bodies WHERE key = ?', (key,)).fetchone()
+            except self._errors:
+                return None
+            if row is None:
+                return None
+            text = row[0]
+        self._used.append(key)
+        if len(self._used) >= PENDING_ENTRIES:
+            self.commit()
+        return text
+
+    def put(self, key, text):
+        self._new[key] = (text, time.time())
+        self._new_bytes += len(text)
+        if len(self._new) >= PENDING_ENTRIES or self._new_bytes >= PENDING_BYTES:
+            self.commit()
+
+    def size(self):
+        """
+            this method returns the number of bytes of text in the database
+        """
+        return self.connection.execute("SELECT value FROM totals WHERE name = 'size'").fetchone()[0]
+
+    def commit(self):
+        """
+            this method writes the new entries and the use times of the entries
+            that were read, then evicts the least recently used entries until
+            the cache is no larger than max_bytes
+        """
+        new, self._new = self._new, {}
+        self._new_bytes = 0
+        used, self._used = self._used, []
+        if not new and not used:
+            return
+
+        now = time.time()
+        try:
+            with self.connection:
+                # a body's key is a hash of its bytes, so an existing row already has the same text
+                self.connection.executemany('INSERT OR IGNORE INTO bodies VALUES (?, ?, ?)',
+                                            ((key, text, put) for key, (text, put) in new.items()))
+                self.connection.executemany('UPDATE bodies SET used = ? WHERE key = ?', ((now, key) for key in used))
+
+                total = self.size()
+                if total > self.max_bytes:
+                    evicted = []
+                    for key, size in self.connection.execute('SELECT key, LENGTH(text) FROM bodies ORDER BY used'):
+                        if total <= self.max_bytes:
+                            break
+                        evicted.append((key,))
+                        total -= size
+                    self.connection.executemany('DELETE FROM bodies WHERE key = ?', evicted)
+        except self._errors:
+            # the database is locked or read-only: the text has already been
+            # rendered, so only this run's additions to the cache are lost
+            pass
+
+    def close(self):
+        self.commit()
+        self.connection.close()
+
+def open_function_cache(path=None, max_bytes=DEFAULT_FUNCTION_CACHE_SIZE):
+    """
+        this method returns a FunctionCache, or None if its database cannot be
+        opened, in which case bodies are rendered without a cache
+    """
+    import sqlite3
+
+    try:
+        return FunctionCache(path, max_bytes)
+    except sqlite3.OperationalError:
+        return None
@@ -23,6 +23,10 @@ EXTERNAL_KIND_TABLE = {
 
 END_OPCODE = 0x0b
 
+# The version of the disassembler's text output. It is part of every cache key,
+# so it has to be bumped whenever a change alters the text that is produced.
+DISASSEMBLER_VERSION = '6'
+
 """
 Source: https://github.com/WebAssembly/website/blob/d7592a9b46729d1a76e72f73624fbe8bd5ad1caa/docs/design/BinaryEncoding.md#high-level-structure
 """
@@ -40,6 +44,12 @@ SECTION_IDS = {
     'data'       : 11
 }
 
+# The magic number every module starts with, followed by a 4-byte version.
+WASM_MAGIC = b'\x00asm'
+
+# The name of each section, by section id.
+SECTION_NAMES = {section_id : name for name, section_id in SECTION_IDS.items()}
+
 """
 Source: https://github.com/WebAssembly/design/blob/master/BinaryEncoding.md#control-flow-operators-described-here
 """
@@ -47,3 +47,141 @@ def leb128_to_int(num, signed=False):
                 return_value.append(value)
     return return_value
 
+
+def read_uleb128(buf, offset):
+    """
+        Parameters:
+        buf      buffer (bytes, bytearray or memoryview) holding the encoded value
+        offset   index of the first byte of the encoded value
+
+        Return value
+        tuple of the decoded unsigned integer and the index just past it
+
+        Example:
+        >>> read_uleb128(b'\x00\xe5\x8e\x26', 1)
+        (624485, 4)
+    """
+    byte = buf[offset]
+    if byte < 0x80:
+        return byte, offset + 1
+
+    value = byte & 0x7F
+    shift = 7
+    while True:
+        offset += 1
+        byte = buf[offset]
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset + 1
+        shift += 7
+
+def read_sleb128(buf, offset):
+    """
+        Parameters:
+        buf      buffer (bytes, bytearray or memoryview) holding the encoded value
+        offset   index of the first byte of the encoded value
+
+        Return value
+        tuple of the decoded signed integer and the index just past it
+
+        Example:
+        >>> read_sleb128(b'\xe4\x00', 0)
+        (100, 2)
+    """
+    byte = buf[offset]
+    if byte < 0x40:
+        return byte, offset + 1
+    if byte < 0x80:
+        return byte - 0x80, offset + 1
+
+    value = byte & 0x7F
+    shift = 7
+    while True:
+        offset += 1
+        byte = buf[offset]
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            if byte & 0x40:
+                value -= 1 << shift
+            return value, offset + 1
+
+def decode_uleb128_array(buf, offset, count):
+    """
+        Parameters:
+        buf      buffer (bytes, bytearray or memoryview) holding the encoded values
+        offset   index of the first byte of the first encoded value
+        count    number of values to decode
+
+        Return value
+        tuple of the list of decoded unsigned integers and the index just past them
+
+        Example:
+        >>> decode_uleb128_array(b'\x01\x80\x01\x03', 0, 3)
+        ([1, 128, 3], 4)
+    """
+    values = []
+    append = values.append
+    for i in range(count):
+        byte = buf[offset]
+        if byte < 0x80:
+            append(byte)
+            offset += 1
+        else:
+            value, offset = read_uleb128(buf, offset)
+            append(value)
+    return values, offset
+
+# The bytes a data string can hold as they are: printable ASCII other than the
+# quote and the backslash. Every other byte is written as a backslash followed
+# by two lowercase hex digits, the way wasm2wat writes them.
+DATA_PRINTABLE = bytes(c for c in range(0x20, 0x7f) if c not in (0x22, 0x5c))
+
+# The text of each byte in a data string, indexed by the byte.
+DATA_ESCAPES = [chr(c) if c in DATA_PRINTABLE else '\\{:02x}'.format(c) for c in range(256)]
+
+def escape_data(data):
+    """
+        Parameters:
+        data     buffer (bytes, bytearray or memoryview) holding the bytes of a data segment
+
+        Return value
+        the text of the bytes inside a WAT data string, with every byte that is
+        not printable written as an escape
+
+        Example:
+        >>> escape_data(b'hi\n"')
+        'hi\\0a\\22'
+    """
+    data = bytes(data)
+    escaped = data.translate(None, DATA_PRINTABLE)
+    if len(escaped) == 0:
+        return data.decode('ascii')
+
+    # Text with a few kinds of escapes is rewritten with one bulk replace per
+    # kind; the backslash goes first, as every escape adds one.
+    kinds = []
+    while len(escaped) > 0 and len(kinds) <= 8:
+        kinds.append(escaped[0])
+        escaped = escaped.replace(escaped[:1], b'')
+    if len(escaped) == 0:
+        text = data.replace(b'\\', b'\\5c')
+        for c in kinds:
+            if c != 0x5c:
+                text = text.replace(bytes([c]), DATA_ESCAPES[c].encode('ascii'))
+        return text.decode('ascii')
+
+    return ''.join(map(DATA_ESCAPES.__getitem__, data))
+
+# The pure-Python decoders above are the reference implementation. When the
+# optional _speedups extension has been built (scripts/build_speedups.py),
+# the compiled versions are used in their place.
+python_read_uleb128 = read_uleb128
+python_read_sleb128 = read_sleb128
+python_decode_uleb128_array = decode_uleb128_array
+python_escape_data = escape_data
+
+try:
+    from _speedups import read_uleb128, read_sleb128, decode_uleb128_array, escape_data
+except ImportError:
+    pass
@@ -2,7 +2,9 @@ from constants import *
 from type import *
 
 class ImportEntry:
-    def __init__(self, inputBytes):
+    __slots__ = ('moduleLen', 'moduleStr', 'fieldLen', 'fieldStr', 'kind', 'kindType', 'kindLen', '_size')
+
+    def __init__(self, reader):
         """
         field       type            description
         ---------------------------------------------------------
@@ -24,41 +26,43 @@ class ImportEntry:
         or, if the kind is Global:
         kindType        global_type     type of the imported global
         """
-        self.moduleLen = inputBytes[0]
-        self.moduleStr = inputBytes[1:1 + self.moduleLen].decode('utf-8')
+        start = reader.offset
+        self.moduleLen = reader.read_varuint32()
+        self.moduleStr = str(reader.read_bytes(self.moduleLen), 'utf-8')
 
-        self.fieldLen = inputBytes[1 + self.moduleLen]
-        fieldStrIndex = 2 + self.moduleLen
-        self.fieldStr = inputBytes[fieldStrIndex:fieldStrIndex + self.fieldLen].decode('utf-8')
+        self.fieldLen = reader.read_varuint32()
+        self.fieldStr = str(reader.read_bytes(self.fieldLen), 'utf-8')
 
         # kind is one of the values found in EXTERNAL_KIND_TABLE.
         # Depending on the value of kind, the kindType maybe an integer(function kind) or an array.
         # Therefore, the length (kindLen) is dependent on the kind as well.
         # For function, because it is an integer, it will be a length of 1.
         # For the remaining kind types, the length is equal to the length of the array.
-        self.kind = EXTERNAL_KIND_TABLE[inputBytes[fieldStrIndex + self.fieldLen]]
+        self.kind = EXTERNAL_KIND_TABLE[reader.read_byte()]
     
-        if self.kind is 'function':
-            self.kindType = inputBytes[fieldStrIndex + self.fieldLen + 1]
+        if self.kind == 'function':
+            self.kindType = reader.read_varuint32()
             self.kindLen = 1
 
-        elif self.kind is 'table':
-            self.kindType = TableType(inputBytes[fieldStrIndex + self.fieldLen + 1])
-            self.kindLen = kindType.size()
+        elif self.kind == 'table':
+            self.kindType = TableType(reader)
+            self.kindLen = self.kindType.size()
 
-        elif self.kind is 'memory':
-            self.kindType = MemoryType(inputBytes[fieldStrIndex + self.fieldLen + 1])
-            self.kindLen = kindType.size()
+        elif self.kind == 'memory':
+            self.kindType = MemoryType(reader)
+            self.kindLen = self.kindType.size()
 
-        elif self.kind is 'global':
-            self.kindType = GlobalType(inputBytes[fieldStrIndex + self.fieldLen + 1])
-            self.kindLen = kindType.size()
+        elif self.kind == 'global':
+            self.kindType = GlobalType(reader)
+            self.kindLen = self.kindType.size()
 
         else:
             raise ValueError('Invalid kind type')
 
+        self._size = reader.offset - start
+
     def size(self):
-        return 3 + self.moduleLen + self.fieldLen + self.kindLen
+        return self._size
 
     def to_str(self):
         return 'ImportEntry: (module: {}, field: {}, kind_value: {})'.format(self.moduleStr, self.fieldStr, self.kindType)
@@ -69,62 +73,35 @@ class ExportEntry:
     ---------------------------------------------------------
     exportNameLen  varuint32       length of moduleStr in bytes
     exportNameStr  bytes           export name: valid UTF-8 byte sequence
-    kind           external_kind   the kind of definition being imported
-    funcIndex      varuint32       the index of the exported function
-
-    Followed by, if the kind is Function:
-    kindType       varuint32       type index of the function signature
-
-    or, if the kind is Table:
-    kindType       table_type      type of the exported table
-
-    or, if the kind is Memory:
-    kindType       memory_type     type of the exported memory
+    kind           external_kind   the kind of definition being exported
+    kindType       varuint32       the index of the exported function, table,
+                                   memory or global, in the index space of its kind
+    """
+    __slots__ = ('exportNameLen', 'exportNameStr', 'kind', 'kindType', 'kindLen', '_size')
 
-    or, if the kind is Global:
-    kindType       global_type     type of the exported global
+    def __init__(self, reader):
+        start = reader.offset
 
-    kindLen        varuint32       length of data dependent on kind type
-    """
-    def __init__(self, inputBytes):
-        # the length of the name is the first byte
-        self.exportNameLen = inputBytes[0]
+        # the length of the name is the first varuint32
+        self.exportNameLen = reader.read_varuint32()
 
         # the name is the next n bytes, where n is the length
-        self.exportNameStr = inputBytes[1:1 + self.exportNameLen].decode('utf-8')
+        self.exportNameStr = str(reader.read_bytes(self.exportNameLen), 'utf-8')
 
         # the kind is the next byte
-        self.kind = EXTERNAL_KIND_TABLE[inputBytes[1 + self.exportNameLen]]
+        self.kind = EXTERNAL_KIND_TABLE[reader.read_byte()]
 
-        # kind is one of the values found in EXTERNAL_KIND_TABLE.
-        # Depending on the value of kind, the kindType maybe an integer(function kind) or an array.
-        # Therefore, the length (kindLen) is dependent on the kind as well.
-        # For function, because it is an integer, it will be a length of 1.
-        # For the remaining kind types, the length is equal to the length of the array.
-        if self.kind is 'function':
-            self.kindType = inputBytes[1 + self.exportNameLen + 1]
-            self.kindLen = 1
-
-        elif self.kind is 'table':
-            # TODO: create table type
-            self.kindType = None
-            self.kindLen = 0
-
-        elif self.kind is 'memory':
-            # TODO: create memory type
-            self.kindType = None
-            self.kindLen = 0
+        if self.kind not in ('function', 'table', 'memory', 'global'):
+            raise ValueError('Invalid kind type')
 
-        elif self.kind is 'global':
-            # TODO: create global type
-            self.kindType = None
-            self.kindLen = 0
+        # every kind is exported by its index
+        self.kindType = reader.read_varuint32()
+        self.kindLen = 1
 
-        else:
-            raise ValueError('Invalid kind type')
+        self._size = reader.offset - start
 
     def size(self):
-        return 3 + self.exportNameLen
+        return self._size
 
     def to_str(self):
         return 'ExportEntry: (export: {}, kind value: {})'.format(self.exportNameStr, self.kindType)
@@ -140,9 +117,11 @@ class GlobalEntry:
 
     NOTE: in the MVP, only immutable global variables can be exported.
     """
-    def __init__(self, inputBytes):
-        self.type = GlobalType(inputBytes)
-        self.initial_expr = InitExpr(inputBytes[self.type.size():])
+    __slots__ = ('type', 'initial_expr')
+
+    def __init__(self, reader):
+        self.type = GlobalType(reader)
+        self.initial_expr = InitExpr(reader)
 
     def size(self):
         return self.type.size() + self.initial_expr.size()
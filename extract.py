@@ -0,0 +1,119 @@
+import argparse
+import json
+import os
+import sys
+
+from main import parseFile
+from module import Module
+from section import *
+
+def data_segments(module):
+    """
+        this method parses the data section of the module, and nothing else
+
+        = Parameters =
+        module   : Module             = the module to read
+
+        = Return Value =
+        segments : (DataSegment, int)[] = each data segment and the index of
+                                          its payload in the module
+    """
+    header = module.headers.get(SECTION_IDS['data'])
+    if header is None:
+        return []
+
+    section = header.section(module.buffer)
+    return [(segment, section.dataOffset + segment.dataOffset) for segment in DataSection(section).dataSegs]
+
+def segment_record(index, segment, file_offset):
+    """
+        this method returns the metadata written to the sidecar JSON for one
+        data segment
+    """
+    return {
+        'segment': index,
+        'memory': segment.index,
+        'offset': segment.offset_expr.to_str(),
+        'size': segment.dataSize,
+        'file_offset': file_offset
+    }
+
+def write_data(filename, stream, segments=None):
+    """
+        this method writes the payload of the data segments to the stream as raw
+        bytes, straight from a memory mapping of the module
+
+        = Parameters =
+        filename : str    = the .wasm file to read
+        stream   : file   = any binary stream with a write(bytes) method
+        segments : int[]  = only write the segments at these indices
+
+        = Return Value =
+        records  : dict[] = the metadata of each segment written
+    """
+    module = Module(parseFile(filename, use_mmap=True))
+    records = []
+    for index, (segment, file_offset) in enumerate(data_segments(module)):
+        if segments is not None and index not in segments:
+            continue
+        stream.write(segment.data)
+        records.append(segment_record(index, segment, file_offset))
+    return records
+
+def extract_data(filename, out_dir, segments=None):
+    """
+        this method writes the payload of each data segment of the module to its
+        own file, along with a sidecar JSON file describing them
+
+        = Parameters =
+        filename : str    = the .wasm file to read
+        out_dir  : str    = the directory the files are written to
+        segments : int[]  = only extract the segments at these indices
+
+        = Return Value =
+        records  : dict[] = the metadata of each segment written, including
+                            the file it was written to
+    """
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    os.makedirs(out_dir, exist_ok=True)
+
+    module = Module(parseFile(filename, use_mmap=True))
+    records = []
+    for index, (segment, file_offset) in enumerate(data_segments(module)):
+        if segments is not None and index not in segments:
+            continue
+        path = os.path.join(out_dir, '{}.data{}.bin'.format(stem, index))
+        with open(path, 'wb') as output:
+            output.write(segment.data)
+        record = segment_record(index, segment, file_offset)
+        record['output'] = path
+        records.append(record)
+
+    with open(os.path.join(out_dir, '{}.data.json'.format(stem)), 'w') as sidecar:
+        json.dump({'input': filename, 'segments': records}, sidecar, indent=2)
+        sidecar.write('\n')
+    return records
+
+# code that's only executed if this file itself is run
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Extract the data segments of a .wasm file')
+    parser.add_argument('filename', help='the .wasm file to read')
+    parser.add_argument('--out-dir', '-o',
+                        help='write each segment to <module>.data<N>.bin in this directory, '
+                             'with the metadata in <module>.data.json (default: raw bytes to stdout)')
+    parser.add_argument('--segment', '-s', type=int, action='append',
+                        help='only extract the segment at this index (repeatable)')
+    parser.add_argument('--metadata',
+                        help='when writing to stdout, write the metadata JSON to this file')
+    args = parser.parse_args()
+
+    if args.out_dir is not None:
+        extract_data(args.filename, args.out_dir, args.segment)
+    else:
+        records = write_data(args.filename, sys.stdout.buffer, args.segment)
+        sys.stdout.buffer.flush()
+        if args.metadata is not None:
+            with open(args.metadata, 'w') as sidecar:
+                json.dump({'input': args.filename, 'segments': records}, sidecar, indent=2)
+                sidecar.write('\n')
@@ -0,0 +1,201 @@
+import argparse
+import hashlib
+import io
+import json
+import sys
+
+from main import SECTION_CLASSES, TEXT_SECTION_ORDERING, ModuleWriter, parseFile
+from section import *
+
+def _digest(data):
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+class RenderedBodies:
+    """ This class keeps the rendered text of function bodies by the hash of
+    their bytes, with the same interface as cache.FunctionCache, so that
+    CodeSection.write_to only decodes bodies it has not seen before
+
+    Attributes:
+        texts   : dict  =  body hash -> rendered text
+        decoded : int   =  the number of bodies that had to be rendered
+    """
+    def __init__(self, texts=None):
+        self.texts = dict(texts or {})
+        self.decoded = 0
+
+    def key(self, body):
+        return _digest(body)
+
+    def get(self, key):
+        return self.texts.get(key)
+
+    def put(self, key, text):
+        self.decoded += 1
+        self.texts[key] = text
+
+class ModuleState:
+    """ This class is the parsed and rendered state of one build of a module
+
+    It is what a later build is compared against: the hash of every section's
+    bytes, the rendered text of every section except the code section, and
+    the rendered text of every function body keyed by the hash of its bytes.
+
+    Attributes:
+        binary          : bytes-like    =  the bytes of the module
+        section_hashes  : dict          =  section id -> hash of its bytes
+        section_texts   : dict          =  section id -> rendered text
+        function_keys   : bytes[]       =  hash of each function body's bytes
+        function_headers: str[]         =  the '(func ...' line of each function
+        bodies          : RenderedBodies=  rendered body text by body hash
+        reparsed        : str[]         =  sections that were parsed for this build
+        decoded         : int           =  function bodies decoded for this build
+    """
+    def __init__(self, binary, previous=None):
+        self.binary = binary
+        sectionList = makeSectionList(Reader(binary, 8))
+
+        self.section_hashes = {}
+        for idx in range(1, len(sectionList)):
+            if sectionList[idx] is not None:
+                # the whole section, as the count is not part of data (and is
+                # all there is to the start section)
+                self.section_hashes[idx] = _digest(sectionList[idx].sectionBytes)
+
+        changed = set(self.section_hashes)
+        if previous is not None:
+            changed = set(idx for idx, digest in self.section_hashes.items()
+                          if previous.section_hashes.get(idx) != digest)
+
+        # The code section is rendered from the sections it depends on, so
+        # those are parsed whenever there is code, changed or not.
+        code_id = SECTION_IDS['code']
+        needed = set(changed)
+        if code_id in self.section_hashes:
+            needed |= required_sections([code_id])
+
+        self.reparsed = []
+        for idx, section_class in enumerate(SECTION_CLASSES):
+            if idx + 1 in needed and sectionList[idx + 1] is not None:
+                sectionList[idx + 1] = section_class(sectionList[idx + 1], sectionList)
+                self.reparsed.append(SECTION_NAMES[idx + 1])
+
+        self.section_texts = {}
+        for idx in self.section_hashes:
+            if idx == code_id:
+                continue
+            if idx in changed:
+                self.section_texts[idx] = sectionList[idx].to_str()
+            else:
+                self.section_texts[idx] = previous.section_texts[idx]
+
+        self.bodies = RenderedBodies(previous.bodies.texts if previous is not None else None)
+        self.function_keys = []
+        self.function_headers = []
+        if code_id in self.section_hashes:
+            code = sectionList[code_id]
+            for i in range(code.count):
+                self.function_keys.append(self.bodies.key(code.body_bytes(i)))
+                sig_idx = code.function_sig_idx[i]
+                signature = code.function_signatures[sig_idx]
+                self.function_headers.append('(type $t{}) {}'.format(sig_idx, signature.to_str(named_params=True)))
+
+            # render once so that every body this build needs is in self.bodies
+            code.function_cache = self.bodies
+            self.section_texts[code_id] = code.to_str()
+
+        # only keep the bodies this build uses, so old builds do not pile up
+        used = set(self.function_keys)
+        self.bodies.texts = {key: text for key, text in self.bodies.texts.items() if key in used}
+        self.decoded = self.bodies.decoded
+
+    def write_to(self, stream):
+        """
+            this method writes the full text format of the module to the stream
+        """
+        writer = ModuleWriter(stream)
+        for idx in TEXT_SECTION_ORDERING:
+            if idx in self.section_texts:
+                writer.write(self.section_texts[idx])
+        writer.close()
+
+    def to_str(self):
+        output = io.StringIO()
+        self.write_to(output)
+        return output.getvalue()
+
+def diff_states(previous, current):
+    """
+        this method compares two builds of a module section by section and
+        function by function
+
+        = Parameters =
+        previous : ModuleState = the earlier build
+        current  : ModuleState = the later build
+
+        = Return Value =
+        diff     : dict        = the added, removed and changed sections (by
+                                 name) and functions (by index), with the old
+                                 and new text of every changed function
+    """
+    def names(ids):
+        return [SECTION_NAMES[idx] for idx in sorted(ids)]
+
+    old_ids = set(previous.section_hashes)
+    new_ids = set(current.section_hashes)
+    diff = {
+        'sections': {
+            'added': names(new_ids - old_ids),
+            'removed': names(old_ids - new_ids),
+            'changed': names(idx for idx in old_ids & new_ids
+                             if previous.section_hashes[idx] != current.section_hashes[idx])
+        },
+        'functions': {
+            'added': list(range(len(previous.function_keys), len(current.function_keys))),
+            'removed': list(range(len(current.function_keys), len(previous.function_keys))),
+            'changed': []
+        }
+    }
+
+    for i in range(min(len(previous.function_keys), len(current.function_keys))):
+        if (previous.function_keys[i] != current.function_keys[i] or
+                previous.function_headers[i] != current.function_headers[i]):
+            diff['functions']['changed'].append({
+                'index': i,
+                'old': '(func {}\n{})'.format(previous.function_headers[i], previous.bodies.texts[previous.function_keys[i]]),
+                'new': '(func {}\n{})'.format(current.function_headers[i], current.bodies.texts[current.function_keys[i]])
+            })
+
+    return diff
+
+def redisassemble(previous, binary):
+    """
+        this method parses a new build of a module, re-parsing and re-rendering
+        only the sections and function bodies whose bytes changed since the
+        previous build
+
+        = Parameters =
+        previous : ModuleState = the state of the previous build, or None
+        binary   : bytes-like  = the bytes of the new build
+
+        = Return Value =
+        state    : ModuleState = the state of the new build
+    """
+    return ModuleState(binary, previous)
+
+# code that's only executed if this file itself is run
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Disassemble a new build of a module, reusing the work done for the old one')
+    parser.add_argument('old', help='the previous build of the module')
+    parser.add_argument('new', help='the new build of the module')
+    parser.add_argument('--diff', action='store_true', help='print a JSON diff instead of the full text of the new build')
+    args = parser.parse_args()
+
+    previous = redisassemble(None, parseFile(args.old, use_mmap=True))
+    current = redisassemble(previous, parseFile(args.new, use_mmap=True))
+
+    if args.diff:
+        json.dump(diff_states(previous, current), sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        current.write_to(sys.stdout)
@@ -1,42 +1,50 @@
+import argparse
+import io
+import json
+import mmap
+import os
 import sys
 
 from section import *
 
-# The main section thats may be found in a wasm module.
-# The list is in the order of which the sections are found in the module.
-SECTION_CLASSES = [
-    TypeSection,
-    ImportSection,
-    FunctionSection,
-    TableSection,
-    MemorySection,
-    GlobalSection,
-    ExportSection,
-    StartSection,
-    ElementSection,
-    CodeSection,
-    DataSection
-]
-
 # The order in which each section is translated into text may not be the same ordering
 # in which they appear in the binary format.
 TEXT_SECTION_ORDERING = [ 1, 2, 3, 6, 10, 5, 4, 11, 7, 9, 8 ]
 
-def parseFile(filename):
+# The formats a module can be written in: the text format, one JSON document,
+# or newline-delimited JSON with one record per function.
+OUTPUT_FORMATS = ['text', 'json', 'ndjson']
+
+def parseFile(filename, use_mmap=False):
     """
         this method reads the file associated with the filename and returns
         an array of bytes
 
         = Parameters = 
         filename    : str        = the name of the file we want to parse
+        use_mmap    : bool       = map the file into memory instead of reading it
+                                   into the heap
 
         = Return Value =
-        binaryArray : bytearray  = the array of bytes from the file
+        binaryArray : bytearray  = the array of bytes from the file, or a
+                                   read-only memoryview of the mapped file
+                                   when use_mmap is set
     """
 
     # the file object from opening the file
     wasmFile = open(filename, "rb")
 
+    if use_mmap:
+        try:
+            # the mapping stays alive for as long as a view onto it exists,
+            # so the file itself can be closed straight away
+            binaryArray = memoryview(mmap.mmap(wasmFile.fileno(), 0, access=mmap.ACCESS_READ))
+        except ValueError:
+            # empty files cannot be mapped
+            binaryArray = memoryview(b'')
+        wasmFile.close()
+        return binaryArray
+
     # the binary array obtained from reading the file stream
     binaryArray = bytearray(wasmFile.read())
     wasmFile.close()
@@ -44,19 +52,229 @@ def parseFile(filename):
     # return the binary array
     return binaryArray
 
-def disassemble(filename):
+class ModuleWriter:
+    """ This class wraps a stream so that sections can be written into the
+    '(module ...)' form as soon as they are rendered
+
+    The text of the last section has to end with ')' instead of its newline,
+    so the final newline of every write is held back until more text arrives.
+
+    Attributes:
+        stream  : file  =  the stream the text format is written to
+        started : bool  =  True once '(module' has been written
+        pending : str   =  the newline held back from the previous write
     """
-        this method disassembles the given filename's file
+    def __init__(self, stream):
+        self.stream = stream
+        self.started = False
+        self.pending = ''
+
+    def write(self, text):
+        if len(text) == 0:
+            return
+
+        if not self.started:
+            self.stream.write('(module\n')
+            self.started = True
+
+        if self.pending:
+            self.stream.write(self.pending)
+
+        if text.endswith('\n'):
+            self.stream.write(text[:-1])
+            self.pending = '\n'
+        else:
+            self.stream.write(text)
+            self.pending = ''
+
+    def close(self):
+        if self.started:
+            self.stream.write(')\n')
+        else:
+            self.stream.write('(module)\n')
+
+# The code section that each worker process renders function bodies from.
+_worker_code_section = None
+
+def _init_worker(filename):
+    """
+        this method prepares a worker process for rendering function bodies:
+        it maps the file (sharing its pages with every other worker) and
+        indexes the code section without decoding any bodies
+    """
+    global _worker_code_section
+
+    binary = parseFile(filename, use_mmap=True)
+    sectionList = makeSectionList(Reader(binary, 8))
+    for idx in sorted(required_sections([SECTION_IDS['code']])):
+        if sectionList[idx] is not None:
+            sectionList[idx] = SECTION_CLASSES[idx - 1](sectionList[idx], sectionList)
+    _worker_code_section = sectionList[SECTION_IDS['code']]
+
+def _render_functions(function_range):
+    output = io.StringIO()
+    _worker_code_section.write_to(output, *function_range)
+    return output.getvalue()
+
+def split_functions(body_sizes, chunk_count):
+    """
+        this method splits the function bodies into contiguous ranges holding
+        roughly the same number of bytes
+
+        = Parameters =
+        body_sizes  : int[]        = the size of each function body
+        chunk_count : int          = the number of ranges wanted
+
+        = Return Value =
+        ranges      : (int, int)[] = (start, stop) function index ranges
+    """
+    target = max(1, sum(body_sizes) // max(1, chunk_count))
+    ranges = []
+    start = 0
+    size = 0
+    for i, body_size in enumerate(body_sizes):
+        size += body_size
+        if size >= target:
+            ranges.append((start, i + 1))
+            start = i + 1
+            size = 0
+    if start < len(body_sizes):
+        ranges.append((start, len(body_sizes)))
+    return ranges
+
+def write_code_section_parallel(filename, codeSection, stream, jobs):
+    """
+        this method decodes and renders the function bodies of the code section
+        in a pool of `jobs` processes, writing the text to the stream in order
+    """
+    # imported here so that single-process runs do not pay for it at startup
+    import multiprocessing
+
+    # a few chunks per process keeps every process busy when body sizes vary
+    ranges = split_functions(codeSection.body_sizes, jobs * 4)
+    with multiprocessing.Pool(jobs, initializer=_init_worker, initargs=(filename,)) as pool:
+        for text in pool.imap(_render_functions, ranges):
+            stream.write(text)
+
+class TeeWriter:
+    """ This class writes the same text to two streams """
+    def __init__(self, first, second):
+        self.first = first
+        self.second = second
+
+    def write(self, text):
+        self.first.write(text)
+        self.second.write(text)
+
+def section_ids(names):
+    """
+        this method turns section names (or ids) into section ids
+
+        = Parameters =
+        names  : str[] = names from SECTION_IDS such as 'type', or section ids
+
+        = Return Value =
+        ids    : int[] = the section ids, in the order given
+    """
+    ids = []
+    for name in names:
+        if isinstance(name, int) and name in SECTION_NAMES:
+            ids.append(name)
+        elif name in SECTION_IDS:
+            ids.append(SECTION_IDS[name])
+        else:
+            raise ValueError('Unknown section: {}'.format(name))
+    return ids
+
+def section_list(value):
+    """
+        this method turns a comma-separated list of section names into section ids
+    """
+    return section_ids(value.split(','))
+
+def resolve_selection(sections=None, functions=None):
+    """
+        this method normalises the sections and functions asked for: section
+        names become sorted ids, and asking for functions alone means the code
+        section
+
+        = Return Value =
+        return : (int[], int[]) = the section ids and the function indices,
+                                  either of which is None when not restricted
+    """
+    if functions is not None:
+        functions = sorted(set(functions))
+        if sections is None:
+            sections = ['code']
+    if sections is not None:
+        sections = sorted(set(section_ids(sections)))
+    return sections, functions
+
+def disassemble_to(filename, stream, use_mmap=False, jobs=1, cache=None, function_cache=None,
+                   sections=None, functions=None, output_format='text'):
+    """
+        this method disassembles the given filename's file, writing the text
+        format to the stream section by section as it is produced
 
         = Parameters = 
-        filename : str = the name of the file we want to disassemble
+        filename : str  = the name of the file we want to disassemble
+        stream   : file = any object with a write(str) method
+        use_mmap : bool = parse straight from a memory mapping of the file
+        jobs     : int  = the number of processes rendering function bodies
+        cache    : DisassemblyCache = look the module up in this cache first,
+                                      and store its text there on a miss
+        function_cache : FunctionCache = reuse the rendered text of function
+                                         bodies whose bytes have been seen before
+                                         (single-process runs only)
+        sections : str[] = only write these sections (names or ids); the
+                           sections they depend on are parsed but not written
+        functions: int[] = only write the functions of the code section at
+                           these indices; implies sections=['code'] if no
+                           sections are given
+        output_format : str = one of OUTPUT_FORMATS, see write_records
 
         = Return Value = 
         NONE
     """
 
     # read the file and get the byte array
-    binary = parseFile(filename)
+    binary = parseFile(filename, use_mmap)
+
+    sections, functions = resolve_selection(sections, functions)
+
+    if cache is not None:
+        options = []
+        if sections is not None:
+            options.append('sections={}'.format(sections))
+        if functions is not None:
+            options.append('functions={}'.format(functions))
+        if output_format != 'text':
+            options.append('format={}'.format(output_format))
+        key = cache.key(binary, *options)
+
+        # a hit skips parsing entirely
+        if cache.copy_to(key, stream):
+            return
+
+        entry = cache.writer(key)
+        try:
+            _disassemble_binary(filename, binary, TeeWriter(stream, entry), jobs, function_cache,
+                                sections, functions, output_format)
+        except BaseException:
+            entry.abort()
+            raise
+        entry.commit()
+        return
+
+    _disassemble_binary(filename, binary, stream, jobs, function_cache, sections, functions, output_format)
+
+def _disassemble_binary(filename, binary, stream, jobs, function_cache=None, sections=None, functions=None,
+                        output_format='text'):
+    """
+        this method parses the bytes of the module and writes its text format
+        to the stream; only the sections asked for, and the ones they depend
+        on, are parsed
+    """
 
     # get the magic number
     magic = binary[0:4]
@@ -64,32 +282,173 @@ def disassemble(filename):
     # get the version number
     version = int.from_bytes(binary[4:8], byteorder='little')
 
-    # generate the section list from the remaining bytes
-    sectionList = makeSectionList(binary[8:])
+    # generate the section list from the remaining bytes, without copying them
+    sectionList = makeSectionList(Reader(binary, 8))
+
+    wanted = TEXT_SECTION_ORDERING if sections is None else sections
+    parsed = required_sections(wanted)
 
-    output = ''
     for idx, section_class in enumerate(SECTION_CLASSES):
-        if sectionList[idx + 1] is not None:
+        if sectionList[idx + 1] is not None and idx + 1 in parsed:
             sectionList[idx + 1] = section_class(sectionList[idx + 1], sectionList)
 
+    write_sections(sectionList, stream, version, sections, functions, output_format,
+                   filename, jobs, function_cache)
+
+def write_sections(sectionList, stream, version, sections=None, functions=None, output_format='text',
+                   filename=None, jobs=1, function_cache=None):
+    """
+        this method writes parsed sections to the stream in the given format
+
+        = Parameters =
+        sectionList   : Section[] = the sections, as in makeSectionList, with
+                                    every section to be written already parsed
+        stream        : file      = any object with a write(str) method
+        version       : int       = the binary format version of the module
+        sections      : int[]     = only write these sections, see resolve_selection
+        functions     : int[]     = only write the functions at these indices
+        output_format : str       = one of OUTPUT_FORMATS
+        filename      : str       = the module file, which worker processes map
+                                    when jobs > 1
+        jobs          : int       = the number of processes rendering function bodies
+        function_cache: FunctionCache = reuse the rendered text of function bodies
+    """
+    wanted = TEXT_SECTION_ORDERING if sections is None else sections
+
+    if functions is not None and sectionList[SECTION_IDS['code']] is not None:
+        count = sectionList[SECTION_IDS['code']].count
+        for i in functions:
+            if not 0 <= i < count:
+                raise ValueError('Function index out of range: {}'.format(i))
 
+    if output_format != 'text':
+        write_records(sectionList, stream, output_format, version, wanted, functions)
+        return
+
+    writer = ModuleWriter(stream)
     for idx in TEXT_SECTION_ORDERING:
-        if sectionList[idx] is not None:
-            output += sectionList[idx].to_str()
+        if sectionList[idx] is None or idx not in wanted:
+            continue
+        if idx == SECTION_IDS['code'] and functions is not None:
+            sectionList[idx].function_cache = function_cache
+            for i in functions:
+                sectionList[idx].write_to(writer, i, i + 1)
+            if function_cache is not None:
+                function_cache.commit()
+        elif idx == SECTION_IDS['code'] and jobs > 1:
+            write_code_section_parallel(filename, sectionList[idx], writer, jobs)
+        elif idx == SECTION_IDS['code'] and function_cache is not None:
+            sectionList[idx].function_cache = function_cache
+            sectionList[idx].write_to(writer)
+            function_cache.commit()
+        else:
+            sectionList[idx].write_to(writer)
+    writer.close()
+
+def write_records(sectionList, stream, output_format, version, sections, functions=None):
+    """
+        this method writes the parsed module as JSON, streaming one function
+        record at a time
+
+        = Parameters =
+        sectionList   : Section[] = the parsed sections, as in makeSectionList
+        stream        : file      = any object with a write(str) method
+        output_format : str       = 'json' for one document with the sections
+                                    and a list of functions, or 'ndjson' for a
+                                    module record followed by one line per function
+        version       : int       = the binary format version of the module
+        sections      : int[]     = the ids of the sections to write
+        functions     : int[]     = only write the functions at these indices
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError('Unknown output format: {}'.format(output_format))
+
+    module = {'version': version, 'sections': {}}
+    for idx in range(1, len(sectionList)):
+        if sectionList[idx] is not None and idx in sections and idx != SECTION_IDS['code']:
+            module['sections'][SECTION_NAMES[idx]] = sectionList[idx].to_record()
+    if sectionList[0]:
+        module['custom_sections'] = [section.to_record() for section in sectionList[0]]
+
+    code = sectionList[SECTION_IDS['code']] if SECTION_IDS['code'] in sections else None
+    indices = []
+    if code is not None:
+        indices = functions if functions is not None else range(code.count)
 
-    if len(output) == 0:
-        output = '(module)\n'
-    else:
-        output = '(module\n' + output[:-1] + ')\n'
+    if output_format == 'ndjson':
+        stream.write(json.dumps(dict(record='module', **module)) + '\n')
+        for i in indices:
+            stream.write(json.dumps(dict(record='function', **code.function_record(i))) + '\n')
+        return
 
-    return output
+    # the functions are written one at a time inside the module object
+    stream.write(json.dumps(module)[:-1] + ', "functions": [')
+    for n, i in enumerate(indices):
+        stream.write((',\n' if n > 0 else '\n') + json.dumps(code.function_record(i)))
+    stream.write(']}\n')
+
+def disassemble(filename, use_mmap=False, jobs=1, cache=None, function_cache=None,
+                sections=None, functions=None, output_format='text'):
+    """
+        this method disassembles the given filename's file
+
+        = Parameters = 
+        filename : str  = the name of the file we want to disassemble
+        use_mmap : bool = parse straight from a memory mapping of the file
+        jobs     : int  = the number of processes rendering function bodies
+        cache    : DisassemblyCache = look the module up in this cache first,
+                                      and store its text there on a miss
+        function_cache : FunctionCache = reuse the rendered text of function
+                                         bodies whose bytes have been seen before
+        sections : str[] = only write these sections (names or ids)
+        functions: int[] = only write the functions at these indices
+        output_format : str = one of OUTPUT_FORMATS
+
+        = Return Value = 
+        output   : str  = the text format of the module, or its JSON
+    """
+    output = io.StringIO()
+    disassemble_to(filename, output, use_mmap, jobs, cache, function_cache, sections, functions, output_format)
+    return output.getvalue()
 
 # code that's only executed if this file itself is run
 if __name__ == '__main__':
 
-    # get the filename
-    wasmFileName = sys.argv[1]
+    parser = argparse.ArgumentParser(description='Disassemble a .wasm file into the text format')
+    parser.add_argument('filename', help='the .wasm file to disassemble')
+    parser.add_argument('--mmap', action='store_true',
+                        help='memory-map the file instead of reading it into memory')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help='decode and render function bodies in this many processes')
+    parser.add_argument('--cache-dir',
+                        help='cache the text of each module in this directory (default: ~/.cache/wasm-disassembler)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='neither read from nor write to the cache')
+    parser.add_argument('--only', metavar='SECTIONS', type=section_list,
+                        help='only disassemble these comma-separated sections, e.g. type,import,export')
+    parser.add_argument('--skip', metavar='SECTIONS', type=section_list,
+                        help='disassemble every section except these comma-separated sections')
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='text',
+                        help='write the text format, one JSON document, or one JSON record per function')
+    parser.add_argument('--func', metavar='INDEX', type=int, action='append',
+                        help='only disassemble the function at this index of the code section (repeatable)')
+    args = parser.parse_args()
+
+    sections = args.only
+    if args.skip:
+        sections = [idx for idx in (sections or TEXT_SECTION_ORDERING) if idx not in args.skip]
+
+    cache = None
+    function_cache = None
+    if not args.no_cache:
+        from cache import DisassemblyCache, open_function_cache
+        cache = DisassemblyCache(args.cache_dir)
+        function_cache = open_function_cache(os.path.join(cache.directory, 'functions.sqlite3'))
+
+    # disassemble the file, writing the text format as it is produced
+    disassemble_to(args.filename, sys.stdout, use_mmap=args.mmap, jobs=args.jobs,
+                   cache=cache, function_cache=function_cache,
+                   sections=sections, functions=args.func, output_format=args.format)
 
-    # disassemble the file
-    results = disassemble(wasmFileName)
-    sys.stdout.write(results)
+    if function_cache is not None:
+        function_cache.close()
@@ -0,0 +1,143 @@
+from section import *
+
+class Module:
+    """ This class is a .wasm module that is only parsed as far as it is used
+
+    Building a module only walks the section headers; each section is parsed
+    the first time it is asked for, along with the sections it depends on.
+
+    Attributes:
+        buffer  : memoryview      =  the bytes of the whole module
+        version : int             =  the binary format version
+        index   : SectionHeader[] =  every section of the module, in module order
+        headers : dict            =  section id -> SectionHeader of the known sections
+        custom_sections : CustomSection[] = the name and payload range of
+                                            every custom section, in module order
+    """
+    def __init__(self, binary):
+        self.index = index_sections(binary)
+        self.buffer = memoryview(binary) if not isinstance(binary, memoryview) else binary
+        self.version = int.from_bytes(self.buffer[4:8], byteorder='little')
+
+        self.headers = {}
+        self.custom_sections = []
+        for header in self.index:
+            if header.id == 0:
+                self.custom_sections.append(CustomSection(header.section(self.buffer)))
+            elif header.id < 12:
+                self.headers[header.id] = header
+
+        # custom sections take the first slot, as in makeSectionList
+        self._sections = [None] * 12
+        self._sections[0] = self.custom_sections
+        self._names = None
+
+    def has_section(self, section_id):
+        return section_id in self.headers
+
+    def count(self, section_id):
+        """
+            this method returns the entry count of the section with the given id
+            without parsing it, or 0 if the module has no such section
+        """
+        header = self.headers.get(section_id)
+        return header.count if header is not None else 0
+
+    def section(self, section_id):
+        """
+            this method returns the parsed section with the given id, parsing it
+            and the sections it depends on the first time it is asked for
+
+            = Parameters =
+            section_id : int     = the id of the section, see SECTION_IDS
+
+            = Return Value =
+            return     : Section = the parsed section, or None if the module
+                                   has no such section
+        """
+        if self._sections[section_id] is None and section_id in self.headers:
+            for dependency in SECTION_DEPENDENCIES.get(section_id, []):
+                self.section(dependency)
+            section_class = SECTION_CLASSES[section_id - 1]
+            self._sections[section_id] = section_class(self.headers[section_id].section(self.buffer), self._sections)
+        return self._sections[section_id]
+
+    def custom_section(self, name):
+        """
+            this method returns the first custom section with the given name, or None
+        """
+        return find_custom_section(self._sections, name)
+
+    @property
+    def names(self):
+        """
+            the NameSection of the module, or None if it has none
+        """
+        if self._names is None:
+            section = self.custom_section('name')
+            if section is not None:
+                self._names = NameSection(section)
+        return self._names
+
+    def locate(self, offset):
+        """
+            this method maps a byte offset in the module, such as one from a
+            crash report, to the function and instruction it falls in; only the
+            function found is decoded
+
+            = Parameters =
+            offset : int        = the index of a byte in the module
+
+            = Return Value =
+            return : (int, int) = the index of the function in the function
+                                  index space (imported functions first) and the
+                                  index of the instruction starting at or before
+                                  the offset, see CodeSection.locate; None if
+                                  the offset is not inside a function body
+        """
+        code = self.section(SECTION_IDS['code'])
+        if code is None:
+            return None
+
+        found = code.locate(offset - code.dataOffset)
+        if found is None:
+            return None
+        return code.imported_function_count + found[0], found[1]
+
+    def parsed_sections(self):
+        """
+            this method returns the section list of the sections parsed so far,
+            in the same layout as makeSectionList
+        """
+        return self._sections
+
+    def imported_function_count(self):
+        if not self.has_section(SECTION_IDS['import']):
+            return 0
+        return sum(1 for entry in self.section(SECTION_IDS['import']).entries if entry.kind == 'function')
+
+    def function_count(self):
+        """
+            this method returns the number of functions in the module, imported
+            functions included
+        """
+        return self.imported_function_count() + self.count(SECTION_IDS['function'])
+
+    def exports(self):
+        """
+            this method returns the exports of the module, reading only the
+            export section
+
+            = Return Value =
+            return : tuple[] = (name, kind, index) of each export
+        """
+        header = self.headers.get(SECTION_IDS['export'])
+        if header is None:
+            return []
+
+        reader = Reader(header.section(self.buffer).data)
+        exports = []
+        for i in range(header.count):
+            entry = ExportEntry(reader)
+            exports.append((entry.exportNameStr, entry.kind, entry.kindType))
+        return exports
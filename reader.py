@@ -0,0 +1,118 @@
+from conversions import *
+
+class Reader:
+    """ This class is a cursor over a single memoryview of a .wasm module
+
+    Every parser advances the same reader by offset instead of slicing the
+    remaining bytes off the input, so the module is never copied while parsing.
+
+    Attributes:
+        buffer : memoryview  =  the bytes of the whole module (shared, never copied)
+        offset : int         =  the index of the next byte to be read
+        end    : int         =  the index one past the last byte this reader may read
+    """
+    def __init__(self, data, offset=0, end=None):
+        if isinstance(data, memoryview):
+            self.buffer = data
+        else:
+            self.buffer = memoryview(data)
+        self.offset = offset
+        self.end = len(self.buffer) if end is None else end
+
+    def eof(self):
+        """
+            this method returns True if there are no more bytes left to read
+        """
+        return self.offset >= self.end
+
+    def remaining(self):
+        """
+            this method returns the number of bytes left to read
+        """
+        return self.end - self.offset
+
+    def peek_byte(self):
+        """
+            this method returns the next byte without advancing the reader
+        """
+        if self.offset >= self.end:
+            raise IndexError('read past the end of the buffer')
+        return self.buffer[self.offset]
+
+    def read_byte(self):
+        """
+            this method returns the next byte and advances the reader past it
+        """
+        if self.offset >= self.end:
+            raise IndexError('read past the end of the buffer')
+        value = self.buffer[self.offset]
+        self.offset += 1
+        return value
+
+    def read_varuint32(self):
+        """
+            this method decodes the next unsigned LEB128 value and advances the reader past it
+        """
+        value, self.offset = read_uleb128(self.buffer, self.offset)
+        return value
+
+    def read_varint32(self):
+        """
+            this method decodes the next signed LEB128 value and advances the reader past it
+        """
+        value, self.offset = read_sleb128(self.buffer, self.offset)
+        return value
+
+    read_varint64 = read_varint32
+
+    def read_varuint32_array(self, count):
+        """
+            this method decodes the next `count` unsigned LEB128 values and
+            advances the reader past them
+
+            = Parameters =
+            count  : int   = the number of values to decode
+
+            = Return Value =
+            return : int[] = the decoded values
+        """
+        values, self.offset = decode_uleb128_array(self.buffer, self.offset, count)
+        return values
+
+    def read_bytes(self, length):
+        """
+            this method returns the next `length` bytes as a memoryview slice of
+            the underlying buffer (no copy) and advances the reader past them
+
+            = Parameters =
+            length : int        = the number of bytes to read
+
+            = Return Value =
+            return : memoryview = a view onto the bytes that were read
+        """
+        start = self.offset
+        stop = min(start + length, self.end)
+        self.offset = stop
+        return self.buffer[start:stop]
+
+    def skip(self, length):
+        """
+            this method advances the reader by `length` bytes
+        """
+        self.offset = min(self.offset + length, self.end)
+
+    def sub_reader(self, length):
+        """
+            this method returns a new reader limited to the next `length` bytes
+            and advances this reader past them
+
+            = Parameters =
+            length : int    = the number of bytes the new reader may read
+
+            = Return Value =
+            return : Reader = a reader sharing this reader's buffer
+        """
+        start = self.offset
+        stop = min(start + length, self.end)
+        self.offset = stop
+        return Reader(self.buffer, start, stop)
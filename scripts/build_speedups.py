@@ -0,0 +1,19 @@
+import os, tempfile
+from setuptools import setup, Extension
+
+# Builds the optional _speedups C extension next to the other modules.
+# usage: python scripts/build_speedups.py
+#
+# The disassembler works without it; conversions.py and type.py pick it up
+# automatically once the shared library is in the repository root.
+
+dirname = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+if __name__ == '__main__':
+    os.chdir(dirname)
+    with tempfile.TemporaryDirectory() as build_temp:
+        setup(
+            name='_speedups',
+            ext_modules=[Extension('_speedups', sources=['_speedups.c'])],
+            script_args=['build_ext', '--inplace', '--build-temp', build_temp, '--build-lib', build_temp],
+        )
@@ -1,3 +1,8 @@
+import bisect
+import io
+import re
+from array import array
+
 from type import *
 from entry import *
 from segments import *
@@ -7,64 +12,288 @@ class Section:
     """ This class is a generic class for each section in a .wasm file
 
     Attributes:
-        sectionCode : int        =  the 'index' for this section
-        sectionSize : int        =  the size in bytes for this section
-        numTypes    : int        =  the number of elements in this section
-        data        : bytearray  =  the rest of the bytes of this section
+        sectionCode : int         =  the 'index' for this section
+        sectionSize : int         =  the size in bytes for this section
+        numTypes    : int         =  the number of elements in this section
+        data        : memoryview  =  the rest of the bytes of this section
+        dataOffset  : int         =  the index of data in the buffer it was read from
+        sectionBytes: memoryview  =  the whole section, from its id byte through
+                                     the end of its payload (size and count included)
     """
-    def populate(self, inputBytes):
+    def populate(self, reader):
         """
             this method populates the current section with the necessary info,
-            and then returns the remaining unread bytes to be processed later
+            and then advances the reader past the current section
 
             = Parameters =
-            inputBytes : bytearray = bytes of wasm file with current section
+            reader : Reader = reader positioned at the start of the current section
 
             = Return Value = 
-            return     : bytearray = bytes of wasm file without current section
+            NONE
         """
+        start = reader.offset
 
         # one byte for section code
-        self.sectionCode = int.from_bytes(inputBytes[0:1], byteorder='little', signed=False)
+        self.sectionCode = reader.read_byte()
+
+        # varuint32 for section size
+        self.sectionSize = reader.read_varuint32()
+        end = min(reader.offset + self.sectionSize, reader.end)
+
+        # varuint32 for the number of types
+        self.numTypes    = reader.read_varuint32() if reader.offset < end else 0
+
+        # the rest of the bytes in the current section, as a view onto the module
+        self.dataOffset  = reader.offset
+        self.data        = reader.buffer[reader.offset:end]
+        self.sectionBytes = reader.buffer[start:end]
+
+        # skip over the rest of the section to be processed later
+        reader.skip(end - reader.offset)
+
+    def write_to(self, stream):
+        """
+            this method writes the text format of the section to the stream;
+            each subclass writes its own entries
+        """
+        pass
+
+    def to_str(self):
+        """
+            this method returns the text format of the section as a string
+        """
+        output = io.StringIO()
+        self.write_to(output)
+        return output.getvalue()
+
+    def to_record(self):
+        """
+            this method returns the entries of the section as plain lists and
+            dicts that can be written as JSON; each subclass returns its own
+        """
+        return None
 
-        # one byte for section size
-        self.sectionSize = int.from_bytes(inputBytes[1:2], byteorder='little', signed=False)
+class SectionHeader:
+    """ This class is one entry of the section index of a module
 
-        # one byte for the number of types
-        self.numTypes    = int.from_bytes(inputBytes[2:3], byteorder='little', signed=False)
+    Attributes:
+        id     : int  =  the section code (0 for custom sections)
+        offset : int  =  the index in the module of the first byte of the payload
+        size   : int  =  the size in bytes of the payload
+        count  : int  =  the number of entries in the section (the function
+                         index for the start section, None for custom sections)
+        start  : int  =  the index in the module of the section code byte
+    """
+    def __init__(self, id, offset, size, count, start=None):
+        self.id = id
+        self.offset = offset
+        self.size = size
+        self.count = count
+        self.start = start
+
+    def __repr__(self):
+        return 'SectionHeader(id={}, offset={}, size={}, count={})'.format(self.id, self.offset, self.size, self.count)
+
+    def section(self, buffer):
+        """
+            this method returns the generic Section for this entry, without
+            reading anything but the section's own header
 
-        # the rest of the bytes in the current section
-        self.data        = inputBytes[3:self.sectionSize+2]
+            = Parameters =
+            buffer : memoryview = the bytes of the whole module
 
-        # return the rest of the bytes to be processed later
-        return inputBytes[self.sectionSize+2:]
+            = Return Value =
+            return : Section    = the section, ready to be handed to its class
+        """
+        reader = Reader(buffer, self.start)
+        section = Section()
+        section.populate(reader)
+        return section
+
+def read_section_header(reader):
+    """
+        this method reads the header of the section the reader is positioned at
+        and advances the reader past the whole section
+
+        = Parameters =
+        reader : Reader        = reader positioned at the start of a section
+
+        = Return Value =
+        return : SectionHeader = the id, payload offset, size and count
+    """
+    start = reader.offset
+    section_id = reader.read_byte()
+    size = reader.read_varuint32()
+    offset = reader.offset
+    end = min(offset + size, reader.end)
+
+    count = None
+    if section_id != 0 and offset < end:
+        count = reader.read_varuint32()
+    elif section_id != 0:
+        count = 0
+
+    reader.skip(end - reader.offset)
+    return SectionHeader(section_id, offset, size, count, start)
+
+def index_sections(binary):
+    """
+        this method walks the module header and the header of every section,
+        custom sections included, without decoding any of their contents
+
+        = Parameters =
+        binary : bytes-like      = the bytes of the whole .wasm file
+
+        = Return Value =
+        index  : SectionHeader[] = one entry per section, in module order
+    """
+    reader = Reader(binary)
+    if reader.remaining() < 8 or bytes(reader.read_bytes(4)) != WASM_MAGIC:
+        raise ValueError('Not a WebAssembly module')
+    reader.skip(4)
+
+    index = []
+    while not reader.eof():
+        index.append(read_section_header(reader))
+    return index
 
 def makeSectionList(inputBytes):
     """
         this method creates the section list of twelve sections
 
         = Parameters =
-        inputBytes  : bytearray   = all of the bytes in the .wasm file
+        inputBytes  : Reader      = a reader positioned at the first section
+                                    of the .wasm file, or the bytes of the
+                                    sections themselves
 
         = Return Value = 
-        sectionList : bytearray[] = an array of sections processed from the 
-                                    array of bytes
+        sectionList : Section[]   = an array of sections processed from the 
+                                    array of bytes, with the CustomSections
+                                    in the first slot
     """
+    if isinstance(inputBytes, Reader):
+        reader = inputBytes
+    else:
+        reader = Reader(inputBytes)
 
-    # 12 sections according to the spec
+    # 12 sections according to the spec; the first slot holds the list of
+    # custom sections, which may appear any number of times
     sectionList = [None] * 12
-
-    # loop through all 12 sections and populate each if exists
-    for i in range (0, len(sectionList)):
-        if (inputBytes != None):
-            section    = Section()
-            inputBytes = section.populate(inputBytes)
+    sectionList[0] = []
+
+    # walk every section, skipping the ones this disassembler does not know
+    while not reader.eof():
+        section = Section()
+        section.populate(reader)
+        if section.sectionCode == 0:
+            sectionList[0].append(CustomSection(section))
+        elif section.sectionCode < len(sectionList):
             sectionList[section.sectionCode] = section
 
     # return the generated sectionList
     return sectionList
 
 
+class CustomSection(Section):
+    """ This class is a custom section: a name and a payload that is only
+    indexed, never copied
+
+    Attributes:
+        name   : str         =  the name of the custom section
+        offset : int         =  the index of the payload in the buffer the
+                                section was read from
+        size   : int         =  the size in bytes of the payload
+        data   : memoryview  =  the payload, as a view onto the module
+    """
+    def __init__(self, section, sectionList=None):
+        # a custom section starts with the length of its name where other
+        # sections start with their count, so numTypes is that length
+        name_length = section.numTypes
+        self.name   = str(section.data[:name_length], 'utf-8', 'replace')
+        self.offset = section.dataOffset + name_length
+        self.data   = section.data[name_length:]
+        self.size   = len(self.data)
+
+    def write_to(self, stream):
+        # custom sections have no text format
+        pass
+
+    def to_record(self):
+        return {'name': self.name, 'offset': self.offset, 'size': self.size}
+
+def find_custom_section(sectionList, name):
+    """
+        this method returns the first custom section with the given name in
+        the section list, or None
+    """
+    for section in sectionList[0] or []:
+        if section.name == name:
+            return section
+    return None
+
+# Characters that may not appear in a text format identifier.
+_INVALID_NAME_CHARACTERS = re.compile(r"[^0-9A-Za-z!#$%&'*+\-./:<=>?@\\^_`|~]")
+
+class NameSection:
+    """ This class is the 'name' custom section, decoded lazily: building it
+    only finds its subsections, and the function names are decoded into a
+    dict the first time they are looked up
+
+    Source: https://github.com/WebAssembly/design/blob/master/BinaryEncoding.md#name-section
+
+    Attributes:
+        subsections : dict  =  subsection id -> its payload as a memoryview
+    """
+    MODULE_NAME    = 0
+    FUNCTION_NAMES = 1
+
+    def __init__(self, section):
+        self.subsections = {}
+        self._function_names = None
+
+        reader = Reader(section.data)
+        while not reader.eof():
+            subsection_id = reader.read_byte()
+            self.subsections[subsection_id] = reader.read_bytes(reader.read_varuint32())
+
+    @property
+    def module_name(self):
+        data = self.subsections.get(NameSection.MODULE_NAME)
+        if data is None:
+            return None
+        reader = Reader(data)
+        return str(reader.read_bytes(reader.read_varuint32()), 'utf-8', 'replace')
+
+    @property
+    def function_names(self):
+        """
+            this method returns the function index -> name dict, decoding it on
+            first access; names are made into valid identifiers and unique
+        """
+        if self._function_names is None:
+            names = {}
+            data = self.subsections.get(NameSection.FUNCTION_NAMES)
+            if data is not None:
+                used = set()
+                reader = Reader(data)
+                for i in range(reader.read_varuint32()):
+                    index = reader.read_varuint32()
+                    name = str(reader.read_bytes(reader.read_varuint32()), 'utf-8', 'replace')
+                    name = _INVALID_NAME_CHARACTERS.sub('_', name) or '_'
+                    unique = name
+                    suffix = 0
+                    while unique in used:
+                        suffix += 1
+                        unique = '{}.{}'.format(name, suffix)
+                    used.add(unique)
+                    names[index] = unique
+            # assigned once built, so other threads never see a partial dict
+            self._function_names = names
+        return self._function_names
+
+    def function_name(self, index):
+        return self.function_names.get(index)
+
 class CodeSection(Section):
     """
     Field   Type            Description
@@ -75,7 +304,7 @@ class CodeSection(Section):
     """
     def __init__(self, section, sectionList=None):
         self.count = section.numTypes
-        inputBytes = section.data
+        reader = Reader(section.data)
         typeSection = sectionList[SECTION_IDS['type']]
         functionSection = sectionList[SECTION_IDS['function']]
 
@@ -88,58 +317,273 @@ class CodeSection(Section):
         self.function_sig_idx = functionSection.function_idx
         self.function_signatures = typeSection.func_types
 
-        self.bodies = []
+        # The function index space starts with the imported functions, so the
+        # name of the body at index i is the name of function imported + i.
+        importSection = sectionList[SECTION_IDS['import']] if len(sectionList) > SECTION_IDS['import'] else None
+        self.imported_function_count = 0
+        if isinstance(importSection, ImportSection):
+            self.imported_function_count = sum(1 for entry in importSection.entries if entry.kind == 'function')
+
+        nameSection = find_custom_section(sectionList, 'name')
+        self.names = NameSection(nameSection) if nameSection is not None else None
+
+        # Only the position of each body is recorded here; the instructions of a
+        # body are decoded the first time the function is accessed.
+        self.data = section.data
+        # where data starts in the module (sections built by hand start at 0)
+        self.dataOffset = getattr(section, 'dataOffset', 0)
+        self.body_offsets = []
+        self.body_sizes = []
         for i in range(self.count):
-            self.bodies.append(FunctionBody(inputBytes, self.count))
-            inputBytes = inputBytes[self.bodies[i].size():]
+            self.body_offsets.append(reader.offset)
+            body_size = reader.read_varuint32()
+            self.body_sizes.append(body_size)
+            reader.skip(body_size)
 
-    def to_str(self):
-        output = ''
-        for i in range(self.count):
+        self._bodies = {}
+        self._instruction_offsets = {}
+
+        # An optional FunctionCache of rendered bodies, keyed by their bytes.
+        self.function_cache = None
+
+    def body_bytes(self, idx):
+        """
+            this method returns the raw bytes of the function body at the given
+            index (locals and code, without the size) as a view onto the module
+        """
+        reader = Reader(self.data, self.body_offsets[idx])
+        body_size = reader.read_varuint32()
+        return reader.read_bytes(body_size)
+
+    def function(self, idx):
+        """
+            this method returns the decoded body of the function at the given
+            index, decoding it on first access
+
+            = Parameters =
+            idx    : int          = the index of the function in the code section
+
+            = Return Value =
+            return : FunctionBody = the decoded function body
+        """
+        body = self._bodies.get(idx)
+        if body is None:
+            body = self._decode(idx)
+            self._bodies[idx] = body
+        return body
+
+    @property
+    def bodies(self):
+        return [self.function(i) for i in range(self.count)]
+
+    def _decode(self, idx):
+        # Reuse a body that has already been decoded, but do not keep new ones
+        # around so that writing a whole section holds one body at a time.
+        body = self._bodies.get(idx)
+        if body is None:
+            body = FunctionBody(Reader(self.data, self.body_offsets[idx]), self.count)
+        return body
+
+    def _read_locals(self, idx):
+        """
+            this method reads the locals of the function at the given index
+
+            = Return Value =
+            return : (list[], int, int) = [count, type] of each local entry, and
+                                          the indices in data of the first
+                                          instruction and one past the body
+        """
+        reader = Reader(self.data, self.body_offsets[idx])
+        body_size = reader.read_varuint32()
+        end = min(reader.offset + body_size, len(self.data))
+        locals = []
+        for i in range(reader.read_varuint32()):
+            count = reader.read_varuint32()
+            locals.append([count, LANGUAGE_TYPES[reader.read_byte()]])
+        return locals, reader.offset, end
+
+    def instruction_records(self, idx, base=0):
+        """
+            this method decodes every instruction of the function at the given
+            index, see decode_instruction_records; unlike the instructions the
+            text is rendered from, nothing is left out
+
+            = Parameters =
+            idx    : int    = the index of the function in the code section
+            base   : int    = added to every offset, which are indices in data
+
+            = Return Value =
+            return : list[] = [offset, name(, immediate)] for each instruction
+        """
+        locals, start, end = self._read_locals(idx)
+        return decode_instruction_records(self.data, start, end, self.count, base)
+
+    def instruction_offsets(self, idx):
+        """
+            this method returns the offset of every instruction of the function
+            at the given index in the code section, decoding the function the
+            first time and keeping only its offsets
+        """
+        offsets = self._instruction_offsets.get(idx)
+        if offsets is None:
+            offsets = array('I', [record[0] for record in self.instruction_records(idx)])
+            self._instruction_offsets[idx] = offsets
+        return offsets
+
+    def locate(self, offset):
+        """
+            this method finds the function and the instruction at a byte offset
+            in the code section, with a binary search over the body offsets that
+            decodes nothing but the function found
+
+            = Parameters =
+            offset : int        = an index into data, the code section payload
+
+            = Return Value =
+            return : (int, int) = the index of the function in the code section
+                                  and the index of the instruction starting at
+                                  or before the offset, counting every
+                                  instruction of the body (see
+                                  instruction_records; None if the offset is
+                                  before the first instruction, in the size or
+                                  the locals), or None if the offset is not
+                                  inside a function body
+        """
+        idx = bisect.bisect_right(self.body_offsets, offset) - 1
+        if idx < 0:
+            return None
+
+        reader = Reader(self.data, self.body_offsets[idx])
+        end = reader.read_varuint32()
+        end += reader.offset
+        if offset >= min(end, len(self.data)):
+            return None
+
+        offsets = self.instruction_offsets(idx)
+        instruction = bisect.bisect_right(offsets, offset) - 1
+        return idx, (instruction if instruction >= 0 else None)
+
+    def function_record(self, idx):
+        """
+            this method returns the function at the given index as plain lists
+            and dicts that can be written as JSON
+
+            = Parameters =
+            idx    : int  = the index of the function in the code section
+
+            = Return Value =
+            record : dict = the signature index, locals, byte offset and size of
+                            the body, and every one of its instructions as
+                            [offset, name] or [offset, name, immediate] lists
+                            (see decode_instruction_records); offsets are
+                            indices in the module
+        """
+        locals, start, end = self._read_locals(idx)
+        name = None
+        if self.names is not None:
+            name = self.names.function_name(self.imported_function_count + idx)
+        return {
+            'index': idx,
+            'function_index': self.imported_function_count + idx,
+            'name': name,
+            'type': self.function_sig_idx[idx],
+            'locals': locals,
+            'offset': self.dataOffset + self.body_offsets[idx],
+            'size': end - self.body_offsets[idx],
+            'instructions': decode_instruction_records(self.data, start, end, self.count, self.dataOffset)
+        }
+
+    def label(self, idx):
+        """
+            this method returns how the function at the given index is written:
+            its name from the name section, or its index as a comment
+        """
+        if self.names is not None:
+            name = self.names.function_name(self.imported_function_count + idx)
+            if name is not None:
+                return '$' + name
+        return '(;{};)'.format(idx)
+
+    def write_to(self, stream, start=0, stop=None):
+        """
+            this method writes the functions of the code section to the stream
+
+            = Parameters =
+            stream : file = any object with a write(str) method
+            start  : int  = the index of the first function to write
+            stop   : int  = the index one past the last function to write
+        """
+        if stop is None:
+            stop = self.count
+
+        cache = self.function_cache
+        for i in range(start, stop):
             sig_idx = self.function_sig_idx[i]
             signature = self.function_signatures[sig_idx]
-            body = self.bodies[i].to_str()[:-1]
-            if len(body) == 0:
-                output += '  (func (;{};) (type $t{}) {})\n'.format(i, sig_idx, signature.to_str(named_params=True))
+            header = '  (func {} (type $t{}) {}'.format(self.label(i), sig_idx, signature.to_str(named_params=True))
+
+            if cache is not None:
+                # bodies with the same bytes render to the same text
+                key = cache.key(self.body_bytes(i))
+                body = cache.get(key)
+                if body is None:
+                    body = self._decode(i).to_str()
+                    cache.put(key, body)
+
+                if len(body) == 0:
+                    stream.write(header + ')\n')
+                else:
+                    stream.write(header + '\n' + body[:-1] + ')\n')
+                continue
+
+            body = self._decode(i)
+            if len(body.instructions) == 0:
+                stream.write(header + ')\n')
             else:
-                output += '  (func (;{};) (type $t{}) {}\n{})\n'.format(i, sig_idx, signature.to_str(named_params=True), body)
-        return output
+                stream.write(header + '\n')
+                body.write_to(stream, end=')\n')
 
 class DataSection(Section):
     def __init__(self, section, sectionList=None):
-        inputBytes = section.data
+        reader = Reader(section.data)
         self.numDataSegs = section.numTypes
         self.dataSegs = []
         #Constructs array of type DataSegment
         for i in range(self.numDataSegs):
-            self.dataSegs.append(DataSegment(inputBytes))
-            inputBytes = inputBytes[self.dataSegs[i].size():]
+            self.dataSegs.append(DataSegment(reader))
             
-    def to_str(self):
-        output = ''
+    def write_to(self, stream):
         for idx,i in enumerate(self.dataSegs):
-            output += f"  (data ({OPCODES[i.offset[0]][0]} {idx}) \"{''.join(chr(x) for x in i.data)}\")\n"
-        return output
+            stream.write(f"  (data ({i.offset_expr.to_str()}) \"")
+            stream.write(escape_data(i.data))
+            stream.write("\")\n")
         
+    def to_record(self):
+        return [{'memory': segment.index,
+                 'offset': segment.offset_expr.to_str(),
+                 'size': segment.dataSize} for segment in self.dataSegs]
+
 class ElementSection(Section):
     def __init__(self, section, sectionList=None):
-        inputBytes = section.data
+        reader = Reader(section.data)
         self.numElemSegs = section.numTypes
         self.elementSegs = []
         # Constructs array of type ElementSegment
         for i in range(self.numElemSegs):
-            self.elementSegs.append(ElementSegment(inputBytes))
-            inputBytes = inputBytes[self.elementSegs[i].size():]
+            self.elementSegs.append(ElementSegment(reader))
 
-    def to_str(self):
-        output = ""
+    def write_to(self, stream):
         for idx,i in enumerate(self.elementSegs):
-            tmpOutput = f"  (elem ({OPCODES[i.offset[0]][0]} {i.offset[1]})"
+            tmpOutput = f"  (elem ({i.offset_expr.to_str()})"
             for elem in self.elementSegs[idx].elems:
                 tmpOutput += f" {elem}"
             tmpOutput += ")\n"
-            output += tmpOutput
-        return output
+            stream.write(tmpOutput)
+
+    def to_record(self):
+        return [{'table': segment.index,
+                 'offset': segment.offset_expr.to_str(),
+                 'elements': list(segment.elems)} for segment in self.elementSegs]
 
 class ExportSection(Section):
     """ This class is a generic class for an export section for wasm
@@ -149,116 +593,143 @@ class ExportSection(Section):
         entries     : ExportEntry[] =  the size in bytes for this section
     """
     def __init__(self, section, sectionList=None):
-        inputBytes = section.data
+        reader = Reader(section.data)
         self.exportCount = section.numTypes
         self.entries     = []
         
         for i in range(self.exportCount):
-            self.entries.append(ExportEntry(inputBytes))
-            inputBytes = inputBytes[self.entries[i].size():]
+            self.entries.append(ExportEntry(reader))
 
         self.type_section = sectionList[SECTION_IDS['type']]
         if self.type_section is None:
             raise ValueError('Missing type section')
 
-    def to_str(self):
-        output = ''
+    def write_to(self, stream):
         for i in range(self.exportCount):
             entry = self.entries[i]
-            output += '  (export "{}" (func {}))\n'.format(entry.exportNameStr, entry.kindType)
-        return output
+            # (export "memory" (memory 0))
+            kind = 'func' if entry.kind == 'function' else entry.kind
+            stream.write('  (export "{}" ({} {}))\n'.format(entry.exportNameStr, kind, entry.kindType))
+
+    def to_record(self):
+        return [{'name': entry.exportNameStr, 'kind': entry.kind, 'index': entry.kindType} for entry in self.entries]
 
 class FunctionSection(Section):
     def __init__(self, section, sectionList=None):
-        inputBytes = section.data
+        reader = Reader(section.data)
         # Defining number of functions
         self.num_functions = section.numTypes
         # Stores list of indicies into type section
-        self.function_idx = []
-        for i in range(self.num_functions):
-            self.function_idx.append(inputBytes[i])
+        self.function_idx = reader.read_varuint32_array(self.num_functions)
 
-    def to_str(self):
-        return ''
+    def write_to(self, stream):
+        # function signatures are written as part of the code section
+        pass
                     
+    def to_record(self):
+        return list(self.function_idx)
+
 class GlobalSection(Section):
     def __init__(self, section, sectionList=None):
-        inputBytes = section.data
+        reader = Reader(section.data)
         self.count = section.numTypes
         self.globals = []
 
         for i in range(self.count):
-            self.globals.append(GlobalEntry(inputBytes))
-            inputBytes = inputBytes[self.globals[i].size():]
-
-    def to_str(self):
-        output = ''
+            self.globals.append(GlobalEntry(reader))
 
+    def write_to(self, stream):
         # (global $g0 (mut i32) (i32.const 0))
         for i in range(self.count):
             entry = self.globals[i]
             mutability = ''
             if entry.type.mutability == 1:
                 mutability = ' (mut {}) '.format(entry.type.content_type)
-            output += '  (global $g{}{}({}))\n'.format(i, mutability, entry.initial_expr.to_str())
+            stream.write('  (global $g{}{}({}))\n'.format(i, mutability, entry.initial_expr.to_str()))
 
-        return output
+    def to_record(self):
+        return [{'type': entry.type.content_type,
+                 'mutable': entry.type.mutability == 1,
+                 'init': entry.initial_expr.to_str()} for entry in self.globals]
 
 
 class ImportSection(Section):
     def __init__(self, section, sectionList=None):
-        inputBytes = section.data
+        reader = Reader(section.data)
         self.import_count = section.numTypes
         self.entries = []
 
         # Iterate and instantiate all `n` import entries
-        # Use the size of the current entry to get the index of the next function type
+        # Each entry advances the reader to the start of the next entry
         for i in range(self.import_count):
-            self.entries.append(ImportEntry(inputBytes))
-            inputBytes = inputBytes[self.entries[i].size():]
+            self.entries.append(ImportEntry(reader))
 
         self.type_section = sectionList[SECTION_IDS['type']]
         if self.type_section is None:
             raise ValueError('Missing type section')
 
-    def to_str(self):
+    def write_to(self, stream):
         # The function names have to be unique, so keep
         # a frequency counter for names and append its counter to ensure uniqueness.
         function_name_table = {}
-        output = ''
         for i in range(self.import_count):
             entry = self.entries[i]
-            function_name = '${}.{}'.format(entry.moduleStr, entry.fieldStr)
-            if entry.fieldStr in function_name_table:
-                function_name_table[entry.fieldStr] += 1
-                function_name += '_{}'.format(function_name_table[entry.fieldStr])
+            if entry.kind == 'function':
+                function_name = '${}.{}'.format(entry.moduleStr, entry.fieldStr)
+                if entry.fieldStr in function_name_table:
+                    function_name_table[entry.fieldStr] += 1
+                    function_name += '_{}'.format(function_name_table[entry.fieldStr])
+                else:
+                    function_name_table[entry.fieldStr] = 0
+                description = 'func {} (type $t{})'.format(function_name, entry.kindType)
+            elif entry.kind == 'table':
+                # (table 0 1 anyfunc)
+                description = 'table {} {}'.format(_limits_str(entry.kindType.limits), entry.kindType.elementType)
+            elif entry.kind == 'memory':
+                # (memory 1 2)
+                description = 'memory {}'.format(_limits_str(entry.kindType.limits))
+            else:
+                # (global (mut i32))
+                global_type = entry.kindType.content_type
+                if entry.kindType.mutability == 1:
+                    global_type = '(mut {})'.format(global_type)
+                description = 'global {}'.format(global_type)
+            stream.write('  (import "{}" "{}" ({}))\n'.format(entry.moduleStr, entry.fieldStr, description))
+
+    def to_record(self):
+        records = []
+        for entry in self.entries:
+            record = {'module': entry.moduleStr, 'field': entry.fieldStr, 'kind': entry.kind}
+            if entry.kind == 'function':
+                record['type'] = entry.kindType
+            elif entry.kind == 'global':
+                record['type'] = entry.kindType.content_type
+                record['mutable'] = entry.kindType.mutability == 1
             else:
-                function_name_table[entry.fieldStr] = 0
-            function_str = '(type $t{})'.format(entry.kindType)
-            output += '  (import "{}" "{}" (func {} {}))\n'.format(entry.moduleStr, entry.fieldStr, function_name, function_str)
-        return output
+                record.update(_limits_record(entry.kindType.limits))
+            records.append(record)
+        return records
 
 
 class MemorySection(Section):
     def __init__(self, section, sectionList=None):
-        inputBytes = section.data
+        reader = Reader(section.data)
         self.memoryCount = section.numTypes
         self.entries = []
 
         for i in range(self.memoryCount):
-            self.entries.append(MemoryType(inputBytes))
-            inputBytes = inputBytes[self.entries[i].size():]
+            self.entries.append(MemoryType(reader))
 
-    def to_str(self):
-        output = ''
+    def write_to(self, stream):
         for i in range(self.memoryCount):
             entry = self.entries[i].limits
             if entry.flags == 1:
-                output += '  (memory (;{};) {} {})\n'.format(i, entry.initial, entry.maximum)
+                stream.write('  (memory (;{};) {} {})\n'.format(i, entry.initial, entry.maximum))
             else:
-                output += '  (memory (;{};) {})\n'.format(i, entry.initial)
+                stream.write('  (memory (;{};) {})\n'.format(i, entry.initial))
 
-        return output
+    def to_record(self):
+        return [_limits_record(entry.limits) for entry in self.entries]
 
 class StartSection(Section):
     def __init__(self, section, sectionList=None):
@@ -266,48 +737,53 @@ class StartSection(Section):
         # the location of the start function.
         self.index = section.numTypes
 
-    def to_str(self):
-        return '  (start {})\n'.format(self.index)
+    def write_to(self, stream):
+        stream.write('  (start {})\n'.format(self.index))
+
+    def to_record(self):
+        return self.index
 
 class TableSection(Section):
     def __init__(self, section, sectionList=None):
-        inputBytes = section.data
+        reader = Reader(section.data)
         # Defining number of tables
         self.numTables = section.numTypes
         # Stores list of table entries
         self.tableEntries = []
         
         for i in range(self.numTables):
-            self.tableEntries.append(TableType(inputBytes))
-            inputBytes = inputBytes[self.tableEntries[i].size():]
+            self.tableEntries.append(TableType(reader))
 
-    def to_str(self):
+    def write_to(self, stream):
         # (table (;0;) 0 1 anyfunc)
-        output = ''
         for i in range(self.numTables):
             entry = self.tableEntries[i]
             if entry.limits.flags == 1:
-                output += '  (table (;{};) {} {} {})\n'.format(i, entry.limits.initial, entry.limits.maximum, entry.elementType)
+                stream.write('  (table (;{};) {} {} {})\n'.format(i, entry.limits.initial, entry.limits.maximum, entry.elementType))
             else:
-                output += '  (table (;{};) {} {}})\n'.format(i, entry.limits.initial, entry.elementType)
-        return output 
+                stream.write('  (table (;{};) {} {})\n'.format(i, entry.limits.initial, entry.elementType))
+
+    def to_record(self):
+        records = []
+        for entry in self.tableEntries:
+            record = {'element_type': entry.elementType}
+            record.update(_limits_record(entry.limits))
+            records.append(record)
+        return records
 
 class TypeSection(Section):
     def __init__(self, section, sectionList=None):
-        inputBytes = section.data
+        reader = Reader(section.data)
         self.func_count = section.numTypes
         self.func_types = []
 
         # Iterate and instantiate all `n` function types
-        # Use the size of the current function types to get the index of the next function type
+        # Each function type advances the reader to the start of the next function type
         for i in range(self.func_count):
-            self.func_types.append(FuncType(inputBytes))
-            inputBytes = inputBytes[self.func_types[i].size():]
+            self.func_types.append(FuncType(reader))
 
 
-    def to_str(self):
-        output = ''
-
+    def write_to(self, stream):
         for i in range(self.func_count):
             func_str = self.func_types[i].to_str()
             if len(func_str) == 0:
@@ -315,5 +791,61 @@ class TypeSection(Section):
             else:
                 func_str = '(func {})'.format(func_str)
 
-            output += '  (type $t{} {})\n'.format(i, func_str)
-        return output
+            stream.write('  (type $t{} {})\n'.format(i, func_str))
+
+    def to_record(self):
+        return [{'params': list(entry.param_types), 'results': list(entry.return_type)} for entry in self.func_types]
+
+def _limits_record(limits):
+    record = {'initial': limits.initial}
+    if limits.flags == 1:
+        record['maximum'] = limits.maximum
+    return record
+
+def _limits_str(limits):
+    if limits.flags == 1:
+        return '{} {}'.format(limits.initial, limits.maximum)
+    return str(limits.initial)
+
+# The main section thats may be found in a wasm module.
+# The list is in the order of which the sections are found in the module.
+SECTION_CLASSES = [
+    TypeSection,
+    ImportSection,
+    FunctionSection,
+    TableSection,
+    MemorySection,
+    GlobalSection,
+    ExportSection,
+    StartSection,
+    ElementSection,
+    CodeSection,
+    DataSection
+]
+
+# The sections each section class needs to have been parsed before it, by section id.
+SECTION_DEPENDENCIES = {
+    SECTION_IDS['import']: [SECTION_IDS['type']],
+    SECTION_IDS['export']: [SECTION_IDS['type']],
+    SECTION_IDS['code']: [SECTION_IDS['type'], SECTION_IDS['function'], SECTION_IDS['import']]
+}
+
+def required_sections(section_ids):
+    """
+        this method returns the given sections together with every section
+        they need to have been parsed before them
+
+        = Parameters =
+        section_ids : int[] = the ids of the sections wanted
+
+        = Return Value =
+        required    : set   = the ids of the sections that have to be parsed
+    """
+    required = set()
+    pending = list(section_ids)
+    while pending:
+        section_id = pending.pop()
+        if section_id not in required:
+            required.add(section_id)
+            pending.extend(SECTION_DEPENDENCIES.get(section_id, []))
+    return required
@@ -1,33 +1,48 @@
+from type import *
+
 class ElementSegment():
     '''
     Represents a element segment
     # TODO table
     '''
 
-    def __init__(self,segment):
-        self.index     = segment[0]   #table index
-        self.offset    = segment[1:4] #i32 initializer expression
-        self.numElems  = segment[4]   #number of elems
+    __slots__ = ('index', 'offset_expr', 'offset', 'numElems', 'elems', '_size')
+
+    def __init__(self,reader):
+        start = reader.offset
+        self.index     = reader.read_varuint32()  #table index
+        expr_start     = reader.offset
+        self.offset_expr = InitExpr(reader)       #i32 initializer expression
+        self.offset    = reader.buffer[expr_start:reader.offset]
+        self.numElems  = reader.read_varuint32()  #number of elems
         #Place sequence of function indicies into a list
-        self.elems     = [segment[i] for i in range(5, 5+self.numElems)]
+        self.elems     = reader.read_varuint32_array(self.numElems)
+        self._size     = reader.offset - start
     
     def size(self):
         '''
         Helper to determine size of an element segment
         '''
-        return 5+self.numElems
+        return self._size
         
 class DataSegment():
     '''
     Represents a data segment
     '''
-    def __init__(self,segment):
-        self.index  = segment[0]   #table index
-        self.offset = segment[1:4] #i32 initializer
-        self.dataSize   = segment[4]   #size of data
-        self.data   = [segment[i] for i in range (5, 5+self.dataSize)]
+    __slots__ = ('index', 'offset_expr', 'offset', 'dataSize', 'dataOffset', 'data', '_size')
+
+    def __init__(self,reader):
+        start = reader.offset
+        self.index  = reader.read_varuint32()   #table index
+        expr_start  = reader.offset
+        self.offset_expr = InitExpr(reader)     #i32 initializer
+        self.offset = reader.buffer[expr_start:reader.offset]
+        self.dataSize   = reader.read_varuint32()   #size of data
+        self.dataOffset = reader.offset         #index of the data in the reader's buffer
+        self.data   = reader.read_bytes(self.dataSize)   #view onto the module, not a copy
+        self._size  = reader.offset - start
     def size(self):
         '''
         Helper to determine size of an data segment
         '''
-        return 5+self.dataSize
+        return self._size
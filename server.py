@@ -0,0 +1,304 @@
+import argparse
+import hashlib
+import json
+import os
+import struct
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlsplit
+
+from main import OUTPUT_FORMATS, TEXT_SECTION_ORDERING, parseFile, resolve_selection, section_ids, write_sections
+from module import Module
+from section import *
+
+# The content type of the response for each output format.
+CONTENT_TYPES = {
+    'text': 'text/plain; charset=utf-8',
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson'
+}
+
+class PooledModule:
+    """ This class is a parsed module kept in a ModulePool
+
+    Sections are parsed under the lock, so two requests for the same module
+    never parse the same section twice; once parsed, rendering only reads them.
+
+    Attributes:
+        module : Module          =  the module, parsed as far as it has been used
+        lock   : threading.Lock  =  held while sections of the module are parsed
+    """
+    __slots__ = ('module', 'lock')
+
+    def __init__(self, module):
+        self.module = module
+        self.lock = threading.Lock()
+
+    def sections(self, wanted):
+        """
+            this method parses the given sections and the sections they depend on
+
+            = Parameters =
+            wanted : int[]     = the ids of the sections to be written
+
+            = Return Value =
+            return : Section[] = the section list of the module, as in makeSectionList
+        """
+        with self.lock:
+            for idx in required_sections(wanted):
+                self.module.section(idx)
+        return self.module.parsed_sections()
+
+class ModulePool:
+    """ This class is an LRU of parsed modules shared by every request
+
+    Modules are parsed on a pool of worker threads. The first request for a
+    module submits the parse and every request for the same module waits on
+    the same future, so a module is parsed once however many requests arrive.
+
+    Attributes:
+        max_modules : int                 =  the number of modules kept
+        executor    : ThreadPoolExecutor  =  the workers that parse and render modules
+        entries     : OrderedDict         =  key -> Future of a PooledModule,
+                                             least recently used first
+    """
+    def __init__(self, max_modules=32, workers=4):
+        self.max_modules = max_modules
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, load):
+        """
+            this method returns the module with the given key, parsing it with
+            load() on a worker the first time it is asked for
+
+            = Parameters =
+            key    : tuple        = identifies the module, see path_key and bytes_key
+            load   : function     = returns the bytes of the module
+
+            = Return Value =
+            return : PooledModule = the module
+        """
+        with self.lock:
+            future = self.entries.get(key)
+            if future is None:
+                future = self.executor.submit(lambda: PooledModule(Module(load())))
+                self.entries[key] = future
+                while len(self.entries) > self.max_modules:
+                    self.entries.popitem(last=False)
+            else:
+                self.entries.move_to_end(key)
+
+        try:
+            return future.result()
+        except BaseException:
+            # do not keep a module that failed to parse
+            with self.lock:
+                if self.entries.get(key) is future:
+                    del self.entries[key]
+            raise
+
+    def __len__(self):
+        return len(self.entries)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+def path_key(path):
+    """
+        this method returns the pool key of a module file, which changes when
+        the file is rewritten
+    """
+    path = os.path.realpath(path)
+    stat = os.stat(path)
+    return ('path', path, stat.st_mtime_ns, stat.st_size)
+
+def bytes_key(binary):
+    """
+        this method returns the pool key of a module sent as bytes
+    """
+    return ('sha256', hashlib.sha256(binary).hexdigest())
+
+class ResponseWriter:
+    """ This class buffers the text written by write_sections into the response
+
+    The response headers are sent with the first chunk, so an error raised
+    before then (such as by a small module) can still be answered with an error
+    status.
+    """
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self, handler, content_type):
+        self.handler = handler
+        self.content_type = content_type
+        self.parts = []
+        self.size = 0
+
+    def write(self, text):
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size >= self.CHUNK_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self.handler.response_started:
+            self.handler.send_response(200)
+            self.handler.send_header('Content-Type', self.content_type)
+            self.handler.end_headers()
+            self.handler.response_started = True
+        if self.parts:
+            self.handler.wfile.write(''.join(self.parts).encode('utf-8'))
+            self.parts = []
+            self.size = 0
+
+class DisassemblyServer(ThreadingMixIn, HTTPServer):
+    """ This class is a local HTTP server that disassembles modules
+
+    Every request is handled on its own thread; parsing and rendering run on the
+    workers of the module pool, so a request for a small module is not queued
+    behind a huge one being parsed.
+
+    Endpoints:
+        GET  /disassemble?path=FILE  = disassemble the module file
+        POST /disassemble            = disassemble the module sent as the body
+        GET  /locate?path=FILE&offset=N = map a byte offset to a function, see
+                                          Module.locate
+
+        /disassemble takes the query parameters format (one of OUTPUT_FORMATS),
+        only and skip (comma-separated section names) and func (repeatable).
+    """
+    daemon_threads = True
+    verbose = False
+
+    def __init__(self, address, max_modules=32, workers=4):
+        super().__init__(address, DisassemblyHandler)
+        self.modules = ModulePool(max_modules, workers)
+
+    def server_close(self):
+        super().server_close()
+        self.modules.shutdown()
+
+class DisassemblyHandler(BaseHTTPRequestHandler):
+    """ This class handles one request to a DisassemblyServer """
+    response_started = False
+
+    def do_GET(self):
+        self.handle_request(None)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.handle_request(self.rfile.read(length))
+
+    def handle_request(self, body):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        if url.path not in ('/disassemble', '/locate'):
+            self.send_error(404, 'Unknown endpoint: {}'.format(url.path))
+            return
+        try:
+            pooled = self.load_module(query, body)
+            if url.path == '/disassemble':
+                self.disassemble(pooled, query)
+            else:
+                self.locate(pooled, query)
+        except FileNotFoundError as error:
+            self.fail(404, error)
+        except PermissionError as error:
+            self.fail(403, error)
+        except OSError as error:
+            # a directory, or anything else that cannot be read as a module
+            self.fail(400, error)
+        except (ValueError, KeyError, IndexError, OverflowError, struct.error) as error:
+            # bad parameters, or a malformed or truncated module
+            self.fail(400, error)
+        except Exception as error:
+            self.log_error('%s: %s', type(error).__name__, error)
+            self.fail(500, error)
+
+    def fail(self, code, error):
+        # once part of the output is sent, the only way to fail is to cut it short
+        if self.response_started:
+            raise error
+        # the reason goes in the body, as the status line only takes latin-1
+        self.send_error(code, explain='{}: {}'.format(type(error).__name__, error))
+
+    def load_module(self, query, body):
+        if body is not None:
+            binary = bytes(body)
+            return self.server.modules.get(bytes_key(binary), lambda: binary)
+        if 'path' not in query:
+            raise ValueError('Missing module: give a path or POST the module')
+
+        path = query['path'][0]
+        return self.server.modules.get(path_key(path), lambda: parseFile(path))
+
+    def disassemble(self, pooled, query):
+        output_format = query.get('format', ['text'])[0]
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError('Unknown format: {}'.format(output_format))
+
+        sections = section_ids(query['only'][0].split(',')) if 'only' in query else None
+        if 'skip' in query:
+            skipped = section_ids(query['skip'][0].split(','))
+            sections = [idx for idx in (sections or TEXT_SECTION_ORDERING) if idx not in skipped]
+        functions = [int(value) for value in query['func']] if 'func' in query else None
+        sections, functions = resolve_selection(sections, functions)
+
+        def render():
+            stream = ResponseWriter(self, CONTENT_TYPES[output_format])
+            sectionList = pooled.sections(sections if sections is not None else TEXT_SECTION_ORDERING)
+            write_sections(sectionList, stream, pooled.module.version, sections, functions, output_format)
+            stream.flush()
+
+        self.server.modules.executor.submit(render).result()
+
+    def locate(self, pooled, query):
+        offset = int(query['offset'][0])
+        with pooled.lock:
+            found = pooled.module.locate(offset)
+
+        record = {'offset': offset, 'function': None, 'instruction': None}
+        if found is not None:
+            names = pooled.module.names
+            record['function'] = found[0]
+            record['name'] = names.function_name(found[0]) if names is not None else None
+            record['instruction'] = found[1]
+
+        body = json.dumps(record).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPES['json'])
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+# code that's only executed if this file itself is run
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Serve disassembly of .wasm files over local HTTP')
+    parser.add_argument('--host', default='127.0.0.1', help='the address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='the port to listen on (default: 8765)')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='parse and render modules on this many worker threads')
+    parser.add_argument('--max-modules', type=int, default=32,
+                        help='keep this many parsed modules in memory')
+    parser.add_argument('--verbose', '-v', action='store_true', help='log every request to stderr')
+    args = parser.parse_args()
+
+    server = DisassemblyServer((args.host, args.port), args.max_modules, args.workers)
+    server.verbose = args.verbose
+    print('Serving on http://{}:{}'.format(*server.server_address[:2]), file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,173 @@
+from constants import *
+
+# Builds valid .wasm modules of any size, for benchmarks and for stress tests
+# that need more than the few hundred bytes of the checked-in fixtures.
+
+def encode_uleb128(value):
+    """
+        this method encodes an unsigned integer as LEB128
+    """
+    output = bytearray()
+    while True:
+        byte = value & 0x7f
+        value >>= 7
+        if value:
+            output.append(byte | 0x80)
+        else:
+            output.append(byte)
+            return bytes(output)
+
+def encode_sleb128(value):
+    """
+        this method encodes a signed integer as LEB128
+    """
+    output = bytearray()
+    while True:
+        byte = value & 0x7f
+        value >>= 7
+        if (value == 0 and not byte & 0x40) or (value == -1 and byte & 0x40):
+            output.append(byte)
+            return bytes(output)
+        output.append(byte | 0x80)
+
+def encode_section(section_id, count, payload):
+    """
+        this method encodes a section holding `count` entries
+    """
+    payload = encode_uleb128(count) + payload
+    return bytes([section_id]) + encode_uleb128(len(payload)) + payload
+
+def function_body(instructions):
+    """
+        this method encodes a function body of type [] -> [] holding about
+        `instructions` instructions, pushing and dropping i32 constants
+
+        = Parameters =
+        instructions : int   = the number of instructions before the final end
+
+        = Return Value =
+        return       : bytes = the body, including its size
+    """
+    code = bytearray([0x00])
+    for i in range(instructions // 2):
+        # constants of every LEB128 length, positive and negative
+        code += b'\x41' + encode_sleb128((i * 2654435761 % (1 << 32)) - (1 << 31) >> (i % 32)) + b'\x1a'
+    if instructions % 2:
+        code.append(0x01)
+    code.append(END_OPCODE)
+    return encode_uleb128(len(code)) + bytes(code)
+
+# The value types the synthetic signatures and globals are made of.
+VALUE_TYPES = [0x7f, 0x7e, 0x7d, 0x7c]
+
+# The number of bytes in a page of linear memory.
+PAGE_SIZE = 1 << 16
+
+def encode_name(name):
+    """
+        this method encodes a string as its length followed by its UTF-8 bytes
+    """
+    data = name.encode('utf-8')
+    return encode_uleb128(len(data)) + data
+
+def func_type(index):
+    """
+        this method encodes the signature of the synthetic type at the index;
+        type 0 is [] -> [], which every defined function has, and the others
+        vary in their number of parameters and results
+    """
+    params = bytes(VALUE_TYPES[(index + k) % 4] for k in range(index % 5))
+    results = bytes([VALUE_TYPES[index % 4]]) if index % 3 == 1 else b''
+    return b'\x60' + encode_uleb128(len(params)) + params + encode_uleb128(len(results)) + results
+
+def data_payload(index, size):
+    """
+        this method returns `size` bytes of every value, starting from the index
+    """
+    pattern = bytes(range(256))
+    start = index % 256
+    return ((pattern[start:] + pattern[:start]) * (size // 256 + 1))[:size]
+
+def generate_module(functions=1, instructions=16, types=1, imports=0, globals=0,
+                    data_segments=0, data_size=0):
+    """
+        this method builds a valid module; counts, sizes, indices and constants
+        are all LEB128 encoded, so they take several bytes once they are large
+
+        = Parameters =
+        functions     : int   = the number of defined functions, all [] -> []
+        instructions  : int   = the number of instructions in each body
+        types         : int   = the number of types, at least 1
+        imports       : int   = the number of imported functions "env" "f<N>",
+                                of every type in turn
+        globals       : int   = the number of mutable i32 globals
+        data_segments : int   = the number of data segments, laid out one after
+                                another in a memory just large enough for them
+        data_size     : int   = the number of bytes in each data segment
+
+        = Return Value =
+        return        : bytes = the module
+    """
+    types = max(1, types)
+    sections = [WASM_MAGIC + b'\x01\x00\x00\x00']
+    sections.append(encode_section(SECTION_IDS['type'], types, b''.join(func_type(i) for i in range(types))))
+
+    if imports:
+        entries = b''.join(encode_name('env') + encode_name('f{}'.format(i)) + b'\x00' + encode_uleb128(i % types)
+                           for i in range(imports))
+        sections.append(encode_section(SECTION_IDS['import'], imports, entries))
+
+    if functions:
+        sections.append(encode_section(SECTION_IDS['function'], functions, b'\x00' * functions))
+
+    if data_segments:
+        pages = max(1, -(-data_segments * data_size // PAGE_SIZE))
+        sections.append(encode_section(SECTION_IDS['memory'], 1, b'\x00' + encode_uleb128(pages)))
+
+    if globals:
+        entries = b''.join(bytes([VALUE_TYPES[0], 0x01, 0x41]) + encode_sleb128(i) + bytes([END_OPCODE])
+                           for i in range(globals))
+        sections.append(encode_section(SECTION_IDS['global'], globals, entries))
+
+    if functions:
+        sections.append(encode_section(SECTION_IDS['code'], functions, function_body(instructions) * functions))
+
+    if data_segments:
+        entries = b''.join(b'\x00\x41' + encode_sleb128(i * data_size) + bytes([END_OPCODE]) +
+                           encode_uleb128(data_size) + data_payload(i, data_size)
+                           for i in range(data_segments))
+        sections.append(encode_section(SECTION_IDS['data'], data_segments, entries))
+
+    return b''.join(sections)
+
+def module_of_size(size, instructions=256):
+    """
+        this method builds a module of about `size` bytes out of functions of
+        `instructions` instructions each
+    """
+    return generate_module(max(1, size // len(function_body(instructions))), instructions)
+
+# code that's only executed if this file itself is run
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Write a synthetic .wasm module')
+    parser.add_argument('filename', help='the .wasm file to write')
+    parser.add_argument('--size', metavar='MB', type=float,
+                        help='build a module of about this many MB out of functions, ignoring the counts below')
+    parser.add_argument('--functions', type=int, default=1, help='the number of defined functions')
+    parser.add_argument('--instructions', type=int, default=16, help='the number of instructions in each body')
+    parser.add_argument('--types', type=int, default=1, help='the number of types')
+    parser.add_argument('--imports', type=int, default=0, help='the number of imported functions')
+    parser.add_argument('--globals', type=int, default=0, help='the number of globals')
+    parser.add_argument('--data-segments', type=int, default=0, help='the number of data segments')
+    parser.add_argument('--data-size', type=int, default=0, help='the number of bytes in each data segment')
+    args = parser.parse_args()
+
+    if args.size is not None:
+        binary = module_of_size(int(args.size * (1 << 20)), args.instructions)
+    else:
+        binary = generate_module(args.functions, args.instructions, args.types, args.imports, args.globals,
+                                 args.data_segments, args.data_size)
+    with open(args.filename, 'wb') as output:
+        output.write(binary)
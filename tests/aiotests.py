@@ -0,0 +1,65 @@
+import unittest
+import os, sys, json, asyncio
+dirname = os.path.realpath(__file__)
+dirname = dirname[:dirname[:dirname.rfind('/')].rfind('/')]
+sys.path.append(dirname)
+from aio import *
+import main
+
+STUFF = os.path.join(dirname, 'wasm_files', 'stuff', 'stuff.wasm')
+BLOCK = os.path.join(dirname, 'spec', 'wasm', 'block.wasm')
+
+async def collect(iterator):
+    return [chunk async for chunk in iterator]
+
+def run(coroutine):
+    # asyncio.run is only available from Python 3.7
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+class TestAsync(unittest.TestCase):
+
+    def test_disassemble_async(self):
+        for filename in (STUFF, BLOCK):
+            self.assertEqual(run(disassemble_async(filename)), main.disassemble(filename))
+            with open(filename, 'rb') as f:
+                self.assertEqual(run(disassemble_async(f.read())), main.disassemble(filename))
+
+        self.assertEqual(run(disassemble_async(BLOCK, functions=[1, 3])),
+                         main.disassemble(BLOCK, functions=[1, 3]))
+        self.assertEqual(run(disassemble_async(STUFF, sections=['type', 'export'])),
+                         main.disassemble(STUFF, sections=['type', 'export']))
+        self.assertEqual(json.loads(run(disassemble_async(BLOCK, output_format='json'))),
+                         json.loads(main.disassemble(BLOCK, output_format='json')))
+        self.assertRaises(ValueError, run, disassemble_async(BLOCK, functions=[10000]))
+
+    def test_chunks(self):
+        chunks = run(collect(iter_disassembly(BLOCK, chunk_bytes=64)))
+        self.assertGreater(len(chunks), 3)
+        self.assertEqual(''.join(chunks), main.disassemble(BLOCK))
+
+    def test_cancel(self):
+        rendered = []
+
+        async def scan():
+            async for chunk in iter_disassembly(BLOCK, chunk_bytes=16):
+                rendered.append(chunk)
+                await asyncio.sleep(0.01)
+
+        async def cancel_after_first_chunk():
+            task = asyncio.ensure_future(scan())
+            while not rendered:
+                await asyncio.sleep(0.001)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        run(cancel_after_first_chunk())
+        self.assertLess(len(rendered), len(run(collect(iter_disassembly(BLOCK, chunk_bytes=16)))))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+import unittest
+import io, os, sys, tempfile
+dirname = os.path.realpath(__file__)
+dirname = dirname[:dirname[:dirname.rfind('/')].rfind('/')]
+sys.path.append(dirname)
+from unittest import mock
+from cache import *
+import main
+import section
+
+FACTORIAL = os.path.join(dirname, 'wasm_files', 'factorial', 'factorial.wasm')
+
+class TestDisassemblyCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = DisassemblyCache(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_key_depends_on_content_and_options(self):
+        self.assertEqual(self.cache.key(b'\0asm'), self.cache.key(bytearray(b'\0asm')))
+        self.assertNotEqual(self.cache.key(b'\0asm'), self.cache.key(b'\0asn'))
+        self.assertNotEqual(self.cache.key(b'\0asm'), self.cache.key(b'\0asm', 'option'))
+
+    def test_put_and_get(self):
+        self.assertIsNone(self.cache.get('missing'))
+        self.cache.put('key', '(module)\n')
+        self.assertEqual(self.cache.get('key'), '(module)\n')
+
+    def test_abort_leaves_no_entry(self):
+        entry = self.cache.writer('key')
+        entry.write('(module')
+        entry.abort()
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    def test_entry_evicted_while_read(self):
+        self.cache.put('key', '(module)\n')
+        output = io.StringIO()
+        # another process removes the entry between opening and touching it
+        with mock.patch('os.utime', side_effect=FileNotFoundError):
+            self.assertTrue(self.cache.copy_to('key', output))
+            self.assertEqual(self.cache.get('key'), '(module)\n')
+        self.assertEqual(output.getvalue(), '(module)\n')
+
+    def test_evicts_least_recently_used(self):
+        for i, key in enumerate(['a', 'b', 'c']):
+            self.cache.put(key, os.urandom(1000).hex())
+            os.utime(self.cache.path(key), (i, i))
+
+        # reading 'a' makes 'b' the least recently used entry
+        self.cache.get('a')
+        self.cache.max_bytes = os.path.getsize(self.cache.path('a')) + os.path.getsize(self.cache.path('c'))
+        self.cache.evict()
+
+        self.assertIsNotNone(self.cache.get('a'))
+        self.assertIsNone(self.cache.get('b'))
+        self.assertIsNotNone(self.cache.get('c'))
+
+    def test_hit_skips_parsing(self):
+        expected = main.disassemble(FACTORIAL)
+        self.assertEqual(main.disassemble(FACTORIAL, cache=self.cache), expected)
+
+        with mock.patch.object(main, 'makeSectionList', side_effect=AssertionError('parsed on a cache hit')):
+            self.assertEqual(main.disassemble(FACTORIAL, cache=self.cache), expected)
+
+class TestFunctionCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = FunctionCache(os.path.join(self.directory.name, 'functions.sqlite3'))
+
+    def tearDown(self):
+        self.cache.close()
+        self.directory.cleanup()
+
+    def test_put_and_get(self):
+        key = self.cache.key(b'\x00\x0b')
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, '    nop\n')
+        self.assertEqual(self.cache.get(key), '    nop\n')
+        self.assertNotEqual(key, self.cache.key(b'\x00\x01\x0b'))
+
+    def test_evicts_least_recently_used(self):
+        keys = [self.cache.key(bytes([i])) for i in range(3)]
+        for key in keys:
+            self.cache.put(key, 'x' * 100)
+        self.cache.get(keys[0])
+        self.cache.max_bytes = 200
+        self.cache.commit()
+
+        self.assertIsNotNone(self.cache.get(keys[0]))
+        self.assertIsNone(self.cache.get(keys[1]))
+        self.assertIsNotNone(self.cache.get(keys[2]))
+
+    def test_size_is_tracked(self):
+        keys = [self.cache.key(bytes([i])) for i in range(3)]
+        for key in keys:
+            self.cache.put(key, 'x' * 100)
+        self.cache.put(keys[0], 'x' * 100)
+        self.cache.commit()
+        self.assertEqual(self.cache.size(), 300)
+        self.cache.max_bytes = 150
+        self.cache.get(keys[2])
+        self.cache.commit()
+        self.assertEqual(self.cache.size(), 100)
+
+    def test_pending_entries_are_bounded(self):
+        import cache
+        with mock.patch.object(cache, 'PENDING_ENTRIES', 4), mock.patch.object(cache, 'PENDING_BYTES', 250):
+            keys = [self.cache.key(bytes([i])) for i in range(10)]
+            for key in keys[:3]:
+                self.cache.put(key, 'x' * 100)
+            # the third entry takes the pending text past PENDING_BYTES
+            self.assertEqual(len(self.cache._new), 0)
+            self.assertEqual(self.cache.size(), 300)
+            for key in keys[3:]:
+                self.cache.put(key, 'x')
+            self.assertLess(len(self.cache._new), 4)
+            for key in keys * 2:
+                self.cache.get(key)
+            self.assertLess(len(self.cache._used), 4)
+
+    def test_locked_database(self):
+        import sqlite3
+        key = self.cache.key(b'\x00\x0b')
+        self.cache.put(key, '    nop\n')
+        self.cache.connection.execute('PRAGMA busy_timeout = 10')
+
+        other = sqlite3.connect(self.cache.path, isolation_level=None)
+        other.execute('BEGIN EXCLUSIVE')
+        try:
+            # neither reading nor committing fails while another process writes
+            self.assertIsNone(self.cache.get(self.cache.key(b'\x01\x0b')))
+            self.cache.commit()
+        finally:
+            other.execute('ROLLBACK')
+            other.close()
+        self.assertIsNone(self.cache.get(key))
+        self.assertEqual(main.disassemble(FACTORIAL, function_cache=self.cache), main.disassemble(FACTORIAL))
+
+    def test_hit_skips_decoding(self):
+        expected = main.disassemble(FACTORIAL)
+        self.assertEqual(main.disassemble(FACTORIAL, function_cache=self.cache), expected)
+
+        with mock.patch.object(section, 'FunctionBody', side_effect=AssertionError('decoded a cached body')):
+            self.assertEqual(main.disassemble(FACTORIAL, function_cache=self.cache), expected)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import os, sys, json
+dirname = os.path.realpath(__file__)
+dirname = dirname[:dirname[:dirname.rfind('/')].rfind('/')]
+sys.path.append(dirname)
+from incremental import *
+import main
+
+FACTORIAL = os.path.join(dirname, 'wasm_files', 'factorial', 'factorial.wasm')
+STUFF = os.path.join(dirname, 'wasm_files', 'stuff', 'stuff.wasm')
+
+def read(filename):
+    with open(filename, 'rb') as f:
+        return f.read()
+
+class TestIncremental(unittest.TestCase):
+    def setUp(self):
+        self.factorial = read(FACTORIAL)
+        # f64.lt -> f64.gt in the body of the only function
+        changed = bytearray(self.factorial)
+        changed[changed.rindex(0x63)] = 0x64
+        self.changed = bytes(changed)
+
+    def test_full_text(self):
+        for filename in (FACTORIAL, STUFF):
+            state = redisassemble(None, read(filename))
+            self.assertEqual(state.to_str(), main.disassemble(filename))
+
+    def test_unchanged_module_is_not_decoded(self):
+        previous = redisassemble(None, self.factorial)
+        self.assertEqual(previous.decoded, 1)
+        current = redisassemble(previous, self.factorial)
+        self.assertEqual(current.decoded, 0)
+        self.assertNotIn('export', current.reparsed)
+        self.assertEqual(current.to_str(), previous.to_str())
+
+        diff = diff_states(previous, current)
+        self.assertEqual(diff['sections'], {'added': [], 'removed': [], 'changed': []})
+        self.assertEqual(diff['functions'], {'added': [], 'removed': [], 'changed': []})
+
+    def test_changed_function(self):
+        previous = redisassemble(None, self.factorial)
+        current = redisassemble(previous, self.changed)
+        self.assertEqual(current.decoded, 1)
+        self.assertIn('f64.gt', current.to_str())
+
+        diff = diff_states(previous, current)
+        self.assertEqual(diff['sections']['changed'], ['code'])
+        self.assertEqual([f['index'] for f in diff['functions']['changed']], [0])
+        self.assertIn('f64.lt', diff['functions']['changed'][0]['old'])
+        self.assertIn('f64.gt', diff['functions']['changed'][0]['new'])
+        json.dumps(diff)
+
+    def test_added_sections_and_functions(self):
+        previous = redisassemble(None, self.factorial)
+        current = redisassemble(previous, read(STUFF))
+        diff = diff_states(previous, current)
+        self.assertIn('import', diff['sections']['added'])
+        self.assertEqual(diff['functions']['added'], [1])
+        self.assertEqual(current.to_str(), main.disassemble(STUFF))
+
+    def test_changed_start_index(self):
+        # the start section is nothing but its count, the function index
+        def make_module(start):
+            return bytes([0x00, 0x61, 0x73, 0x6d, 0x01, 0x00, 0x00, 0x00,
+                          0x01, 0x04, 0x01, 0x60, 0x00, 0x00,
+                          0x03, 0x03, 0x02, 0x00, 0x00,
+                          0x08, 0x01, start,
+                          0x0a, 0x07, 0x02, 0x02, 0x00, 0x0b, 0x02, 0x00, 0x0b])
+
+        previous = redisassemble(None, make_module(0))
+        current = redisassemble(previous, make_module(1))
+        self.assertIn('(start 1)', current.to_str())
+        self.assertEqual(diff_states(previous, current)['sections']['changed'], ['start'])
+
+if __name__ == '__main__':
+    unittest.main()
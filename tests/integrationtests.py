@@ -3,9 +3,12 @@ import os, sys, difflib
 dirname = os.path.realpath(__file__)
 dirname = dirname[:dirname[:dirname.rfind('/')].rfind('/')]
 sys.path.append(dirname)
-import shlex, subprocess
+import io, json, shlex, subprocess, tempfile
 
-from main import disassemble
+from main import disassemble, disassemble_to, split_functions
+from constants import OPCODES
+from batch import disassemble_all
+from extract import extract_data, write_data
 
 class TestDissassembly(unittest.TestCase):
     def setUp(self):
@@ -39,6 +42,87 @@ class TestDissassembly(unittest.TestCase):
             print(file)
             self.assert_disassemble(wasm_path)
 
+    def test_mmap(self):
+        test_dir = './wasm_files'
+        for file in os.listdir(test_dir):
+            file_path = os.path.join(test_dir, file)
+            if not os.path.isdir(file_path):
+                continue
+            wasm_path = os.path.join(file_path, '{}.wasm'.format(file))
+            self.assertEqual(disassemble(wasm_path, use_mmap=True), disassemble(wasm_path))
+
+    def test_stream(self):
+        test_dir = './wasm_files'
+        for file in os.listdir(test_dir):
+            file_path = os.path.join(test_dir, file)
+            if not os.path.isdir(file_path):
+                continue
+            wasm_path = os.path.join(file_path, '{}.wasm'.format(file))
+            stream = io.StringIO()
+            disassemble_to(wasm_path, stream)
+            self.assertEqual(stream.getvalue(), disassemble(wasm_path))
+
+    def test_jobs(self):
+        test_dir = './spec/wasm'
+        for file in ['address.wasm', 'block.wasm', 'int_exprs.wasm']:
+            wasm_path = os.path.join(test_dir, file)
+            self.assertEqual(disassemble(wasm_path, jobs=2), disassemble(wasm_path))
+
+    def test_split_functions(self):
+        self.assertEqual(split_functions([4, 4, 4, 4], 2), [(0, 2), (2, 4)])
+        self.assertEqual(split_functions([10, 1, 1, 1], 2), [(0, 1), (1, 4)])
+        self.assertEqual(split_functions([], 4), [])
+
+    def test_sections(self):
+        wasm_path = './wasm_files/stuff/stuff.wasm'
+        full = disassemble(wasm_path).splitlines()
+        only = disassemble(wasm_path, sections=['type', 'export']).splitlines()
+        self.assertEqual(only[1:-1], [line for line in full if line.startswith('  (type')])
+        self.assertTrue(only[-1].startswith('  (export'))
+
+        # sections that are not asked for, or needed by one that is, are never parsed
+        from unittest import mock
+        import section
+        with mock.patch.object(section.DataSection, '__init__', side_effect=AssertionError):
+            disassemble(wasm_path, sections=['code'])
+
+    def test_functions(self):
+        wasm_path = './spec/wasm/block.wasm'
+        full = disassemble(wasm_path)
+        one = disassemble(wasm_path, functions=[1])
+        self.assertTrue(one.startswith('(module\n  (func (;1;) '))
+        self.assertIn(one[len('(module\n'):-len(')\n')], full)
+        self.assertRaises(ValueError, disassemble, wasm_path, functions=[10000])
+
+    def test_json(self):
+        wasm_path = './spec/wasm/block.wasm'
+        with open(wasm_path, 'rb') as f:
+            binary = f.read()
+
+        document = json.loads(disassemble(wasm_path, output_format='json'))
+        records = [json.loads(line) for line in disassemble(wasm_path, output_format='ndjson').splitlines()]
+        self.assertEqual(records[0]['record'], 'module')
+        self.assertEqual(records[0]['sections'], document['sections'])
+        self.assertEqual([dict(r, record='function') for r in document['functions']], records[1:])
+
+        # every instruction offset points at its opcode in the module, and the
+        # instructions cover the whole body up to its final end
+        for function in document['functions']:
+            for instruction in function['instructions']:
+                self.assertEqual(OPCODES[binary[instruction[0]]][0], instruction[1])
+            self.assertEqual(function['instructions'][-1], [function['offset'] + function['size'] - 1, 'end'])
+        self.assertEqual(document['functions'][2]['instructions'],
+                         [[247, 'block', None], [249, 'nop'], [250, 'end'],
+                          [251, 'block', 'i32'], [253, 'i32.const', 7], [255, 'end'], [256, 'end']])
+
+        address = json.loads(disassemble('./spec/wasm/address.wasm', functions=[1], output_format='json'))
+        self.assertIn(['i32.load8_u', {'align': 1, 'offset': 1}],
+                      [instruction[1:] for instruction in address['functions'][0]['instructions']])
+
+        one = [json.loads(line) for line in disassemble(wasm_path, functions=[2], output_format='ndjson').splitlines()]
+        self.assertEqual(one[0]['sections'], {})
+        self.assertEqual(one[1], records[3])
+
     def assert_disassemble(self, wasm_path):
         wasm = open(wasm_path, 'rb')
         expected_output_data  = wasm.read()
@@ -63,5 +147,48 @@ class TestDissassembly(unittest.TestCase):
 
         self.assertEqual(gen_bytes, exp_bytes)
 
+class TestStartup(unittest.TestCase):
+    def test_no_heavy_imports(self):
+        # keep `python main.py` startup cheap: nothing on the decode path
+        # should pull in numpy or multiprocessing
+        args = [sys.executable, '-c', 'import sys, main; print(sorted(set(sys.modules) & {"numpy", "multiprocessing"}))']
+        output = subprocess.check_output(args, cwd=dirname)
+        self.assertEqual(output.strip(), b'[]')
+
+class TestBatch(unittest.TestCase):
+    def test_disassemble_all(self):
+        with tempfile.TemporaryDirectory() as out_dir:
+            records = disassemble_all(['./wasm_files'], out_dir=out_dir, jobs=2)
+            self.assertEqual(len(records), len(os.listdir('./wasm_files')) - 2)
+            for record in records:
+                self.assertIsNone(record['error'])
+                wat_file = open(record['output'])
+                self.assertEqual(wat_file.read(), disassemble(record['input']))
+                wat_file.close()
+
+class TestExtract(unittest.TestCase):
+    def test_extract_data(self):
+        wasm_path = './spec/wasm/data.wasm'
+        with open(wasm_path, 'rb') as f:
+            binary = f.read()
+
+        with tempfile.TemporaryDirectory() as out_dir:
+            records = extract_data(wasm_path, out_dir)
+            self.assertEqual(len(records), 12)
+            for record in records:
+                with open(record['output'], 'rb') as f:
+                    payload = f.read()
+                self.assertEqual(len(payload), record['size'])
+                self.assertEqual(payload, binary[record['file_offset']:record['file_offset'] + record['size']])
+
+            with open(os.path.join(out_dir, 'data.data.json')) as f:
+                self.assertEqual(json.load(f)['segments'], records)
+
+    def test_write_data(self):
+        stream = io.BytesIO()
+        records = write_data('./wasm_files/stuff/stuff.wasm', stream)
+        self.assertEqual(stream.getvalue(), b'hi')
+        self.assertEqual([record['offset'] for record in records], ['i32.const 0'])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
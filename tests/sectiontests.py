@@ -6,9 +6,121 @@ sys.path.append(dirname)
 from section import *
 from random import *
 from constants import *
+from synthetic import *
 
 # how to write a testcase here: https://docs.python.org/3/library/unittest.html
 
+class TestLEB128(unittest.TestCase):
+    def test_read_uleb128(self):
+        self.assertEqual(read_uleb128(b'\x02', 0), (2, 1))
+        self.assertEqual(read_uleb128(b'\x00\xe5\x8e\x26', 1), (624485, 4))
+
+    def test_read_sleb128(self):
+        self.assertEqual(read_sleb128(b'\x7f', 0), (-1, 1))
+        self.assertEqual(read_sleb128(b'\xe4\x00', 0), (100, 2))
+        self.assertEqual(read_sleb128(b'\xc0\xbb\x78', 0), (-123456, 3))
+
+    def test_decode_uleb128_array(self):
+        self.assertEqual(decode_uleb128_array(b'\x01\x80\x01\x03', 0, 3), ([1, 128, 3], 4))
+
+    def test_multi_byte_section_size(self):
+        # a type section whose size (0xc1 0x01 = 193) takes two bytes
+        module = bytearray([0x01, 0xc1, 0x01, 0x40]) + bytearray([0x60, 0x00, 0x00]) * 0x40 + bytearray([0x03, 0x02, 0x01, 0x00])
+        sectionList = makeSectionList(module)
+        self.assertEqual(sectionList[1].sectionSize, 193)
+        self.assertEqual(TypeSection(sectionList[1]).func_count, 0x40)
+        self.assertEqual(FunctionSection(sectionList[3]).function_idx, [0])
+
+class TestReader(unittest.TestCase):
+    def test_read_advances_offset(self):
+        reader = Reader(bytearray([0x01, 0x02, 0x03, 0x04]))
+        self.assertEqual(reader.read_byte(), 0x01)
+        self.assertEqual(reader.read_bytes(2), bytearray([0x02, 0x03]))
+        self.assertEqual(reader.offset, 3)
+        self.assertFalse(reader.eof())
+        self.assertEqual(reader.read_byte(), 0x04)
+        self.assertTrue(reader.eof())
+        self.assertRaises(IndexError, reader.read_byte)
+
+    def test_sections_share_module_buffer(self):
+        # a type section followed by a function section
+        module = bytearray([0x01, 0x04, 0x01, 0x60, 0x00, 0x00, 0x03, 0x02, 0x01, 0x00])
+        sectionList = makeSectionList(module)
+        self.assertEqual(sectionList[1].data, bytearray([0x60, 0x00, 0x00]))
+        self.assertEqual(sectionList[3].data, bytearray([0x00]))
+        self.assertIs(sectionList[1].data.obj, module)
+        self.assertIs(sectionList[3].data.obj, module)
+
+class TestSectionIndex(unittest.TestCase):
+    # a custom section "a", a type section whose size is a padded two-byte
+    # varuint32, a function section and a code section with one empty body
+    module = bytes([0x00, 0x61, 0x73, 0x6d, 0x01, 0x00, 0x00, 0x00,
+                    0x00, 0x03, 0x01, 0x61, 0xff,
+                    0x01, 0x84, 0x00, 0x01, 0x60, 0x00, 0x00,
+                    0x03, 0x02, 0x01, 0x00,
+                    0x0a, 0x04, 0x01, 0x02, 0x00, 0x0b])
+
+    def test_index_sections(self):
+        index = index_sections(self.module)
+        self.assertEqual([(h.id, h.offset, h.size, h.count) for h in index],
+                         [(0, 10, 3, None), (1, 16, 4, 1), (3, 22, 2, 1), (10, 26, 4, 1)])
+        self.assertEqual(index[1].section(self.module).data, bytes([0x60, 0x00, 0x00]))
+
+    def test_not_a_module(self):
+        self.assertRaises(ValueError, index_sections, b'\x00asn\x01\x00\x00\x00')
+        self.assertRaises(ValueError, index_sections, b'')
+
+    def test_module_parses_lazily(self):
+        from module import Module
+        module = Module(self.module)
+        self.assertEqual(module.function_count(), 1)
+        self.assertEqual(module.exports(), [])
+        self.assertEqual(module.parsed_sections()[1:], [None] * 11)
+        self.assertEqual([(s.name, s.offset, s.size) for s in module.custom_sections], [('a', 12, 1)])
+
+        code = module.section(SECTION_IDS['code'])
+        self.assertEqual(code.count, 1)
+        parsed = [i for i, section in enumerate(module.parsed_sections()) if i > 0 and section is not None]
+        self.assertEqual(parsed, [1, 3, 10])
+        self.assertIsNone(module.section(SECTION_IDS['data']))
+
+class TestNameSection(unittest.TestCase):
+    def make_module(self, names):
+        # one imported function "m" "f" and two defined functions, all (func)
+        name_map = bytearray([len(names)])
+        for index, name in names:
+            name_map += bytes([index, len(name)]) + name.encode('utf-8')
+        name_section = bytes([0x04]) + b'name' + bytes([0x01, len(name_map)]) + name_map
+        return bytes([0x00, 0x61, 0x73, 0x6d, 0x01, 0x00, 0x00, 0x00,
+                      0x01, 0x04, 0x01, 0x60, 0x00, 0x00,
+                      0x02, 0x07, 0x01, 0x01, 0x6d, 0x01, 0x66, 0x00, 0x00,
+                      0x03, 0x03, 0x02, 0x00, 0x00,
+                      0x0a, 0x07, 0x02, 0x02, 0x00, 0x0b, 0x02, 0x00, 0x0b,
+                      0x00, len(name_section)]) + name_section
+
+    def test_function_names(self):
+        sectionList = makeSectionList(Reader(self.make_module([(0, 'f'), (2, 'second')]), 8))
+        self.assertEqual([section.name for section in sectionList[0]], ['name'])
+        for idx, section_class in enumerate(SECTION_CLASSES):
+            if sectionList[idx + 1] is not None:
+                sectionList[idx + 1] = section_class(sectionList[idx + 1], sectionList)
+
+        code = sectionList[SECTION_IDS['code']]
+        self.assertEqual(code.names.function_names, {0: 'f', 2: 'second'})
+        self.assertEqual(code.to_str(), '  (func (;0;) (type $t0) )\n  (func $second (type $t0) )\n')
+
+    def test_module_locate(self):
+        from module import Module
+        module = Module(self.make_module([]))
+        # the second body starts at 34 with its size; function 0 is imported
+        self.assertEqual(module.locate(34), (2, None))
+        self.assertIsNone(module.locate(10))
+
+    def test_names_are_valid_and_unique(self):
+        from module import Module
+        names = Module(self.make_module([(1, 'a b'), (2, 'a_b')])).names
+        self.assertEqual(names.function_names, {1: 'a_b', 2: 'a_b.1'})
+
 # an example 
 class TestFunctionSection(unittest.TestCase):
 
@@ -17,6 +129,86 @@ class TestFunctionSection(unittest.TestCase):
         self.assertEqual(1, 1)
         pass
 
+class TestCodeSection(unittest.TestCase):
+    def make_code_section(self, data=None, count=2):
+        typeSection = Section()
+        typeSection.data = bytearray([0x60, 0x00, 0x00])
+        typeSection.numTypes = 1
+        typeSection = TypeSection(typeSection)
+
+        functionSection = Section()
+        functionSection.data = bytearray([0x00] * count)
+        functionSection.numTypes = count
+        functionSection = FunctionSection(functionSection)
+
+        codeSection = Section()
+        # (func) and (func i32.const 5 drop)
+        codeSection.data = data or bytearray([0x02, 0x00, 0x0b, 0x05, 0x00, 0x41, 0x05, 0x1a, 0x0b])
+        codeSection.numTypes = count
+        return CodeSection(codeSection, [None, typeSection, None, functionSection])
+
+    def test_bodies_are_indexed(self):
+        section = self.make_code_section()
+        self.assertEqual(section.body_offsets, [0, 3])
+        self.assertEqual(section.body_sizes, [2, 5])
+        self.assertEqual(section._bodies, {})
+
+    def test_function_decodes_on_demand(self):
+        section = self.make_code_section()
+        body = section.function(1)
+        self.assertEqual(list(section._bodies), [1])
+        self.assertEqual(body.instructions, [('i32.const', 5), ('drop',)])
+        self.assertIs(section.function(1), body)
+        self.assertEqual(section.to_str(), '  (func (;0;) (type $t0) )\n  (func (;1;) (type $t0) \n    i32.const 5\n    drop)\n')
+
+    def test_locate(self):
+        section = self.make_code_section()
+        self.assertEqual(section.locate(5), (1, 0))
+        self.assertEqual(section.locate(6), (1, 0))
+        self.assertEqual(section.locate(7), (1, 1))
+        # only the function found is decoded
+        self.assertEqual(list(section._instruction_offsets), [1])
+        self.assertEqual(section.locate(0), (0, None))
+        self.assertIsNone(section.locate(9))
+        self.assertIsNone(section.locate(-1))
+
+    def test_locate_skipped_and_typed_block_instructions(self):
+        # nop nop block (result i32) i32.const 1 end drop unreachable end
+        section = self.make_code_section(bytearray([0x0b, 0x00, 0x01, 0x01, 0x02, 0x7f, 0x41, 0x01,
+                                                    0x0b, 0x1a, 0x00, 0x0b]), count=1)
+        self.assertEqual(list(section.instruction_offsets(0)), [2, 3, 4, 6, 8, 9, 10, 11])
+        self.assertEqual([record[1:] for record in section.instruction_records(0)],
+                         [['nop'], ['nop'], ['block', 'i32'], ['i32.const', 1], ['end'], ['drop'],
+                          ['unreachable'], ['end']])
+        self.assertEqual(section.locate(2), (0, 0))
+        self.assertEqual(section.locate(3), (0, 1))
+        # the block type byte belongs to the block
+        self.assertEqual(section.locate(5), (0, 2))
+        self.assertEqual(section.locate(10), (0, 6))
+
+class TestOpcodeTable(unittest.TestCase):
+    def test_every_opcode_has_a_decoder(self):
+        self.assertEqual(len(OPCODE_DECODERS), 256)
+        buffer = bytearray([0x00, 0x00, 0x00])
+        self.assertEqual(OPCODE_DECODERS[0x6a](buffer, 0, 0, None), (0, 0))
+        self.assertEqual(OPCODE_DECODERS[0x20](buffer, 0, 0, None), (0, 1))
+        self.assertEqual(OPCODE_DECODERS[0x28](buffer, 0, 0, None), (0, 2))
+        self.assertEqual(OPCODE_DECODERS[0x01](buffer, 0, 0, None), (None, 0))
+        self.assertRaises(KeyError, OPCODE_DECODERS[0xff], buffer, 0, 0, None)
+
+    def test_instruction_store(self):
+        # i32.const -2, f32.const 1.5, br_table 1 0, get_local 3, nop, end
+        buffer = bytearray([0x41, 0x7e, 0x43, 0x00, 0x00, 0xc0, 0x3f, 0x0e, 0x01, 0x01, 0x00,
+                            0x20, 0x03, 0x01, 0x0b])
+        instructions, index = decode_instructions(buffer, 0, len(buffer), 0)
+        self.assertEqual(index, 14)
+        self.assertEqual(len(instructions), 4)
+        self.assertEqual(list(instructions), [('i32.const', -2), ('f32.const', 1.5), ('br_table', '1 0'), ('get_local', 3)])
+        self.assertEqual(instructions[3], ('get_local', 3))
+        self.assertEqual(instructions.name(2), 'br_table')
+        self.assertEqual(list(instructions.offsets), [0, 2, 7, 11])
+        self.assertEqual(instructions.opcodes.itemsize, 1)
+
 class TestElementSection(unittest.TestCase):
     def test_one_elem_seg(self):
         section = Section()
@@ -44,10 +236,24 @@ class TestDataSection(unittest.TestCase):
         self.assertEqual(section.dataSegs[0].index,0x00)
         self.assertEqual(section.dataSegs[0].offset, bytearray([0x41,0x00,0x0b]))
         self.assertEqual(section.dataSegs[0].dataSize,0x02)
-        self.assertEqual(section.dataSegs[0].data ,[0x68,0x69])
+        self.assertEqual(section.dataSegs[0].data, b'hi')
+        self.assertIs(section.dataSegs[0].data.obj, section.dataSegs[0].offset.obj)
         self.assertEqual(len(section.dataSegs[0].data),section.dataSegs[0].dataSize)
+
+    def test_escaped_data(self):
+        section = Section()
+        section.data = bytearray([0x00, 0x41, 0x00, 0x0b, 0x05, 0x61, 0x00, 0x22, 0x5c, 0xff])
+        section.numTypes = 1
+        section = DataSection(section)
+        self.assertEqual(section.to_str(), '  (data (i32.const 0) "a\\00\\22\\5c\\ff")\n')
         
 
+class TestTableSection(unittest.TestCase):
+    def test_table_without_maximum(self):
+        section = Section()
+        section.populate(Reader(bytes([0x04, 0x04, 0x01, 0x70, 0x00, 0x0a])))
+        self.assertEqual(TableSection(section).to_str(), '  (table (;0;) 10 anyfunc)\n')
+
 class TestStartSection(unittest.TestCase):
     def test_start_section(self):
         section = Section()
@@ -144,6 +350,32 @@ class TestImportSection(unittest.TestCase):
         self.assertEqual(importSection.entries[0].kind, 'function')
         self.assertEqual(importSection.entries[0].kindType, 0)
 
+    def test_import_kinds(self):
+        def name(text):
+            return [len(text)] + list(text.encode('utf-8'))
+
+        importSection = Section()
+        importSection.data = bytearray(name('env') + name('memory') + [0x02, 0x01, 0x01, 0x02] +
+                                       name('env') + name('table') + [0x01, 0x70, 0x00, 0x0a] +
+                                       name('env') + name('g') + [0x03, 0x7f, 0x01] +
+                                       name('env') + name('h') + [0x03, 0x7c, 0x00] +
+                                       name('a') + name('f') + [0x00, 0x00] +
+                                       name('b') + name('f') + [0x00, 0x00])
+        importSection.numTypes = 6
+
+        typeSection = Section()
+        typeSection.data = bytearray([0x60, 0x00, 0x00])
+        typeSection.numTypes = 1
+
+        importSection = ImportSection(importSection, [None, TypeSection(typeSection)])
+        self.assertEqual(importSection.to_str(),
+                         '  (import "env" "memory" (memory 1 2))\n'
+                         '  (import "env" "table" (table 10 anyfunc))\n'
+                         '  (import "env" "g" (global (mut i32)))\n'
+                         '  (import "env" "h" (global f64))\n'
+                         '  (import "a" "f" (func $a.f (type $t0)))\n'
+                         '  (import "b" "f" (func $b.f_1 (type $t0)))\n')
+
 class TestExportSection(unittest.TestCase):
     def test_one_export(self):
         exportSection = Section()
@@ -165,6 +397,22 @@ class TestExportSection(unittest.TestCase):
         self.assertEqual(exportSection.entries[0].kind, 'function')
         self.assertEqual(exportSection.entries[0].kindType, 0)
 
+    def test_export_kinds(self):
+        exportSection = Section()
+        exportSection.data = bytearray([0x01, 0x66, 0x00, 0x02,
+                                        0x01, 0x74, 0x01, 0x00,
+                                        0x06, 0x6d, 0x65, 0x6d, 0x6f, 0x72, 0x79, 0x02, 0x00,
+                                        0x01, 0x67, 0x03, 0x81, 0x01])
+        exportSection.numTypes = 4
+
+        exportSection = ExportSection(exportSection, [None, Section()])
+        self.assertEqual([entry.kindType for entry in exportSection.entries], [2, 0, 0, 129])
+        self.assertEqual(exportSection.to_str(),
+                         '  (export "f" (func 2))\n'
+                         '  (export "t" (table 0))\n'
+                         '  (export "memory" (memory 0))\n'
+                         '  (export "g" (global 129))\n')
+
 class TestGlobalSection(unittest.TestCase):
 
     def test_one_global_var(self):
@@ -179,5 +427,37 @@ class TestGlobalSection(unittest.TestCase):
         self.assertEqual(section.globals[0].initial_expr.constant[0], 'i32.const')
         self.assertEqual(section.globals[0].initial_expr.literal, 0)
 
+class TestSyntheticModules(unittest.TestCase):
+    def test_leb128_round_trip(self):
+        for value in [0, 1, 63, 64, 127, 128, 16383, 16384, 2 ** 21, 2 ** 28, 2 ** 32 - 1]:
+            self.assertEqual(read_uleb128(encode_uleb128(value), 0), (value, len(encode_uleb128(value))))
+        for value in [0, -1, 63, -64, 64, -65, 8191, -8192, 2 ** 31 - 1, -2 ** 31]:
+            self.assertEqual(read_sleb128(encode_sleb128(value), 0)[0], value)
+
+    def test_multi_byte_counts_and_sizes(self):
+        # every count is over 127 and the data section is over 2 MB, so counts,
+        # type indices, segment sizes and section sizes all take several bytes
+        binary = generate_module(functions=200, instructions=300, types=150, imports=300, globals=130,
+                                 data_segments=130, data_size=20000)
+        sectionList = makeSectionList(Reader(binary, 8))
+        for section_id in [1, 2, 3, 5, 6, 10, 11]:
+            self.assertIsNotNone(sectionList[section_id])
+        self.assertGreater(sectionList[SECTION_IDS['data']].sectionSize, 1 << 21)
+        for idx in sorted(required_sections(SECTION_NAMES)):
+            if sectionList[idx] is not None:
+                sectionList[idx] = SECTION_CLASSES[idx - 1](sectionList[idx], sectionList)
+
+        self.assertEqual(len(sectionList[SECTION_IDS['type']].func_types), 150)
+        self.assertEqual([entry.kindType for entry in sectionList[SECTION_IDS['import']].entries][-2:], [148, 149])
+        self.assertEqual(len(sectionList[SECTION_IDS['global']].globals), 130)
+        self.assertEqual(sectionList[SECTION_IDS['global']].globals[129].initial_expr.literal, 129)
+        code = sectionList[SECTION_IDS['code']]
+        self.assertEqual(code.count, 200)
+        self.assertEqual(len(code.function(199).instructions), 300)
+        segments = sectionList[SECTION_IDS['data']].dataSegs
+        self.assertEqual(len(segments), 130)
+        self.assertEqual(bytes(segments[129].data), data_payload(129, 20000))
+        self.assertEqual(segments[129].offset_expr.literal, 129 * 20000)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+import os, sys, json, threading
+from urllib.error import HTTPError
+from urllib.parse import quote
+from urllib.request import Request, urlopen
+dirname = os.path.realpath(__file__)
+dirname = dirname[:dirname[:dirname.rfind('/')].rfind('/')]
+sys.path.append(dirname)
+from server import *
+import main
+
+STUFF = os.path.join(dirname, 'wasm_files', 'stuff', 'stuff.wasm')
+BLOCK = os.path.join(dirname, 'spec', 'wasm', 'block.wasm')
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        self.server = DisassemblyServer(('127.0.0.1', 0), max_modules=2, workers=2)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.base = 'http://127.0.0.1:{}'.format(self.server.server_address[1])
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def get(self, endpoint, data=None):
+        with urlopen(Request(self.base + endpoint, data=data)) as response:
+            return response.read().decode('utf-8')
+
+    def test_disassemble_path(self):
+        for filename in (STUFF, BLOCK):
+            self.assertEqual(self.get('/disassemble?path=' + quote(filename)), main.disassemble(filename))
+
+        one = self.get('/disassemble?path={}&func=1&format=ndjson'.format(quote(BLOCK)))
+        self.assertEqual(one, main.disassemble(BLOCK, functions=[1], output_format='ndjson'))
+        only = self.get('/disassemble?path={}&only=type,export'.format(quote(STUFF)))
+        self.assertEqual(only, main.disassemble(STUFF, sections=['type', 'export']))
+
+    def test_disassemble_bytes(self):
+        with open(STUFF, 'rb') as f:
+            binary = f.read()
+        document = json.loads(self.get('/disassemble?format=json', binary))
+        self.assertEqual(document, json.loads(main.disassemble(STUFF, output_format='json')))
+
+    def test_pool(self):
+        self.get('/disassemble?path=' + quote(STUFF))
+        pooled = self.server.modules.get(path_key(STUFF), None)
+        self.get('/disassemble?path={}&func=0'.format(quote(STUFF)))
+        self.assertIs(self.server.modules.get(path_key(STUFF), None), pooled)
+        self.assertEqual(len(self.server.modules), 1)
+
+        # the least recently used module is dropped
+        self.get('/disassemble?path=' + quote(BLOCK))
+        self.get('/disassemble?format=json', b'\x00asm\x01\x00\x00\x00')
+        self.assertEqual(len(self.server.modules), 2)
+        self.assertNotIn(path_key(STUFF), self.server.modules.entries)
+
+    def test_concurrent_requests(self):
+        expected = main.disassemble(BLOCK)
+        results = []
+
+        def request():
+            results.append(self.get('/disassemble?path=' + quote(BLOCK)))
+        threads = [threading.Thread(target=request) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [expected] * 8)
+        self.assertEqual(len(self.server.modules), 1)
+
+    def test_errors(self):
+        for endpoint, code in [('/disassemble?path=/no/such/file.wasm', 404),
+                               ('/disassemble?path={}&func=10000'.format(quote(BLOCK)), 400),
+                               ('/disassemble?path={}&format=xml'.format(quote(BLOCK)), 400),
+                               ('/disassemble', 400),
+                               ('/unknown', 404)]:
+            with self.assertRaises(HTTPError) as context:
+                self.get(endpoint)
+            self.assertEqual(context.exception.code, code)
+        with self.assertRaises(HTTPError) as context:
+            self.get('/disassemble', b'not a module')
+        self.assertEqual(context.exception.code, 400)
+        with self.assertRaises(HTTPError) as context:
+            self.get('/disassemble?path=' + quote(dirname))
+        self.assertEqual(context.exception.code, 400)
+        # f32.const cut short at the end of the module
+        truncated = bytes([0x00, 0x61, 0x73, 0x6d, 0x01, 0x00, 0x00, 0x00,
+                           0x01, 0x04, 0x01, 0x60, 0x00, 0x00,
+                           0x03, 0x02, 0x01, 0x00,
+                           0x0a, 0x06, 0x01, 0x04, 0x00, 0x43, 0x00, 0x00])
+        with self.assertRaises(HTTPError) as context:
+            self.get('/disassemble', truncated)
+        self.assertEqual(context.exception.code, 400)
+
+    def test_truncated_modules(self):
+        # every request is answered with a status, however the module is cut
+        with open(STUFF, 'rb') as f:
+            binary = f.read()
+        for length in range(8, len(binary), 7):
+            try:
+                self.get('/disassemble?format=json', binary[:length])
+            except HTTPError as error:
+                self.assertIn(error.code, (400, 500))
+
+if __name__ == '__main__':
+    unittest.main()
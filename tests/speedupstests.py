@@ -0,0 +1,73 @@
+import unittest
+import os, sys, glob
+dirname = os.path.realpath(__file__)
+dirname = dirname[:dirname[:dirname.rfind('/')].rfind('/')]
+sys.path.append(dirname)
+from main import SECTION_CLASSES, parseFile
+from section import *
+from conversions import python_read_uleb128, python_read_sleb128, python_decode_uleb128_array, python_escape_data
+from type import _speedups, python_decode_instructions, _compiled_decode_instructions
+
+CORPORA = [
+    os.path.join(dirname, 'spec', 'wasm', '*.wasm'),
+    os.path.join(dirname, 'wasm_files', '*', '*.wasm')
+]
+
+def corpus():
+    for pattern in CORPORA:
+        for path in sorted(glob.glob(pattern)):
+            yield path
+
+def outcome(function, *args):
+    # compare results, or the type of the error raised
+    try:
+        result = function(*args)
+    except Exception as e:
+        return type(e)
+    return repr(result)
+
+@unittest.skipIf(_speedups is None, 'the _speedups extension has not been built')
+class TestSpeedupsParity(unittest.TestCase):
+
+    def test_leb128(self):
+        for path in corpus():
+            binary = parseFile(path)
+            for offset in range(len(binary)):
+                self.assertEqual(outcome(_speedups.read_uleb128, binary, offset),
+                                 outcome(python_read_uleb128, binary, offset), path)
+                self.assertEqual(outcome(_speedups.read_sleb128, binary, offset),
+                                 outcome(python_read_sleb128, binary, offset), path)
+                self.assertEqual(outcome(_speedups.decode_uleb128_array, binary, offset, 4),
+                                 outcome(python_decode_uleb128_array, binary, offset, 4), path)
+
+    def test_escape_data(self):
+        for path in corpus():
+            binary = parseFile(path)
+            self.assertEqual(_speedups.escape_data(binary), python_escape_data(binary), path)
+        self.assertEqual(_speedups.escape_data(bytes(range(256))), python_escape_data(bytes(range(256))))
+
+    def test_instructions(self):
+        for path in corpus():
+            binary = memoryview(parseFile(path))
+            try:
+                sectionList = makeSectionList(Reader(binary, 8))
+                for idx, section_class in enumerate(SECTION_CLASSES):
+                    if sectionList[idx + 1] is not None:
+                        sectionList[idx + 1] = section_class(sectionList[idx + 1], sectionList)
+            except Exception:
+                continue
+
+            code_section = sectionList[SECTION_IDS['code']]
+            if code_section is None:
+                continue
+
+            for offset in code_section.body_offsets:
+                # decode from just after the body size; both decoders stop at the first end opcode
+                body = Reader(code_section.data, offset)
+                body = body.sub_reader(body.read_varuint32())
+                args = (body.buffer, body.offset, body.end, code_section.count)
+                self.assertEqual(outcome(_compiled_decode_instructions, *args),
+                                 outcome(python_decode_instructions, *args), path)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,15 @@
-import numpy
+import struct
+
+from array import array
+
 from constants import *
 from conversions import *
+from reader import *
 
 class FuncType:
-    def __init__(self, inputBytes):
+    __slots__ = ('form', 'param_count', 'param_types', 'return_count', 'return_type')
+
+    def __init__(self, reader):
         """
         field         type        description
         ----------------------------------------------------------------------------------
@@ -15,21 +21,18 @@ class FuncType:
 
         Source: https://github.com/WebAssembly/website/blob/d7592a9b46729d1a76e72f73624fbe8bd5ad1caa/docs/design/BinaryEncoding.md#func_type
         """
-        self.form        = LANGUAGE_TYPES[int.from_bytes(inputBytes[0:1], byteorder='little', signed=False)]
-        self.param_count = int.from_bytes(inputBytes[1:2], byteorder='little', signed=False)
+        self.form        = LANGUAGE_TYPES[reader.read_byte()]
+        self.param_count = reader.read_varuint32()
 
-        # The index in the byte array of the last value of 'param_types'
-        param_end_index = 2 + self.param_count
         self.param_types = []
-
         for i in range(self.param_count):
-            self.param_types.append(LANGUAGE_TYPES[inputBytes[2 + i]])
+            self.param_types.append(LANGUAGE_TYPES[reader.read_byte()])
 
-        self.return_count = int.from_bytes(inputBytes[param_end_index:param_end_index + 1], byteorder='little', signed=False)
+        self.return_count = reader.read_varuint32()
 
         self.return_type = []
         for i in range(self.return_count):
-            self.return_type.append(LANGUAGE_TYPES[inputBytes[param_end_index + 1 + i]])
+            self.return_type.append(LANGUAGE_TYPES[reader.read_byte()])
 
     def size(self):
         """ 
@@ -66,7 +69,7 @@ class FuncType:
         return '{}{}{}'.format(params, padding, results)
 
 class TableType:
-    def __init__(self, inputBytes):
+    def __init__(self, reader):
         """
         Field           Type                Description
         elementType     elem_type           the type of elements
@@ -78,27 +81,27 @@ class TableType:
         # A varint7 indicating the types of elements in a table. 
         # In the MVP, only one type is available: anyfunc
         # https://github.com/WebAssembly/website/blob/d7592a9b46729d1a76e72f73624fbe8bd5ad1caa/docs/design/BinaryEncoding.md#elem_type
-        self.elementType = LANGUAGE_TYPES[inputBytes[0]]
-        self.limits = ResizableLimits(inputBytes[1:])
+        self.elementType = LANGUAGE_TYPES[reader.read_byte()]
+        self.limits = ResizableLimits(reader)
 
     def size(self):
         return self.limits.size() + 1
 
 class MemoryType:
-    def __init__(self, inputBytes):
+    def __init__(self, reader):
         """
         Field   Type                Description
         limits  resizable_limits    see ResizableLimits class
 
         Source: https://github.com/WebAssembly/website/blob/d7592a9b46729d1a76e72f73624fbe8bd5ad1caa/docs/design/BinaryEncoding.md#memory_type
         """
-        self.limits = ResizableLimits(inputBytes)
+        self.limits = ResizableLimits(reader)
 
     def size(self):
         return self.limits.size()
 
 class GlobalType:
-    def __init__(self, inputBytes):
+    def __init__(self, reader):
         """
         Field           Type        Description
         content_type    value_type  type of the value
@@ -106,8 +109,8 @@ class GlobalType:
 
         Source: https://github.com/WebAssembly/website/blob/d7592a9b46729d1a76e72f73624fbe8bd5ad1caa/docs/design/BinaryEncoding.md#global_type
         """
-        self.content_type = LANGUAGE_TYPES[inputBytes[0]]
-        self.mutability = inputBytes[1]
+        self.content_type = LANGUAGE_TYPES[reader.read_byte()]
+        self.mutability = reader.read_byte()
 
     def size(self):
         return 2
@@ -116,7 +119,9 @@ class GlobalType:
         return 'GlobalType: {}, mutability = {}'.format(self.content_type, self.mutability)
 
 class ResizableLimits:
-    def __init__(self, inputBytes):
+    __slots__ = ('flags', 'initial', 'maximum', '_size')
+
+    def __init__(self, reader):
         """
         A packed tuple that describes the limits of a table or memory:
 
@@ -127,16 +132,15 @@ class ResizableLimits:
 
         Source: https://github.com/WebAssembly/website/blob/d7592a9b46729d1a76e72f73624fbe8bd5ad1caa/docs/design/BinaryEncoding.md#resizable_limits
         """
-        self.flags = inputBytes[0]
-        self.initial = inputBytes[1]
+        start = reader.offset
+        self.flags = reader.read_varuint32()
+        self.initial = reader.read_varuint32()
         if self.flags == 1:
-            self.maximum = inputBytes[2]
+            self.maximum = reader.read_varuint32()
+        self._size = reader.offset - start
 
     def size(self):
-        if self.flags == 1:
-            return 3
-        else:
-            return 2
+        return self._size
 
 class InitExpr:
     """
@@ -151,18 +155,34 @@ class InitExpr:
 
     Source: https://github.com/WebAssembly/website/blob/d7592a9b46729d1a76e72f73624fbe8bd5ad1caa/docs/design/Modules.md#initializer-expression
     """
-    def __init__(self, inputBytes):
-        self.constant = OPCODES[inputBytes[0]]
+    def __init__(self, reader):
+        buffer = reader.buffer
+        start = reader.offset
+        self.constant = OPCODES[reader.read_byte()]
+
+        immediate = self.constant[1]
+        if immediate == 'value.varint32' or immediate == 'value.varint64':
+            self.literal = reader.read_varint64()
+        elif immediate == 'global_index.varuint32':
+            self.literal = reader.read_varuint32()
+        elif immediate == 'value.uint32':
+            self.literal = struct.unpack_from('<f', reader.read_bytes(4))[0]
+        elif immediate == 'value.uint64':
+            self.literal = struct.unpack_from('<d', reader.read_bytes(8))[0]
+        else:
+            self.literal = None
 
-        index = 1
+        index = reader.offset
 
         # Iterate through the expression until the end byte is met.
         # Source: https://github.com/WebAssembly/website/blob/d7592a9b46729d1a76e72f73624fbe8bd5ad1caa/docs/design/BinaryEncoding.md#function-bodies
-        while index < len(inputBytes) and inputBytes[index] != END_OPCODE:
+        while index < reader.end and buffer[index] != END_OPCODE:
             index += 1
 
-        self.literal = int.from_bytes(inputBytes[1:index], byteorder='little', signed=False)
-        self._size = index + 1
+        if self.literal is None:
+            self.literal = int.from_bytes(buffer[start + 1:index], byteorder='little', signed=False)
+        self._size = index + 1 - start
+        reader.skip(index + 1 - reader.offset)
 
     def size(self):
         return self._size
@@ -170,6 +190,517 @@ class InitExpr:
     def to_str(self):
         return '{} {}'.format(self.constant[0], self.literal)
 
+"""
+Every opcode is decoded according to its kind, found by the immediate it takes.
+The compiled decoder in _speedups understands the same kinds, so the values
+below have to match the enum in _speedups.c.
+Source: https://github.com/WebAssembly/website/blob/d7592a9b46729d1a76e72f73624fbe8bd5ad1caa/docs/design/BinaryEncoding.md#instruction-opcodes
+"""
+KIND_PLAIN         = 0   # no immediate
+KIND_SKIP          = 1   # not kept in the instruction list (nop)
+KIND_INDEX         = 2   # varuint32: local_index, global_index, relative_depth
+KIND_VARINT        = 3   # varint32 or varint64 literal
+KIND_FLOAT32       = 4   # 4-byte literal, kept as its bits
+KIND_FLOAT64       = 5   # 8-byte literal, kept as its bits
+KIND_RESERVED      = 6   # one reserved byte, must be 0 in the MVP
+KIND_MEMORY        = 7   # memory_immediate: alignment flags and offset, not kept
+KIND_BLOCK         = 8   # block_type byte
+KIND_BARE_BLOCK    = 9   # 'block': only kept without a result type, see _decode_bare_block
+KIND_ELSE          = 10  # no immediate, but starts a block
+KIND_BRANCH_TABLE  = 11  # target_count, then target_count + 1 targets
+KIND_CALL          = 12  # function_index.varuint32, checked against the function count
+KIND_CALL_INDIRECT = 13  # type_index.varuint32 and one reserved byte
+KIND_UNKNOWN       = 14  # not an opcode
+
+# Kinds by the immediate description found in OPCODES.
+IMMEDIATE_KINDS = {
+    'local_index.varuint32'    : KIND_INDEX,
+    'global_index.varuint32'   : KIND_INDEX,
+    'relative_depth.varuint32' : KIND_INDEX,
+    'value.varint32'           : KIND_VARINT,
+    'value.varint64'           : KIND_VARINT,
+    'value.uint32'             : KIND_FLOAT32,
+    'value.uint64'             : KIND_FLOAT64,
+    'reserved.varuint1'        : KIND_RESERVED,
+    'block_type'               : KIND_BLOCK,
+    'function_index.varuint32' : KIND_CALL,
+    'memory_immediate'         : KIND_MEMORY
+}
+
+# Kinds of opcodes that are decoded by name.
+NAMED_KINDS = {
+    'nop'           : KIND_SKIP,
+    'block'         : KIND_BARE_BLOCK,
+    'else'          : KIND_ELSE,
+    'br_table'      : KIND_BRANCH_TABLE,
+    'call_indirect' : KIND_CALL_INDIRECT
+}
+
+def compile_opcode_kinds(opcodes):
+    """
+        this method compiles the opcode table into the kind of each of the
+        256 opcode bytes
+
+        = Parameters =
+        opcodes : dict  = opcode byte -> (name, immediate description)
+
+        = Return Value =
+        kinds   : int[] = the kind of each opcode byte
+    """
+    kinds = [KIND_UNKNOWN] * 256
+    for opcode, (name, immediate) in opcodes.items():
+        if name in NAMED_KINDS:
+            kinds[opcode] = NAMED_KINDS[name]
+        else:
+            kinds[opcode] = IMMEDIATE_KINDS.get(immediate, KIND_PLAIN)
+    return kinds
+
+OPCODE_KINDS = compile_opcode_kinds(OPCODES)
+
+"""
+Each immediate decoder below is bound to a single opcode when the dispatch table
+is built. A decoder is called with the buffer, the index just past the opcode,
+the number of functions and the branch target array, and returns the immediate
+to keep (None if the instruction is not kept) and the index just past it.
+"""
+
+_FLOAT32_BITS = struct.Struct('<I')
+_FLOAT64_BITS = struct.Struct('<q')
+
+def _decode_no_immediate(inputBytes, index, function_count, targets):
+    return 0, index
+
+def _skip_instruction(inputBytes, index, function_count, targets):
+    return None, index
+
+def _decode_index(inputBytes, index, function_count, targets):
+    return read_uleb128(inputBytes, index)
+
+def _decode_varint(inputBytes, index, function_count, targets):
+    return read_sleb128(inputBytes, index)
+
+def _decode_float32(inputBytes, index, function_count, targets, unpack_from=_FLOAT32_BITS.unpack_from):
+    return unpack_from(inputBytes, index)[0], index + 4
+
+def _decode_float64(inputBytes, index, function_count, targets, unpack_from=_FLOAT64_BITS.unpack_from):
+    return unpack_from(inputBytes, index)[0], index + 8
+
+def _decode_reserved(inputBytes, index, function_count, targets):
+    # reserved : varuint1, must be 0 in the MVP
+    return 0, index + 1
+
+def _decode_memory_immediate(inputBytes, index, function_count, targets):
+    # Followed by two values, alignment and offset.
+    flags, index = read_uleb128(inputBytes, index)
+    offset, index = read_uleb128(inputBytes, index)
+    return 0, index
+
+def _decode_block_type(inputBytes, index, function_count, targets):
+    # Source: https://github.com/WebAssembly/website/blob/d7592a9b46729d1a76e72f73624fbe8bd5ad1caa/docs/design/BinaryEncoding.md#block-type
+    return inputBytes[index], index + 1
+
+def _decode_bare_block(inputBytes, index, function_count, targets):
+    # A block with a result type is left out, and its type byte is not consumed.
+    if inputBytes[index] == 0x40:
+        return 0x40, index + 1
+    return None, index
+
+def _decode_branch_table(inputBytes, index, function_count, targets):
+    # target_count : varuint32, target_table : varuint32*, default_target : varuint32
+    # The immediate is the position of the count of targets in the target array.
+    target_count, index = read_uleb128(inputBytes, index)
+    values, index = decode_uleb128_array(inputBytes, index, target_count + 1)
+    position = len(targets)
+    targets.append(target_count + 1)
+    targets.extend(values)
+    return position, index
+
+def _decode_function_index(inputBytes, index, function_count, targets):
+    # call opcode
+    function_index, index = read_uleb128(inputBytes, index)
+    if function_index > function_count:
+        raise ValueError('Invalid function index: {}'.format(function_index))
+    return function_index, index
+
+def _decode_call_indirect(inputBytes, index, function_count, targets):
+    # The call_indirect operator takes a list of function arguments and as the last operand the index into the table.
+    # Its reserved immediate is for future 🦄 use and must be 0 in the MVP.
+    # type_index : varuint32, reserved : varuint1
+    type_index, index = read_uleb128(inputBytes, index)
+    reserved = inputBytes[index]
+    return type_index, index + 1
+
+def _decode_unknown_opcode(opcode):
+    # also used as a record decoder, which takes one argument less
+    def decode(inputBytes, index, *args):
+        raise KeyError(opcode)
+    return decode
+
+# Immediate decoders by kind.
+KIND_DECODERS = {
+    KIND_PLAIN         : _decode_no_immediate,
+    KIND_SKIP          : _skip_instruction,
+    KIND_INDEX         : _decode_index,
+    KIND_VARINT        : _decode_varint,
+    KIND_FLOAT32       : _decode_float32,
+    KIND_FLOAT64       : _decode_float64,
+    KIND_RESERVED      : _decode_reserved,
+    KIND_MEMORY        : _decode_memory_immediate,
+    KIND_BLOCK         : _decode_block_type,
+    KIND_BARE_BLOCK    : _decode_bare_block,
+    KIND_ELSE          : _decode_no_immediate,
+    KIND_BRANCH_TABLE  : _decode_branch_table,
+    KIND_CALL          : _decode_function_index,
+    KIND_CALL_INDIRECT : _decode_call_indirect
+}
+
+def compile_opcode_table(kinds):
+    """
+        this method compiles the opcode kinds into a 256-entry dispatch table
+        of immediate decoders, indexed directly by the opcode byte
+
+        = Parameters =
+        kinds   : int[]      = the kind of each opcode byte
+
+        = Return Value =
+        table   : function[] = the immediate decoder for each opcode byte
+    """
+    table = []
+    for opcode, kind in enumerate(kinds):
+        if kind == KIND_UNKNOWN:
+            table.append(_decode_unknown_opcode(opcode))
+        else:
+            table.append(KIND_DECODERS[kind])
+    return table
+
+OPCODE_DECODERS = compile_opcode_table(OPCODE_KINDS)
+
+"""
+Each renderer below turns the immediate of one instruction back into the tuple
+the instruction used to be stored as: (name,), (name, value), or
+(name, value, True) for instructions that start a block.
+"""
+
+def _render_no_immediate(name):
+    instruction = (name,)
+    def render(immediate, targets):
+        return instruction
+    return render
+
+def _render_value(name):
+    def render(immediate, targets):
+        return (name, immediate)
+    return render
+
+def _render_float32(name):
+    unpack = struct.Struct('<f').unpack
+    def render(immediate, targets):
+        return (name, unpack(_FLOAT32_BITS.pack(immediate))[0])
+    return render
+
+def _render_float64(name):
+    unpack = struct.Struct('<d').unpack
+    def render(immediate, targets):
+        return (name, unpack(_FLOAT64_BITS.pack(immediate))[0])
+    return render
+
+def _render_block_type(name):
+    def render(immediate, targets):
+        if immediate == 0x40:
+            # -0x40 (i.e., the byte 0x40) indicating a signature with 0 results.
+            return (name, '0', True)
+        elif immediate in LANGUAGE_TYPES:
+            # a value_type indicating a signature with a single result
+            return (name, '(result {})'.format(LANGUAGE_TYPES[immediate]), True)
+        return (name, immediate, True)
+    return render
+
+def _render_else(name):
+    instruction = (name, '', True)
+    def render(immediate, targets):
+        return instruction
+    return render
+
+def _render_branch_table(name):
+    def render(immediate, targets):
+        count = targets[immediate]
+        return (name, ' '.join(str(target) for target in targets[immediate + 1:immediate + 1 + count]))
+    return render
+
+def _render_call_indirect(name):
+    def render(immediate, targets):
+        return ('{} (type {})'.format(name, immediate),)
+    return render
+
+# Renderers by kind.
+KIND_RENDERERS = {
+    KIND_PLAIN         : _render_no_immediate,
+    KIND_INDEX         : _render_value,
+    KIND_VARINT        : _render_value,
+    KIND_FLOAT32       : _render_float32,
+    KIND_FLOAT64       : _render_float64,
+    KIND_RESERVED      : _render_no_immediate,
+    KIND_MEMORY        : _render_no_immediate,
+    KIND_BLOCK         : _render_block_type,
+    KIND_BARE_BLOCK    : _render_block_type,
+    KIND_ELSE          : _render_else,
+    KIND_BRANCH_TABLE  : _render_branch_table,
+    KIND_CALL          : _render_value,
+    KIND_CALL_INDIRECT : _render_call_indirect
+}
+
+def compile_renderer_table(opcodes, kinds):
+    """
+        this method compiles a 256-entry table of renderers, indexed directly by
+        the opcode byte, for the opcodes that can be kept in an instruction list
+    """
+    table = [None] * 256
+    for opcode, (name, immediate) in opcodes.items():
+        if kinds[opcode] in KIND_RENDERERS:
+            table[opcode] = KIND_RENDERERS[kinds[opcode]](name)
+    return table
+
+OPCODE_RENDERERS = compile_renderer_table(OPCODES, OPCODE_KINDS)
+
+class Instructions:
+    """ This class holds the decoded instructions of a function body in
+    parallel arrays, about 13 bytes per instruction instead of a tuple each
+
+    Indexing or iterating gives each instruction as the tuple it is rendered
+    from: (name,), (name, value) or (name, value, True) for instructions that
+    start a block.
+
+    Attributes:
+        opcodes    : array('B')  =  the opcode byte of each instruction
+        immediates : array('q')  =  the immediate of each instruction: the value
+                                    of indices and integer literals, the bits of
+                                    float literals, the block type byte, or the
+                                    position of the targets of a br_table
+        offsets    : array('I')  =  the index of each opcode in the decoded buffer
+        targets    : array('q')  =  for each br_table, the number of its targets
+                                    followed by the targets
+    """
+    __slots__ = ('opcodes', 'immediates', 'offsets', 'targets')
+
+    def __init__(self):
+        self.opcodes = array('B')
+        self.immediates = array('q')
+        self.offsets = array('I')
+        self.targets = array('q')
+
+    def __len__(self):
+        return len(self.opcodes)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        return OPCODE_RENDERERS[self.opcodes[idx]](self.immediates[idx], self.targets)
+
+    def __iter__(self):
+        renderers = OPCODE_RENDERERS
+        targets = self.targets
+        for opcode, immediate in zip(self.opcodes, self.immediates):
+            yield renderers[opcode](immediate, targets)
+
+    def __eq__(self, other):
+        if isinstance(other, Instructions):
+            return (self.opcodes == other.opcodes and self.immediates == other.immediates and
+                    self.offsets == other.offsets and self.targets == other.targets)
+        return list(self) == other
+
+    def __repr__(self):
+        return 'Instructions(opcodes={!r}, immediates={!r}, offsets={!r}, targets={!r})'.format(
+            self.opcodes.tobytes(), self.immediates.tolist(), self.offsets.tolist(), self.targets.tolist())
+
+    def name(self, idx):
+        return OPCODES[self.opcodes[idx]][0]
+
+    def offset(self, idx):
+        return self.offsets[idx]
+
+"""
+The instruction list above is what the text format is rendered from, and it
+keeps the quirks of that format: nop is left out, a block with a result type
+is left out (its type byte then decodes as an opcode), memory immediates are
+dropped and decoding stops at the first end. Instruction records are decoded
+separately, one for every instruction of the body with its actual immediates,
+for the JSON output and for mapping byte offsets to instructions.
+
+A record decoder is called with the buffer, the index just past the opcode and
+the number of functions, and returns the immediates of the record (an empty
+tuple or a tuple of one JSON value) and the index just past them.
+"""
+
+def _record_no_immediate(inputBytes, index, function_count):
+    return (), index
+
+def _record_index(inputBytes, index, function_count):
+    value, index = read_uleb128(inputBytes, index)
+    return (value,), index
+
+def _record_varint(inputBytes, index, function_count):
+    value, index = read_sleb128(inputBytes, index)
+    return (value,), index
+
+def _json_float(value):
+    # JSON has no NaN or infinities, so those are written as strings
+    if value != value or value in (float('inf'), float('-inf')):
+        return str(value)
+    return value
+
+def _record_float32(inputBytes, index, function_count, unpack_from=struct.Struct('<f').unpack_from):
+    return (_json_float(unpack_from(inputBytes, index)[0]),), index + 4
+
+def _record_float64(inputBytes, index, function_count, unpack_from=struct.Struct('<d').unpack_from):
+    return (_json_float(unpack_from(inputBytes, index)[0]),), index + 8
+
+def _record_reserved(inputBytes, index, function_count):
+    return (), index + 1
+
+def _record_memory_immediate(inputBytes, index, function_count):
+    # flags : varuint32, the log2 of the alignment, then offset : varuint32
+    flags, index = read_uleb128(inputBytes, index)
+    offset, index = read_uleb128(inputBytes, index)
+    return ({'align': 1 << flags, 'offset': offset},), index
+
+def _record_block_type(inputBytes, index, function_count):
+    # the result type, or None for 0x40, a block with no result
+    block_type = inputBytes[index]
+    return (LANGUAGE_TYPES.get(block_type, block_type) if block_type != 0x40 else None,), index + 1
+
+def _record_branch_table(inputBytes, index, function_count):
+    # the targets, followed by the default target
+    target_count, index = read_uleb128(inputBytes, index)
+    values, index = decode_uleb128_array(inputBytes, index, target_count + 1)
+    return (list(values),), index
+
+def _record_function_index(inputBytes, index, function_count):
+    function_index, index = _decode_function_index(inputBytes, index, function_count, None)
+    return (function_index,), index
+
+def _record_call_indirect(inputBytes, index, function_count):
+    # type_index : varuint32, then a reserved byte
+    type_index, index = read_uleb128(inputBytes, index)
+    return (type_index,), index + 1
+
+# Record decoders by kind.
+KIND_RECORD_DECODERS = {
+    KIND_PLAIN         : _record_no_immediate,
+    KIND_SKIP          : _record_no_immediate,
+    KIND_INDEX         : _record_index,
+    KIND_VARINT        : _record_varint,
+    KIND_FLOAT32       : _record_float32,
+    KIND_FLOAT64       : _record_float64,
+    KIND_RESERVED      : _record_reserved,
+    KIND_MEMORY        : _record_memory_immediate,
+    KIND_BLOCK         : _record_block_type,
+    KIND_BARE_BLOCK    : _record_block_type,
+    KIND_ELSE          : _record_no_immediate,
+    KIND_BRANCH_TABLE  : _record_branch_table,
+    KIND_CALL          : _record_function_index,
+    KIND_CALL_INDIRECT : _record_call_indirect
+}
+
+def compile_record_table(kinds):
+    """
+        this method compiles the opcode kinds into a 256-entry dispatch table
+        of record decoders, indexed directly by the opcode byte
+    """
+    table = []
+    for opcode, kind in enumerate(kinds):
+        if kind == KIND_UNKNOWN:
+            table.append(_decode_unknown_opcode(opcode))
+        else:
+            table.append(KIND_RECORD_DECODERS[kind])
+    return table
+
+OPCODE_RECORD_DECODERS = compile_record_table(OPCODE_KINDS)
+
+def decode_instruction_records(inputBytes, index, end, function_count, base=0):
+    """
+        this method decodes every instruction of a function body, nop, block
+        types, memory immediates and every end included, as lists that can be
+        written as JSON
+
+        = Parameters =
+        inputBytes     : memoryview = the buffer holding the function body
+        index          : int        = the index of the first instruction
+        end            : int        = the index one past the end of the function body
+        function_count : int        = the number of functions, to validate calls
+        base           : int        = added to every offset
+
+        = Return Value =
+        records : list[] = [offset, name] or [offset, name, immediate] for each
+                           instruction: indices and literals as numbers
+                           (non-finite floats as strings), block types as the
+                           result type or None, br_table targets as a list with
+                           the default target last, and memory immediates as
+                           {"align": bytes, "offset": offset}
+    """
+    decoders = OPCODE_RECORD_DECODERS
+    records = []
+    append = records.append
+    end = min(end, len(inputBytes))
+    while index < end:
+        opcode = inputBytes[index]
+        start = index
+        immediate, index = decoders[opcode](inputBytes, index + 1, function_count)
+        append([base + start, OPCODES[opcode][0], *immediate])
+    return records
+
+def decode_instructions(inputBytes, index, end, function_count):
+    """
+        this method decodes instructions until the end opcode or the end of the
+        function body, whichever comes first
+
+        = Parameters =
+        inputBytes     : memoryview = the buffer holding the function body
+        index          : int        = the index of the first instruction
+        end            : int        = the index one past the end of the function body
+        function_count : int        = the number of functions, to validate calls
+
+        = Return Value =
+        return : (Instructions, int) = the instructions and the index of the end opcode
+    """
+    # Every opcode is dispatched straight to its immediate decoder.
+    decoders = OPCODE_DECODERS
+    instructions = Instructions()
+    add_opcode = instructions.opcodes.append
+    add_immediate = instructions.immediates.append
+    add_offset = instructions.offsets.append
+    targets = instructions.targets
+    while index < end:
+        opcode = inputBytes[index]
+        if opcode == END_OPCODE:
+            break
+        start = index
+        immediate, index = decoders[opcode](inputBytes, index + 1, function_count, targets)
+        if immediate is not None:
+            add_opcode(opcode)
+            add_immediate(immediate)
+            add_offset(start)
+    return instructions, index
+
+# Use the compiled instruction decoder when the optional _speedups extension
+# has been built; decode_instructions above stays the reference implementation.
+python_decode_instructions = decode_instructions
+
+def _compiled_decode_instructions(inputBytes, index, end, function_count):
+    opcodes, immediates, offsets, targets, index = _speedups.decode_instructions(inputBytes, index, end, function_count)
+    instructions = Instructions()
+    instructions.opcodes.frombytes(opcodes)
+    instructions.immediates.frombytes(immediates)
+    instructions.offsets.frombytes(offsets)
+    instructions.targets.frombytes(targets)
+    return instructions, index
+
+try:
+    import _speedups
+    _speedups.set_opcode_table(OPCODE_KINDS)
+    decode_instructions = _compiled_decode_instructions
+except ImportError:
+    _speedups = None
+
 class FunctionBody:
     """
     Field       Type            Description
@@ -185,102 +716,38 @@ class FunctionBody:
     Each function body must end with the end opcode.
     Source: https://github.com/WebAssembly/website/blob/d7592a9b46729d1a76e72f73624fbe8bd5ad1caa/docs/design/BinaryEncoding.md#function-bodies
     """
-    def __init__(self, inputBytes, function_count):
-        self.bodySize = inputBytes[0]
-        self.localCount = inputBytes[1]
+    def __init__(self, reader, function_count):
+        start = reader.offset
+        self.bodySize = reader.read_varuint32()
+
+        # The body is limited to `bodySize` bytes; the caller's reader is advanced past it.
+        body = reader.sub_reader(self.bodySize)
+        self._size = body.end - start
+        self.localCount = body.read_varuint32()
         self.locals = []
 
-        # Shift the bytes by 2 for easier indexing in local variable for loop.
-        inputBytes = inputBytes[2:]
-
         # Iterate and populate the local variables
         # Source: https://github.com/WebAssembly/website/blob/d7592a9b46729d1a76e72f73624fbe8bd5ad1caa/docs/design/BinaryEncoding.md#local-entry
         for i in range(self.localCount):
-            count = inputBytes[i * 2]
-            localType = LANGUAGE_TYPE[inputBytes[(i * 2) + 1]]
+            count = body.read_varuint32()
+            localType = LANGUAGE_TYPES[body.read_byte()]
 
             # The locals array will be an array of tuples.
             # The tuple will be in the format of (count, localType).
             self.locals.append((count, localType))
 
-        # Shift the bytes for easier indexing for remaining bytes.
-        inputBytes = inputBytes[self.localCount * 2:]
-        index = 0
-        self.instructions = []
-        while index < len(inputBytes) and inputBytes[index] != END_OPCODE:
-            name, immediate = OPCODES[inputBytes[index]]
-            index += 1
-            if name == 'nop':
-                pass
-            elif immediate is None:
-                self.instructions.append((name))
-            elif immediate == 'local_index.varuint32':
-                self.instructions.append((name, inputBytes[index]))
-                index += 1
-            elif immediate == 'value.varint32':
-                # The literal value may contain an extra 0 byte.
-                # Look at the import.wasm file as an example.
-                # The start.wasm file has an example of a varint32 literal without an extra 0 byte.
-
-                byte_string = bytes(inputBytes[index : index+2])
-                decoded = leb128_to_int(byte_string, True)
-                if isinstance(decoded, int):
-                    self.instructions.append((name, decoded))
-                    index += 2
-                else:
-                    self.instructions.append((name, decoded[0]))
-                    index += 1
-
-            elif immediate == 'value.uint64':
-                literal = numpy.frombuffer(inputBytes[index : index + 8], dtype=numpy.float64)[0]
-                self.instructions.append((name, literal))
-                index += 8
-            elif immediate == 'block_type':
-                # Source: https://github.com/WebAssembly/website/blob/d7592a9b46729d1a76e72f73624fbe8bd5ad1caa/docs/design/BinaryEncoding.md#block-type
-                value = inputBytes[index]
-                if value == 0x40:
-                    # -0x40 (i.e., the byte 0x40) indicating a signature with 0 results.
-                    value = '0'
-                elif name == 'block':
-                    continue
-                elif value in LANGUAGE_TYPES:
-                    # a value_type indicating a signature with a single result
-                    value = '(result {})'.format(LANGUAGE_TYPES[value])
-
-                self.instructions.append((name, value, True))
-                index += 1
-            elif name == 'else':
-                self.instructions.append((name, '', True))
-
-            # call opcode
-            elif immediate == 'function_index.varuint32':
-                function_index = inputBytes[index]
-                if function_index > function_count:
-                    raise ValueError('Invalid function index: {}'.format(function_index))
-                self.instructions.append((name, function_index))
-                index += 1
-
-            elif name == 'call_indirect':
-                # The call_indirect operator takes a list of function arguments and as the last operand the index into the table.
-                # Its reserved immediate is for future 🦄 use and must be 0 in the MVP.
-                # type_index : varuint32, reserved : varuint1
-                type_index = inputBytes[index]
-                reserved = inputBytes[index + 1]
-
-                index += 2
-                self.instructions.append(('{} (type {})'.format(name, type_index),))
-            elif immediate == 'memory_immediate':
-                # Followed by two values, alignment and offset.
-                index += 2
-                self.instructions.append((name,))
-            else:
-                self.instructions.append((name,))
+        # Index straight into the shared buffer for the remaining bytes.
+        inputBytes = body.buffer
+        self.instructions, index = decode_instructions(inputBytes, body.offset, body.end, function_count)
 
     def size(self):
-        return self.bodySize + 1
+        return self._size
 
-    def to_str(self):
-        output = ''
+    def lines(self):
+        """
+            this method yields the text format of each instruction, one line at a time
+            (without the trailing newline)
+        """
         indent = '  '
         in_block = False
         for instruction in self.instructions:
@@ -295,9 +762,27 @@ class FunctionBody:
                 parsed_instruction = ' '.join([str(value) for value in instruction])
                 block_level = 2
 
-            output += '{}{}\n'.format(indent * block_level, parsed_instruction)
+            yield '{}{}'.format(indent * block_level, parsed_instruction)
 
         if in_block:
-            output += '{}end\n'.format(indent * 2)
+            yield '{}end'.format(indent * 2)
 
-        return output
\ No newline at end of file
+    def write_to(self, stream, end='\n'):
+        """
+            this method writes the instructions to the stream as they are rendered
+
+            = Parameters =
+            stream : file = any object with a write(str) method
+            end    : str  = written after the last line instead of its newline
+        """
+        previous = None
+        for line in self.lines():
+            if previous is not None:
+                stream.write(previous + '\n')
+            previous = line
+
+        if previous is not None:
+            stream.write(previous + end)
+
+    def to_str(self):
+        return ''.join(line + '\n' for line in self.lines())